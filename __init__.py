@@ -217,13 +217,22 @@ def load_addon():
         from . import rman_properties
         from . import rman_handlers
 
-        rman_config.register()
-        rman_presets.register()        
-        rman_operators.register()
-        rman_bl_nodes.register()
-        rman_properties.register()          
-        rman_ui.register()      
-        rman_handlers.register()
+        # time each phase, for the startup report
+        phase_times = []
+        time_start = time.perf_counter()
+        for name, module in [('config', rman_config),
+                             ('presets', rman_presets),
+                             ('operators', rman_operators),
+                             ('nodes', rman_bl_nodes),
+                             ('properties', rman_properties),
+                             ('ui', rman_ui),
+                             ('handlers', rman_handlers)]:
+            phase_start = time.perf_counter()
+            module.register()
+            phase_times.append((name, time.perf_counter() - phase_start))
+
+        rfb_log().debug("RenderMan add-on loaded in %.2fs (%s)" % (time.perf_counter() - time_start,
+                        ', '.join(['%s: %.2fs' % (name, t) for name, t in phase_times])))
 
         __RMAN_ADDON_LOADED__ = True
 
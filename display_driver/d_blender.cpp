@@ -22,6 +22,8 @@
 
 #include <vector>
 #include <array>
+#include <mutex>
+#include <algorithm>
 #include <stdlib.h>
 #include "libndspy/Dspy.h"
 
@@ -48,6 +50,7 @@ struct BlenderImage
         sampleCountOffset = -1;
         isXpu = false;
         isDirty = false;
+        hasDirtyRegion = false;
         framebuffer = nullptr;
         denoiseFrameBuffer = nullptr;
     }
@@ -73,6 +76,15 @@ struct BlenderImage
     GLuint texture_id;
     bool isDirty;
     int use_denoiser;
+
+    // Union of all regions written since the last call 
+    // to GetDirtyRegion
+    std::mutex dirtyMutex;
+    bool hasDirtyRegion;
+    int dirtyXMin;
+    int dirtyXMax;
+    int dirtyYMin;
+    int dirtyYMax;
 #ifndef OSX
     BlenderOptiXDenoiser blenderDenoiser;
 #endif    
@@ -154,6 +166,27 @@ bool DenoiseBuffer(BlenderImage* blenderImage)
     return false;
 }
 
+// Add a region to the image's dirty region
+void AddDirtyRegion(BlenderImage* blenderImage, int xmin, int xmax, int ymin, int ymax)
+{
+    std::lock_guard<std::mutex> lock(blenderImage->dirtyMutex);
+    if (blenderImage->hasDirtyRegion)
+    {
+        blenderImage->dirtyXMin = std::min(blenderImage->dirtyXMin, xmin);
+        blenderImage->dirtyXMax = std::max(blenderImage->dirtyXMax, xmax);
+        blenderImage->dirtyYMin = std::min(blenderImage->dirtyYMin, ymin);
+        blenderImage->dirtyYMax = std::max(blenderImage->dirtyYMax, ymax);
+    }
+    else
+    {
+        blenderImage->dirtyXMin = xmin;
+        blenderImage->dirtyXMax = xmax;
+        blenderImage->dirtyYMin = ymin;
+        blenderImage->dirtyYMax = ymax;
+        blenderImage->hasDirtyRegion = true;
+    }
+}
+
 // Copy from the XPU shared memory framebuffer to our framebuffer
 void CopyXpuBuffer(BlenderImage* blenderImage)
 {
@@ -304,6 +337,33 @@ void GetActiveRegion(size_t pos, int& arXMin, int& arXMax, int& arYMin, int& arY
     }
 }
 
+// Return the region of this display that has changed since the 
+// last time this was called, and reset it. Returns 1 if there is 
+// a dirty region, 0 if nothing has changed, -1 if the display
+// could not be found.
+PRMANEXPORT
+int GetDirtyRegion(size_t pos, int& xmin, int& xmax, int& ymin, int& ymax)
+{
+    if (s_blenderImages.empty() || pos >= s_blenderImages.size())
+        return -1;
+
+    BlenderImage* blenderImage = s_blenderImages[pos];
+    
+    if (blenderImage == nullptr)
+        return -1;
+
+    std::lock_guard<std::mutex> lock(blenderImage->dirtyMutex);
+    if (!blenderImage->hasDirtyRegion)
+        return 0;
+
+    xmin = blenderImage->dirtyXMin;
+    xmax = blenderImage->dirtyXMax;
+    ymin = blenderImage->dirtyYMin;
+    ymax = blenderImage->dirtyYMax;
+    blenderImage->hasDirtyRegion = false;
+    return 1;
+}
+
 // DrawBufferToBlender creates a GL texture that then can be given to 
 // Blender to draw into their viewport. It is expected that this function 
 // will be called from python via the ctypes module, in the view_draw()
@@ -630,6 +690,8 @@ DspyImageData(
         blenderImage->useActiveRegion = false;
     }
    
+    AddDirtyRegion(blenderImage, blenderImage->arXMin, blenderImage->arXMax,
+                   blenderImage->arYMin, blenderImage->arYMax);
     blenderImage->isDirty = true;
     return PkDspyErrorNone;
 }
@@ -801,6 +863,8 @@ void DisplayBlender::Notify(const uint32_t iteration, const uint32_t totaliterat
         // shared memory
         m_image->isReady = true;
     }
+    // XPU doesn't tell us which pixels have changed
+    AddDirtyRegion(m_image, 0, m_image->width-1, 0, m_image->height-1);
     m_image->isDirty = true;
 
 }
@@ -388,6 +388,74 @@ class RendermanPreferences(AddonPreferences):
         max=0.1
     )    
 
+    rman_render_update_min_interval: FloatProperty(
+        name="Min Update Interval",
+        description="The shortest time, in seconds, between updates of the image while rendering into Blender. This caps how often Blender has to redraw.",
+        default=0.01,
+        precision=3,
+        min=0.001,
+        max=1.0
+    )
+
+    rman_render_update_max_interval: FloatProperty(
+        name="Max Update Interval",
+        description="The longest time, in seconds, to wait between checks for new pixels while rendering into Blender or the viewport. The wait grows towards this value while the image isn't changing; progress events and edits cut it short.",
+        default=0.5,
+        precision=3,
+        min=0.01,
+        max=5.0
+    )
+
+    rman_ipr_edit_debounce: IntProperty(
+        name="IPR Edit Debounce",
+        description="Time, in milliseconds, to wait for more changes before sending edits to the renderer during IPR. Changes made within this window (ex: while dragging an object) are sent together, which means fewer restarts. A value of 0 sends each change right away.",
+        default=0,
+        min=0,
+        max=1000
+    )
+
+    rman_export_workers: IntProperty(
+        name="Export Threads",
+        description="Number of threads used to build mesh data during final render and RIB export. Setting this to 1 builds all meshes on the main thread.",
+        default=4,
+        min=1,
+        max=64
+    )
+
+    rman_rib_export_processes: IntProperty(
+        name="RIB Export Processes",
+        description="Number of background Blender processes used to export an animation to RIB, when Parallel Animation Export is turned on.",
+        default=4,
+        min=1,
+        max=64
+    )
+
+    rman_node_desc_cache: BoolProperty(
+        name="Cache Node Descriptions",
+        description="Keep a cache of the parsed shader and plugin descriptions (.args and .oso files), so that they don't need to be parsed again each time Blender starts. Files are only parsed again when they change.",
+        default=True
+    )
+
+    rman_geo_cache_enable: BoolProperty(
+        name="Geometry Cache",
+        description="Cache translated meshes on disk during final renders and RIB export. Meshes that have not changed since the last render or frame are read back from the cache, rather than translated again.",
+        default=False
+    )
+
+    rman_geo_cache_dir: StringProperty(
+        name="Geometry Cache Directory",
+        subtype='DIR_PATH',
+        description="Directory to store the geometry cache in. If empty, a folder in the system temp directory is used.",
+        default=""
+    )
+
+    rman_geo_cache_size: IntProperty(
+        name="Geometry Cache Size (MB)",
+        description="Maximum size of the geometry cache, in megabytes. The least recently used meshes are removed when the cache grows past this size.",
+        default=4096,
+        min=16
+    )
+
     # For the preset browser
     rpbConfigFile: StringProperty(default='')
     rpbUserLibraries: CollectionProperty(type=RendermanPreferencePath)
@@ -585,6 +653,16 @@ class RendermanPreferences(AddonPreferences):
             col.label(text='Other', icon_value=rman_r_icon.icon_id)
 
             col.prop(self, 'rman_viewport_refresh_rate')  
+            col.prop(self, 'rman_render_update_min_interval')
+            col.prop(self, 'rman_render_update_max_interval')
+            col.prop(self, 'rman_ipr_edit_debounce')
+            col.prop(self, 'rman_export_workers')
+            col.prop(self, 'rman_rib_export_processes')
+            col.prop(self, 'rman_node_desc_cache')
+            col.prop(self, 'rman_geo_cache_enable')
+            if self.rman_geo_cache_enable:
+                col.prop(self, 'rman_geo_cache_dir')
+                col.prop(self, 'rman_geo_cache_size')
             col.prop(self, 'rman_config_dir')   
             if self.rman_do_preview_renders:
                 col.prop(self, 'rman_preview_renders_minSamples')
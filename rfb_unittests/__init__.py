@@ -1,8 +1,16 @@
 import unittest
 from RenderManForBlender.rfb_unittests.test_string_expr import StringExprTest
+from RenderManForBlender.rfb_unittests.test_mesh_primvars import MeshPrimvarsTest
+from RenderManForBlender.rfb_unittests.test_scene_scaling import SceneScalingTest
+from RenderManForBlender.rfb_unittests.test_shadergraph_utils import ShaderGraphUtilsTest
+from RenderManForBlender.rfb_unittests.test_sg_node_dict import SgNodeDictTest
 
 classes = [
-    StringExprTest
+    StringExprTest,
+    MeshPrimvarsTest,
+    SceneScalingTest,
+    ShaderGraphUtilsTest,
+    SgNodeDictTest
 ]
 
 def suite():
@@ -0,0 +1,50 @@
+import unittest
+import tracemalloc
+import bpy
+import bmesh
+from ..rfb_utils import object_utils
+from ..rfb_logger import rfb_log
+
+class MeshPrimvarsTest(unittest.TestCase):
+
+    @classmethod
+    def add_tests(self, suite):
+        suite.addTest(MeshPrimvarsTest('test_numpy_matches_list'))
+        suite.addTest(MeshPrimvarsTest('test_numpy_memory_usage'))
+
+    def setUp(self):
+        # synthetic grid mesh, 250k vertices
+        bm = bmesh.new()
+        bmesh.ops.create_grid(bm, x_segments=499, y_segments=499, size=1.0)
+        self.mesh = bpy.data.meshes.new('MeshPrimvarsTest')
+        bm.to_mesh(self.mesh)
+        bm.free()
+
+    def tearDown(self):
+        bpy.data.meshes.remove(self.mesh)
+
+    def _peak_memory(self, as_numpy):
+        tracemalloc.start()
+        data = object_utils._get_mesh_(self.mesh, get_normals=True, as_numpy=as_numpy)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del data
+        return peak
+
+    # both paths should produce the same data
+    def test_numpy_matches_list(self):
+        (nverts, verts, P, N) = object_utils._get_mesh_(self.mesh, get_normals=True)
+        (np_nverts, np_verts, np_P, np_N) = object_utils._get_mesh_(self.mesh, get_normals=True, as_numpy=True)
+        self.assertEqual(np_nverts.tolist(), nverts)
+        self.assertEqual(np_verts.tolist(), verts)
+        self.assertEqual(np_P.tolist(), P)
+        self.assertEqual(np_N.tolist(), N)
+        self.assertTrue(np_P.flags['C_CONTIGUOUS'])
+
+    # the numpy path should use a fraction of the memory of the list path
+    def test_numpy_memory_usage(self):
+        list_peak = self._peak_memory(as_numpy=False)
+        numpy_peak = self._peak_memory(as_numpy=True)
+        msg = "_get_mesh_ peak memory: lists %.2f MB, numpy %.2f MB" % (list_peak / 1048576.0, numpy_peak / 1048576.0)
+        rfb_log().info(msg)
+        self.assertLess(numpy_peak, list_peak, msg)
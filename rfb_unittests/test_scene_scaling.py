@@ -0,0 +1,94 @@
+import unittest
+import time
+import os
+import bpy
+import rman
+from ..rman_render import RmanRender
+from ..rman_scene import RmanScene
+from ..rfb_logger import rfb_log
+
+# the full benchmark sizes take a while, so only run them when asked to
+if os.environ.get('RFB_UNITTEST_BENCHMARK', ''):
+    __SCALING_SIZES__ = [10000, 100000, 1000000]
+else:
+    __SCALING_SIZES__ = [1000, 10000]
+
+class SceneScalingTest(unittest.TestCase):
+
+    @classmethod
+    def add_tests(self, suite):
+        suite.addTest(SceneScalingTest('test_instance_export_scaling'))
+
+    def setUp(self):
+        # synthetic scene: a camera, and a single vertex emitter that instances
+        # a cube on each of its particles
+        self.bl_scene = bpy.data.scenes.new('SceneScalingTest')
+        self.cam = bpy.data.objects.new('SceneScalingTest_cam', bpy.data.cameras.new('SceneScalingTest_cam'))
+        self.bl_scene.collection.objects.link(self.cam)
+        self.bl_scene.camera = self.cam
+
+        cube_mesh = bpy.data.meshes.new('SceneScalingTest_cube')
+        cube_mesh.from_pydata([(-0.1, -0.1, -0.1), (0.1, -0.1, -0.1), (0.1, 0.1, -0.1), (-0.1, 0.1, -0.1),
+                               (-0.1, -0.1, 0.1), (0.1, -0.1, 0.1), (0.1, 0.1, 0.1), (-0.1, 0.1, 0.1)],
+                              [], [(0, 1, 2, 3), (4, 7, 6, 5), (0, 4, 5, 1), (1, 5, 6, 2), (2, 6, 7, 3), (3, 7, 4, 0)])
+        self.cube = bpy.data.objects.new('SceneScalingTest_cube', cube_mesh)
+        self.bl_scene.collection.objects.link(self.cube)
+
+        emitter_mesh = bpy.data.meshes.new('SceneScalingTest_emitter')
+        emitter_mesh.from_pydata([(-10, -10, 0), (10, -10, 0), (10, 10, 0), (-10, 10, 0)], [], [(0, 1, 2, 3)])
+        self.emitter = bpy.data.objects.new('SceneScalingTest_emitter', emitter_mesh)
+        self.bl_scene.collection.objects.link(self.emitter)
+        self.emitter.modifiers.new('SceneScalingTest_psys', 'PARTICLE_SYSTEM')
+        self.psys_settings = self.emitter.particle_systems[0].settings
+        self.psys_settings.frame_start = self.bl_scene.frame_current
+        self.psys_settings.frame_end = self.bl_scene.frame_current
+        self.psys_settings.lifetime = 1000
+        self.psys_settings.physics_type = 'NO'
+        self.psys_settings.render_type = 'OBJECT'
+        self.psys_settings.instance_object = self.cube
+
+    def tearDown(self):
+        psys_settings = self.psys_settings
+        for ob in [self.emitter, self.cube, self.cam]:
+            data = ob.data
+            bpy.data.objects.remove(ob)
+            if isinstance(data, bpy.types.Mesh):
+                bpy.data.meshes.remove(data)
+            else:
+                bpy.data.cameras.remove(data)
+        bpy.data.particles.remove(psys_settings)
+        bpy.data.scenes.remove(self.bl_scene)
+
+    def _export(self, num_instances):
+        self.psys_settings.count = num_instances
+        depsgraph = self.bl_scene.view_layers[0].depsgraph
+        depsgraph.update()
+
+        rman_render = RmanRender.get_rman_render()
+        rman_scene = RmanScene(rman_render=rman_render)
+        config = rman.Types.RtParamList()
+        render_config = rman.Types.RtParamList()
+        sg_scene = rman_render.sgmngr.CreateScene(config, render_config, rman_render.stats_mgr.rman_stats_session)
+        try:
+            start = time.perf_counter()
+            rman_scene.export_for_final_render(depsgraph, sg_scene, depsgraph.view_layer, is_external=True)
+            elapsed = time.perf_counter() - start
+            num_exported = len(rman_scene.rman_instance_owners)
+        finally:
+            rman_render.sgmngr.DeleteScene(sg_scene)
+            rman_scene.reset()
+        return (elapsed, num_exported)
+
+    # time per instance should stay roughly flat as the scene grows
+    def test_instance_export_scaling(self):
+        per_instance = list()
+        for num_instances in __SCALING_SIZES__:
+            (elapsed, num_exported) = self._export(num_instances)
+            self.assertGreaterEqual(num_exported, num_instances)
+            per_instance.append(elapsed / num_exported)
+            rfb_log().info("Scene scaling: %d instances: %.2f secs total, %.2f us per instance" %
+                           (num_exported, elapsed, per_instance[-1] * 1e6))
+
+        # allow for some noise, but anything close to quadratic would be
+        # at least ten times slower per instance
+        self.assertLess(per_instance[-1], per_instance[0] * 3.0)
@@ -0,0 +1,52 @@
+import unittest
+from ..rman_sg_nodes.rman_sg_node import RmanSgNode
+from ..rman_sg_nodes.rman_sg_node_dict import RmanSgNodeDict
+
+class SgNodeDictTest(unittest.TestCase):
+
+    @classmethod
+    def add_tests(self, suite):
+        suite.addTest(SgNodeDictTest('test_find_db_name'))
+        suite.addTest(SgNodeDictTest('test_remap'))
+        suite.addTest(SgNodeDictTest('test_set_db_name'))
+        suite.addTest(SgNodeDictTest('test_remove'))
+
+    def setUp(self):
+        self.rman_objects = RmanSgNodeDict()
+        for i in range(10):
+            self.rman_objects['ob%d' % i] = RmanSgNode(None, None, 'Object%d' % i)
+
+    def test_find_db_name(self):
+        key, rman_sg_node = self.rman_objects.find_db_name('Object3')
+        self.assertEqual(key, 'ob3')
+        self.assertIs(rman_sg_node, self.rman_objects['ob3'])
+        self.assertEqual(self.rman_objects.find_db_name('Object10'), (None, None))
+
+    # undo/redo gives us a new key for the same node
+    def test_remap(self):
+        rman_sg_node = self.rman_objects['ob3']
+        self.rman_objects.remap('ob3', 'ob3_undo')
+        self.assertNotIn('ob3', self.rman_objects)
+        self.assertEqual(self.rman_objects.find_db_name('Object3'), ('ob3_undo', rman_sg_node))
+
+    def test_set_db_name(self):
+        rman_sg_node = self.rman_objects['ob3']
+        self.rman_objects.set_db_name('ob3', 'Renamed')
+        self.assertEqual(rman_sg_node.db_name, 'Renamed')
+        self.assertEqual(self.rman_objects.find_db_name('Object3'), (None, None))
+        self.assertEqual(self.rman_objects.find_db_name('Renamed'), ('ob3', rman_sg_node))
+
+        # changing db_name directly should not give us a wrong answer
+        rman_sg_node.db_name = 'Renamed2'
+        self.assertEqual(self.rman_objects.find_db_name('Renamed'), (None, None))
+
+    def test_remove(self):
+        del self.rman_objects['ob1']
+        self.rman_objects.pop('ob2')
+        self.rman_objects['ob4'] = RmanSgNode(None, None, 'Replaced')
+        self.assertEqual(self.rman_objects.find_db_name('Object1'), (None, None))
+        self.assertEqual(self.rman_objects.find_db_name('Object2'), (None, None))
+        self.assertEqual(self.rman_objects.find_db_name('Object4'), (None, None))
+        self.assertEqual(self.rman_objects.find_db_name('Replaced')[0], 'ob4')
+        self.rman_objects.clear()
+        self.assertEqual(self.rman_objects.find_db_name('Object5'), (None, None))
@@ -0,0 +1,77 @@
+import unittest
+import time
+import bpy
+from .. import rman_bl_nodes
+from ..rfb_utils import shadergraph_utils
+from ..rfb_logger import rfb_log
+
+class ShaderGraphUtilsTest(unittest.TestCase):
+
+    @classmethod
+    def add_tests(self, suite):
+        suite.addTest(ShaderGraphUtilsTest('test_gather_nodes_deep'))
+        suite.addTest(ShaderGraphUtilsTest('test_gather_nodes_wide'))
+
+    def setUp(self):
+        self.mat = bpy.data.materials.new('ShaderGraphUtilsTest')
+        self.mat.use_nodes = True
+        self.nt = self.mat.node_tree
+        self.nt.nodes.clear()
+        self.out = self.nt.nodes.new('RendermanOutputNode')
+        self.bxdf = self.nt.nodes.new(rman_bl_nodes.__BL_NODES_MAP__['PxrConstant'])
+        self.nt.links.new(self.bxdf.outputs[0], self.out.inputs['Bxdf'])
+
+    def tearDown(self):
+        bpy.data.materials.remove(self.mat)
+
+    def _new_node(self, node_type):
+        return self.nt.nodes.new(rman_bl_nodes.__BL_NODES_MAP__[node_type])
+
+    def _check_order(self, nodes):
+        # every node should appear once, after all of its upstream nodes
+        self.assertEqual(len(nodes), len(set(nodes)))
+        index = dict([(n, i) for i, n in enumerate(nodes)])
+        for n in nodes:
+            if isinstance(n, tuple):
+                continue
+            for socket in n.inputs:
+                if socket.is_linked:
+                    self.assertLess(index[socket.links[0].from_node], index[n])
+
+    def _gather(self, label):
+        start = time.perf_counter()
+        terminal_nodes = shadergraph_utils.gather_terminal_nodes(self.out)
+        elapsed = time.perf_counter() - start
+        nodes = terminal_nodes['Bxdf']
+        rfb_log().info("gather_terminal_nodes: %s: %d nodes, %.2f ms" % (label, len(nodes), elapsed * 1e3))
+        return nodes
+
+    # a chain of mix nodes, each with both inputs connected to the previous node.
+    # Without memoization this takes 2^depth visits.
+    def test_gather_nodes_deep(self):
+        prev = self._new_node('PxrNoise')
+        for depth in range(1, 201):
+            mix = self._new_node('PxrMix')
+            self.nt.links.new(prev.outputs['resultRGB'], mix.inputs['color1'])
+            self.nt.links.new(prev.outputs['resultRGB'], mix.inputs['color2'])
+            prev = mix
+            if depth in [10, 50, 200]:
+                self.nt.links.new(prev.outputs['resultRGB'], self.bxdf.inputs['emitColor'])
+                nodes = self._gather('depth %d' % depth)
+                self.assertEqual(len(nodes), depth + 2)
+                self._check_order(nodes)
+
+    # one noise node shared by many mix nodes, which are chained together
+    def test_gather_nodes_wide(self):
+        noise = self._new_node('PxrNoise')
+        prev = noise
+        for width in range(1, 1001):
+            mix = self._new_node('PxrMix')
+            self.nt.links.new(noise.outputs['resultRGB'], mix.inputs['color1'])
+            self.nt.links.new(prev.outputs['resultRGB'], mix.inputs['color2'])
+            prev = mix
+            if width in [10, 100, 1000]:
+                self.nt.links.new(prev.outputs['resultRGB'], self.bxdf.inputs['emitColor'])
+                nodes = self._gather('width %d' % width)
+                self.assertEqual(len(nodes), width + 2)
+                self._check_order(nodes)
@@ -0,0 +1,247 @@
+from .prefs_utils import get_pref
+from ..rfb_logger import rfb_log
+from collections import OrderedDict
+import numpy as np
+import threading
+import tempfile
+import struct
+import json
+import os
+
+__RFB_GEOCACHE__ = None
+
+__GEOCACHE_MAGIC__ = b'RFBGEO01'
+__GEOCACHE_EXT__ = '.rfbgeo'
+__GEOCACHE_ALIGN__ = 64
+# bump this whenever the layout of the cached mesh data changes, so that
+# entries written by an older version are never read back
+__GEOCACHE_VERSION__ = 1
+
+def _align(offset):
+    return (offset + __GEOCACHE_ALIGN__ - 1) // __GEOCACHE_ALIGN__ * __GEOCACHE_ALIGN__
+
+def _flatten(data, arrays):
+    # Turn data into something we can write out as JSON. NumPy arrays
+    # are replaced with an index into arrays.
+    if isinstance(data, np.ndarray):
+        arrays.append(np.ascontiguousarray(data))
+        return {'__array__': len(arrays) - 1}
+    if isinstance(data, np.generic):
+        return data.item()
+    if isinstance(data, dict):
+        return {'__dict__': [[_flatten(k, arrays), _flatten(v, arrays)] for k, v in data.items()]}
+    if isinstance(data, tuple):
+        return {'__tuple__': [_flatten(v, arrays) for v in data]}
+    if isinstance(data, list):
+        return [_flatten(v, arrays) for v in data]
+    if data is None or isinstance(data, (bool, int, float, str)):
+        return data
+    raise TypeError("Cannot cache value of type %s" % type(data).__name__)
+
+def _unflatten(data, arrays):
+    if isinstance(data, dict):
+        if '__array__' in data:
+            return arrays[data['__array__']]
+        if '__dict__' in data:
+            return dict([(_unflatten(k, arrays), _unflatten(v, arrays)) for k, v in data['__dict__']])
+        if '__tuple__' in data:
+            return tuple([_unflatten(v, arrays) for v in data['__tuple__']])
+    if isinstance(data, list):
+        return [_unflatten(v, arrays) for v in data]
+    return data
+
+class RfBGeoCache(object):
+    '''
+    An on-disk cache of translated mesh data (see rman_mesh_translator.build_mesh_data).
+    Each entry is a single file holding a JSON header followed by the raw arrays,
+    which are memory mapped when read back. The total size of the cache is bounded,
+    with the least recently used entries evicted first.
+
+    Attributes:
+        cache_dir (str) - directory the cache files live in
+        max_size (int) - maximum size of the cache, in bytes
+        hits (int) - number of lookups that found an entry
+        misses (int) - number of lookups that did not find an entry
+        evictions (int) - number of entries removed to stay under max_size
+    '''
+
+    def __init__(self, cache_dir, max_size):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total_size = 0
+        self._scan()
+
+    def _scan(self):
+        # pick up entries left from previous sessions, oldest first
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        entries = []
+        for f in os.listdir(self.cache_dir):
+            if not f.endswith(__GEOCACHE_EXT__):
+                continue
+            st = os.stat(os.path.join(self.cache_dir, f))
+            entries.append((st.st_mtime, f[:-len(__GEOCACHE_EXT__)], st.st_size))
+        for mtime, key, size in sorted(entries):
+            self._entries[key] = size
+            self._total_size += size
+
+    def _get_path(self, key):
+        return os.path.join(self.cache_dir, key + __GEOCACHE_EXT__)
+
+    def _read(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(__GEOCACHE_MAGIC__)) != __GEOCACHE_MAGIC__:
+                raise IOError("Not a geometry cache file: %s" % path)
+            header_len = struct.unpack('<Q', f.read(8))[0]
+            header = json.loads(f.read(header_len).decode('utf-8'))
+        data_start = _align(len(__GEOCACHE_MAGIC__) + 8 + header_len)
+
+        # map the file copy-on-write, so callers get writable arrays
+        # without us having to read the whole file in
+        buf = np.memmap(path, dtype=np.uint8, mode='c')
+        arrays = []
+        for dtype, shape, offset in header['arrays']:
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape)) if shape else 1
+            start = data_start + offset
+            arr = buf[start:start + count * dtype.itemsize].view(dtype=dtype, type=np.ndarray).reshape(shape)
+            arrays.append(arr)
+        return _unflatten(header['data'], arrays)
+
+    def _write(self, path, data):
+        arrays = []
+        skeleton = _flatten(data, arrays)
+        offset = 0
+        array_descs = []
+        for arr in arrays:
+            array_descs.append([arr.dtype.str, list(arr.shape), offset])
+            offset = _align(offset + arr.nbytes)
+        header = json.dumps({'data': skeleton, 'arrays': array_descs}).encode('utf-8')
+        data_start = _align(len(__GEOCACHE_MAGIC__) + 8 + len(header))
+
+        # write to a temporary file first, so readers never see a partial entry
+        tmp_path = '%s.%d.tmp' % (path, threading.get_ident())
+        with open(tmp_path, 'wb') as f:
+            f.write(__GEOCACHE_MAGIC__)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            for arr, (dtype, shape, offset) in zip(arrays, array_descs):
+                f.seek(data_start + offset)
+                f.write(arr.tobytes())
+            size = f.tell()
+        os.replace(tmp_path, path)
+        return size
+
+    def _evict(self):
+        while self._total_size > self.max_size and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_size -= size
+            self.evictions += 1
+            try:
+                os.remove(self._get_path(key))
+            except OSError as e:
+                rfb_log().debug("Could not remove geometry cache entry %s: %s" % (key, str(e)))
+
+    def get(self, key):
+        """ Look up an entry in the cache
+
+        Args:
+            key (str) - the cache key (see rman_mesh_translator.get_geo_cache_key)
+
+        Returns:
+            (dict) - the cached mesh data, or None if there is no entry for key
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+        path = self._get_path(key)
+        try:
+            data = self._read(path)
+            # keep the on-disk order in sync, for the next session
+            os.utime(path, None)
+        except Exception as e:
+            rfb_log().debug("Could not read geometry cache entry %s: %s" % (key, str(e)))
+            with self._lock:
+                size = self._entries.pop(key, None)
+                if size is not None:
+                    self._total_size -= size
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """ Add an entry to the cache, evicting the least recently used
+        entries if the cache grows past max_size.
+
+        Args:
+            key (str) - the cache key (see rman_mesh_translator.get_geo_cache_key)
+            data (dict) - the mesh data to store
+        """
+        path = self._get_path(key)
+        try:
+            size = self._write(path, data)
+        except Exception as e:
+            rfb_log().debug("Could not write geometry cache entry %s: %s" % (key, str(e)))
+            return
+        with self._lock:
+            old_size = self._entries.pop(key, None)
+            if old_size is not None:
+                self._total_size -= old_size
+            self._entries[key] = size
+            self._total_size += size
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            for key in self._entries.keys():
+                try:
+                    os.remove(self._get_path(key))
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._total_size = 0
+
+    def get_stats(self):
+        """ Returns:
+            (dict) - hits, misses, evictions, number of entries and size in bytes
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'size': self._total_size}
+
+def get_geocache():
+    """ Get the geometry cache, if the user has turned it on in the preferences.
+
+    Returns:
+        (RfBGeoCache) - the geometry cache, or None if caching is off
+    """
+    global __RFB_GEOCACHE__
+    if not get_pref('rman_geo_cache_enable', default=False):
+        return None
+
+    cache_dir = get_pref('rman_geo_cache_dir', default='')
+    if cache_dir == '':
+        cache_dir = os.path.join(tempfile.gettempdir(), 'rfb_geocache')
+    max_size = get_pref('rman_geo_cache_size', default=4096) * 1024 * 1024
+
+    if __RFB_GEOCACHE__ is None or __RFB_GEOCACHE__.cache_dir != cache_dir:
+        try:
+            __RFB_GEOCACHE__ = RfBGeoCache(cache_dir, max_size)
+        except OSError as e:
+            rfb_log().error("Could not open geometry cache in %s: %s" % (cache_dir, str(e)))
+            __RFB_GEOCACHE__ = None
+            return None
+    elif __RFB_GEOCACHE__.max_size != max_size:
+        with __RFB_GEOCACHE__._lock:
+            __RFB_GEOCACHE__.max_size = max_size
+            __RFB_GEOCACHE__._evict()
+    return __RFB_GEOCACHE__
@@ -132,6 +132,10 @@ def _is_deforming_(ob):
 
     return is_deforming_fluid(ob)
 
+def is_hair_deforming(ob, psys):
+    # hair only moves with dynamics, or if the emitter deforms
+    return psys.use_hair_dynamics or _is_deforming_(ob)
+
 def is_transforming(ob, recurse=False):
     transforming = (ob.animation_data is not None)
     if not transforming and ob.parent:
@@ -140,6 +144,139 @@ def is_transforming(ob, recurse=False):
             transforming = ob.parent.data.use_path
     return transforming
 
+def _has_animated_paths_(id, prefixes):
+    # check if any fcurve or driver of id animates a property
+    # starting with one of prefixes. If prefixes is empty, any animation counts.
+    anim = getattr(id, 'animation_data', None)
+    if not anim:
+        return False
+    fcurves = list(anim.drivers)
+    if anim.action:
+        fcurves.extend(anim.action.fcurves)
+    for fc in fcurves:
+        if not prefixes or fc.data_path.startswith(prefixes):
+            return True
+    return False
+
+def is_geometry_animated(ob):
+    """ Conservative check for whether the geometry of an object can change
+    from frame to frame: deforming and time dependent modifiers, shape keys,
+    animated object data, animated modifier settings, and modifiers that depend
+    on other objects.
+
+    Args:
+        ob (bpy.types.Object) - the object to check
+
+    Returns:
+        (bool) - True if the geometry may change when the frame changes
+    """
+    # modifiers whose result depends on the current time, even if none of
+    # their settings are animated
+    time_dependent_modifiers = ['BUILD', 'OCEAN', 'NODES', 'PARTICLE_INSTANCE']
+    if _is_deforming_(ob):
+        return True
+    for mod in ob.modifiers:
+        if mod.type in time_dependent_modifiers:
+            return True
+    if ob.type in ('META', 'GPENCIL'):
+        # metaballs depend on the rest of their family, grease pencil
+        # has its own frames
+        return True
+    if ob.type == 'VOLUME' and ob.data and ob.data.is_sequence:
+        return True
+    if ob.modifiers and _get_modifiers_fingerprint_(ob) is None:
+        return True
+    if _has_animated_paths_(ob, ('modifiers',)):
+        return True
+    if ob.data:
+        if _has_animated_paths_(ob.data, ()):
+            return True
+        shape_keys = getattr(ob.data, 'shape_keys', None)
+        if shape_keys and _has_animated_paths_(shape_keys, ()):
+            return True
+    return False
+
+def _get_modifiers_fingerprint_(ob):
+    """ Build a hashable fingerprint of the renderable modifier stack of an object.
+
+    Args:
+        ob (bpy.types.Object) - the object to fingerprint
+
+    Returns:
+        (tuple) - the fingerprint, or None if the modifier results depend on 
+                  something other than the object's own data (ex: another object)
+    """
+    skip_props = ['rna_type', 'name', 'show_viewport', 'show_in_editmode',
+                  'show_on_cage', 'show_expanded', 'is_active', 'is_override_data',
+                  'use_apply_on_spline']
+    fingerprint = []
+    for mod in ob.modifiers:
+        if not mod.show_render:
+            continue
+        if mod.type == 'NODES':
+            # geometry nodes can depend on anything
+            return None
+        values = []
+        for prop in mod.bl_rna.properties:
+            if prop.identifier in skip_props or prop.type == 'COLLECTION':
+                continue
+            val = getattr(mod, prop.identifier, None)
+            if prop.type == 'POINTER':
+                if val is None:
+                    values.append(None)
+                elif isinstance(val, bpy.types.Object) or not isinstance(val, bpy.types.ID):
+                    # results depend on another object, or on nested settings
+                    return None
+                else:
+                    values.append(val.name_full)
+            elif isinstance(val, set):
+                values.append(tuple(sorted(val)))
+            elif getattr(prop, 'is_array', False):
+                values.append(tuple(val))
+            else:
+                values.append(val)
+        fingerprint.append((mod.type, tuple(values)))
+    return tuple(fingerprint)
+
+def _get_primvars_fingerprint_(ob):
+    # fingerprint of the object level primvars. See RmanTranslator.export_object_primvars
+    rm = ob.renderman
+    fingerprint = []
+    for prop_name, meta in rm.prop_meta.items():
+        if 'primvar' not in meta:
+            continue
+        val = getattr(rm, prop_name)
+        if getattr(val, '__len__', None) and not isinstance(val, str):
+            val = tuple(val)
+        fingerprint.append((prop_name, val))
+    return tuple(fingerprint)
+
+def get_mesh_prototype_key(ob, motion_segments=1):
+    """ Return a key that can be used to share a single mesh scene graph node 
+    between objects that use the same mesh datablock. Objects that return the same key
+    are guaranteed to produce the same geometry.
+
+    Args:
+        ob (bpy.types.Object) - the evaluated mesh object
+        motion_segments (int) - number of deformation motion samples for this object
+
+    Returns:
+        (tuple) - the prototype key, or None if the mesh for this object cannot be shared
+    """
+    if ob.type != 'MESH' or not ob.data:
+        return None
+    if len(ob.particle_systems) > 0:
+        # particles are children of the mesh node
+        return None
+    modifiers_fingerprint = _get_modifiers_fingerprint_(ob)
+    if modifiers_fingerprint is None:
+        return None
+
+    # vertex group names are stored on the object, not the mesh
+    vgroups = tuple([vg.name for vg in ob.vertex_groups])
+    return (ob.data.original, ob.renderman.primitive, motion_segments,
+            modifiers_fingerprint, vgroups, _get_primvars_fingerprint_(ob))
+
 def _detect_primitive_(ob):
 
     if isinstance(ob, bpy.types.ParticleSystem):
@@ -197,57 +334,117 @@ def get_active_material(ob):
                 break
     return mat
 
+def _get_material_ids_(mesh):
+    """ Get the material index of every face in mesh
+
+    Args:
+        mesh (bpy.types.Mesh) - the mesh
+
+    Returns:
+        (numpy.ndarray) - int32 array of material indices, one per face
+    """
+    material_ids = np.zeros(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('material_index', material_ids)
+    return material_ids
+
+def _get_mats_faces_(material_ids):
+    """ Group face indices by material index
+
+    Args:
+        material_ids (numpy.ndarray) - material index of every face, see _get_material_ids_
+
+    Returns:
+        (dict) - material index to a contiguous int32 array of face indices, in
+                 ascending order
+    """
+    if len(material_ids) < 1:
+        return dict()
+    order = np.argsort(material_ids, kind='stable').astype(np.int32)
+    mat_ids, starts = np.unique(material_ids[order], return_index=True)
+    return dict(zip(mat_ids.tolist(), np.split(order, starts[1:])))
+
 def _get_used_materials_(ob):
     if ob.type == 'MESH' and len(ob.data.materials) > 0:
         if len(ob.data.materials) == 1:
             return [ob.data.materials[0]]
-        mat_ids = []
         mesh = ob.data
-        num_materials = len(ob.data.materials)
-        for p in mesh.polygons:
-            if p.material_index not in mat_ids:
-                mat_ids.append(p.material_index)
-            if num_materials == len(mat_ids):
-                break
-        return [mesh.materials[i] for i in mat_ids]
+        mat_ids = np.unique(_get_material_ids_(mesh))
+        return [mesh.materials[i] for i in mat_ids.tolist()]
     else:
         return [ob.active_material]     
 
-def _get_mesh_points_(mesh):
+def _get_mesh_points_(mesh, as_numpy=False):
     nvertices = len(mesh.vertices)
     P = np.zeros(nvertices*3, dtype=np.float32)
     mesh.vertices.foreach_get('co', P)
     P = np.reshape(P, (nvertices, 3))
+    if as_numpy:
+        return P
     return P.tolist()
 
-def _get_mesh_(mesh, get_normals=False):
+def _get_mesh_normals_(mesh, as_numpy=False):
+    """ Extract the normals of a mesh. If any of the faces are smooth shaded, 
+    these are the per-loop (facevarying) normals, otherwise the per-face (uniform) normals.
+
+    Args:
+        mesh (bpy.types.Mesh) - the mesh to extract normals from
+        as_numpy (bool) - return a NumPy array instead of a Python list
 
-    P = _get_mesh_points_(mesh)
+    Returns:
+        (numpy.ndarray) - the normals
+    """
+    npolygons = len(mesh.polygons)
+    loops = len(mesh.loops)
+    fastsmooth = np.zeros(npolygons, dtype=np.int32)
+    mesh.polygons.foreach_get('use_smooth', fastsmooth)
+    if mesh.use_auto_smooth or fastsmooth.any():
+        mesh.calc_normals_split()
+        fastnormals = np.zeros(loops*3, dtype=np.float32)
+        mesh.loops.foreach_get('normal', fastnormals)
+        N = np.reshape(fastnormals, (loops, 3))
+    else:            
+        fastnormals = np.zeros(npolygons*3, dtype=np.float32)
+        mesh.polygons.foreach_get('normal', fastnormals)
+        N = np.reshape(fastnormals, (npolygons, 3))
+    if as_numpy:
+        return N
+    return N.tolist()
+
+def _get_mesh_(mesh, get_normals=False, as_numpy=False):
+    """ Extract the topology, points and normals of a mesh
+
+    Args:
+        mesh (bpy.types.Mesh) - the mesh to extract data from
+        get_normals (bool) - whether to also extract normals
+        as_numpy (bool) - return contiguous float32/int32 NumPy arrays instead of 
+                          Python lists. These can be handed to the RixParamList
+                          setters without a list round-trip 
+                          (see scenegraph_utils.set_primvar_array)
+
+    Returns:
+        (tuple) - (nverts, verts, P, N)
+    """
+
+    P = _get_mesh_points_(mesh, as_numpy=as_numpy)
     N = []    
 
     npolygons = len(mesh.polygons)
-    fastnvertices = np.zeros(npolygons, dtype=np.int)
+    fastnvertices = np.zeros(npolygons, dtype=np.int32)
     mesh.polygons.foreach_get('loop_total', fastnvertices)
-    nverts = fastnvertices.tolist()
+    nverts = fastnvertices
 
     loops = len(mesh.loops)
-    fastvertices = np.zeros(loops, dtype=np.int)
+    fastvertices = np.zeros(loops, dtype=np.int32)
     mesh.loops.foreach_get('vertex_index', fastvertices)
-    verts = fastvertices.tolist()
+    verts = fastvertices
 
     if get_normals:
-        fastsmooth = np.zeros(npolygons, dtype=np.int)
-        mesh.polygons.foreach_get('use_smooth', fastsmooth)
-        if mesh.use_auto_smooth or True in fastsmooth:
-            mesh.calc_normals_split()
-            fastnormals = np.zeros(loops*3, dtype=np.float32)
-            mesh.loops.foreach_get('normal', fastnormals)
-            fastnormals = np.reshape(fastnormals, (loops, 3))
-            N = fastnormals.tolist()            
-        else:            
-            fastnormals = np.zeros(npolygons*3, dtype=np.float32)
-            mesh.polygons.foreach_get('normal', fastnormals)
-            fastnormals = np.reshape(fastnormals, (npolygons, 3))
-            N = fastnormals.tolist()
-
-    return (nverts, verts, P, N)
\ No newline at end of file
+        N = _get_mesh_normals_(mesh, as_numpy=True)
+
+    if not as_numpy:
+        nverts = nverts.tolist()
+        verts = verts.tolist()
+        if len(N) > 0:
+            N = N.tolist()
+
+    return (nverts, verts, P, N)
@@ -346,6 +346,297 @@ def set_frame_sensitive(rman_sg_node, prop):
     else:
         rman_sg_node.is_frame_sensitive = False  
 
+def _set_string_param(params, param_name, val):
+    if val == __RMAN_EMPTY_STRING__:
+        val = ""
+    params.SetString(param_name, val)
+
+# RtParamList setters for each param type, for values and references
+__RIX_PARAM_SETTERS__ = {
+    'float': lambda params, param_name, val: params.SetFloat(param_name, float(val)),
+    'int': lambda params, param_name, val: params.SetInteger(param_name, int(val)),
+    'color': lambda params, param_name, val: params.SetColor(param_name, val),
+    'string': _set_string_param,
+    'point': lambda params, param_name, val: params.SetPoint(param_name, val),
+    'vector': lambda params, param_name, val: params.SetVector(param_name, val),
+    'normal': lambda params, param_name, val: params.SetNormal(param_name, val)
+}
+
+__RIX_PARAM_REF_SETTERS__ = {
+    'float': lambda params, param_name, val: params.SetFloatReference(param_name, val),
+    'int': lambda params, param_name, val: params.SetIntegerReference(param_name, val),
+    'color': lambda params, param_name, val: params.SetColorReference(param_name, val),
+    'point': lambda params, param_name, val: params.SetPointReference(param_name, val),
+    'vector': lambda params, param_name, val: params.SetVectorReference(param_name, val),
+    'normal': lambda params, param_name, val: params.SetNormalReference(param_name, val),
+    'struct': lambda params, param_name, val: params.SetStructReference(param_name, val),
+    'bxdf': lambda params, param_name, val: params.SetBxdfReference(param_name, val)
+}
+
+# emission plans, keyed by node class
+__RMAN_NODE_PARAM_PLANS__ = dict()
+
+class RmanParamPlanEntry(object):
+    '''
+    Everything set_node_rixparams needs to know about a single parameter
+    of a node class, that doesn't depend on the node instance.
+
+    Attributes:
+        prop_name (str) - name of the Blender property
+        param_name (str) - name of the RenderMan parameter
+        param_type (str) - RenderMan type of the parameter
+        meta (dict) - the parameter's prop_meta
+        linked_mode (str) - what to do when the input socket is linked, 'reference' or 'skip'
+        is_vstruct_member (bool) - whether this parameter is a member of a vstruct
+        vstructmember (tuple) - the vstruct name and member, if is_vstruct_member
+        value_mode (str) - how to get the value when the parameter is not linked. One of
+                           'skip', 'string', 'array', 'colorramp', 'floatramp' or 'value'
+        string_mode (str) - for strings, 'ies', 'texture', 'assetidoutput' or 'plain'
+        string_display (str) - display to expand the path with, for assetidoutput strings
+        array_type (str) - RenderMan type of the array members, for arrays
+        gain_enable (str) - for PxrSurface gains, the name of the property that enables the lobe
+        gain_disabled_val (AnyType) - value to use for the gain when the lobe is disabled
+        default (AnyType) - default value of the parameter, or None
+        always_write (bool) - emit the parameter, even if it is set to the default
+        setter (function) - function(params, param_name, val) to set the value
+        ref_setter (function) - function(params, param_name, val) to set a reference
+    '''
+
+    def __init__(self, prop_name, meta, bl_rna, bl_idname, prop_meta):
+        self.prop_name = prop_name
+        self.meta = meta
+        self.param_type = param_type = meta['renderman_type']
+        self.param_name = param_name = meta['renderman_name']
+
+        if 'arraySize' in meta or 'renderman_array_name' in meta:
+            self.linked_mode = 'skip'
+        else:
+            self.linked_mode = 'reference'
+
+        self.is_vstruct_member = ('vstructmember' in meta)
+        self.vstructmember = tuple(meta['vstructmember'].split('.')) if self.is_vstruct_member else None
+
+        self.string_mode = 'plain'
+        self.string_display = ''
+        self.array_type = ''
+        if param_type in ['struct', 'enum']:
+            # if struct is not linked continue
+            self.value_mode = 'skip'
+        elif param_type == 'string':
+            self.value_mode = 'string'
+            param_widget = meta.get('widget', 'default')
+            options = meta.get('options', '')
+            if param_widget in ['fileinput', 'assetidinput']:
+                if 'ies' in options:
+                    self.string_mode = 'ies'
+                elif ('texture' in options) or ('env' in options) or ('imageplane' in options):
+                    self.string_mode = 'texture'
+            elif param_widget == 'assetidoutput':
+                self.string_mode = 'assetidoutput'
+                self.string_display = 'texture' if 'texture' in options else 'openexr'
+        elif 'renderman_array_name' in meta:
+            self.value_mode = 'skip'
+        elif param_type == 'array':
+            self.value_mode = 'array'
+            self.array_type = meta['renderman_array_type']
+        elif param_type in ['colorramp', 'floatramp']:
+            self.value_mode = param_type
+        else:
+            self.value_mode = 'value'
+
+        self.gain_enable = None
+        self.gain_disabled_val = None
+        if bl_idname == 'PxrSurfaceBxdfNode' and prop_name in __GAINS_TO_ENABLE__:
+            self.gain_enable = __GAINS_TO_ENABLE__[prop_name]
+            self.gain_disabled_val = [0, 0, 0] if param_type == 'color' else 0
+
+        self.default = None
+        bl_prop = bl_rna.properties.get(__RESERVED_BLENDER_NAMES__.get(param_name, param_name), None)
+        if bl_prop:
+            if getattr(bl_prop, 'default_array', None):
+                self.default = [p for p in bl_prop.default_array]
+            else:
+                self.default = bl_prop.default
+
+        # Check if this param is marked always_write.
+        # We still have some plugins where the Args file and C++ don't agree
+        # on default behavior
+        self.always_write = False
+        if param_name in prop_meta:
+            self.always_write = prop_meta[param_name].get('always_write', False)
+
+        self.setter = __RIX_PARAM_SETTERS__.get(param_type, None)
+        self.ref_setter = __RIX_PARAM_REF_SETTERS__.get(param_type, lambda params, param_name, val: None)
+
+def _build_node_param_plan(cls, plugin_name):
+    plan = []
+    prop_meta = getattr(cls, 'prop_meta', dict())
+    bl_rna = cls.bl_rna
+    bl_idname = bl_rna.identifier
+    for prop_name, meta in prop_meta.items():
+        if plugin_name == 'PxrRamp' and prop_name in ['colors', 'positions']:
+            continue
+        if meta.get('widget', 'default') == 'null' and 'vstructmember' not in meta:
+            # if widget is marked null, don't export parameter and rely on default
+            # unless it has a vstructmember
+            continue
+        if meta['renderman_type'] == 'page':
+            continue
+        if prop_name == 'inputMaterial' or \
+                ('vstruct' in meta and meta['vstruct'] is True) or \
+                ('type' in meta and meta['type'] == 'vstruct'):
+            continue
+        plan.append(RmanParamPlanEntry(prop_name, meta, bl_rna, bl_idname, prop_meta))
+    return plan
+
+def register_node_param_plan(cls, plugin_name):
+    '''Build the parameter emission plan for a node class. This is called
+    when the node class is registered. Classes registered elsewhere get their plan
+    built the first time set_node_rixparams sees them.
+
+    Arguments:
+        cls (class) - the registered node or PropertyGroup class
+        plugin_name (str) - name of the RenderMan plugin the class is for
+    '''
+    __RMAN_NODE_PARAM_PLANS__[cls] = _build_node_param_plan(cls, plugin_name)
+
+def get_node_param_plan(node):
+    '''Get the parameter emission plan for node's class.
+
+    Arguments:
+        node (bpy.types.Node) - the node
+
+    Returns:
+        (list) - list of RmanParamPlanEntry, in prop_meta order
+    '''
+    plan = __RMAN_NODE_PARAM_PLANS__.get(node.__class__, None)
+    if plan is None:
+        plan = _build_node_param_plan(node.__class__, node.plugin_name)
+        __RMAN_NODE_PARAM_PLANS__[node.__class__] = plan
+    return plan
+
+def _is_default_param_value(params, entry, val):
+    # same check as set_rix_param, using the default from the plan
+    dflt = entry.default
+
+    # FIXME/TODO: currently, the python version of RtParamList
+    # doesn't allow us to retrieve existing values. For now, only do the
+    # default check when the param is not in there. Otherwise, we risk
+    # not setting the value during IPR, if the user happens to change
+    # the param val back to default. 
+    if dflt is None or params.HasParam(entry.param_name):
+        return False
+
+    param_type = entry.param_type
+    if isinstance(val, list):
+        dflt = list(dflt)
+
+    if ((isinstance(val, str) or isinstance(dflt, str))):
+        # these explicit conversions are necessary because of EnumProperties
+        if param_type == 'string' and val == __RMAN_EMPTY_STRING__:
+            val = ""
+        elif param_type == 'int':
+            val = int(val)
+            dflt = int(dflt)
+        elif param_type == 'float':
+            val = float(val)
+            dflt = float(dflt)
+    elif param_type == 'int' and (isinstance(val, bool) or isinstance(dflt, bool)):
+        # convert bools into ints
+        val = int(val)
+        dflt = int(dflt)
+
+    if entry.always_write:
+        return False
+
+    return val == dflt
+
+def _fingerprint_value(val):
+    if val is None or isinstance(val, (bool, int, float, str)):
+        return val
+    if isinstance(val, bpy.types.ID):
+        return val.name_full
+    try:
+        return tuple(val)
+    except TypeError:
+        return str(val)
+
+def get_node_fingerprint(node, mat_name, ob=None):
+    '''Get a fingerprint of everything set_node_rixparams reads from node,
+    so that we can tell if the shader for the node needs to be rebuilt.
+
+    Arguments:
+        node (bpy.types.Node) - the shading node
+        mat_name (str) - the material handle
+        ob (bpy.types.ID) - the material or light the node belongs to
+
+    Returns:
+        (tuple) - the fingerprint, or None if the node can't be fingerprinted and
+                  should always be rebuilt
+    '''
+
+    if node.bl_idname == "PxrOSLPatternNode":
+        return None
+
+    fingerprint = [node.bl_idname, node.name, mat_name]
+
+    # connections. We only know how to follow links from other RenderMan
+    # nodes, or through reroutes.
+    for input_name, socket in node.inputs.items():
+        if not socket.is_linked:
+            continue
+        link = socket.links[0]
+        from_node = link.from_node
+        from_socket = link.from_socket
+        if from_node.bl_idname == 'NodeReroute':
+            from_node, from_socket = shadergraph_utils.get_rerouted_node(from_node)
+            if from_node is None:
+                fingerprint.append((input_name, None))
+                continue
+        if not hasattr(from_node, 'renderman_node_type'):
+            return None
+        fingerprint.append((input_name, from_node.name, from_socket.identifier))
+
+    for prop_name, meta in node.prop_meta.items():
+        param_type = meta['renderman_type']
+        if param_type in ['page', 'struct', 'vstruct']:
+            continue
+        if 'vstructmember' in meta:
+            # whether a vstruct member gets connected depends on the
+            # conditional expressions of the upstream node, so fold that in
+            vstruct_name = meta['vstructmember'].split('.')[0]
+            if vstruct_name in node.inputs and node.inputs[vstruct_name].is_linked:
+                if node.inputs[vstruct_name].links[0].from_node.bl_idname == 'ShaderNodeGroup':
+                    return None
+                fingerprint.append((prop_name, is_vstruct_and_linked(node, prop_name)))
+        prop = getattr(node, prop_name)
+        if param_type == 'string':
+            # expand tokens, so that frame dependent paths change
+            # the fingerprint when the frame changes
+            val = string_utils.expand_string(prop)
+            tx_val = ''
+            if meta.get('widget', 'default') in ['fileinput', 'assetidinput']:
+                tx_node_id = texture_utils.generate_node_id(node, meta['renderman_name'], ob=ob)
+                tx_val = texture_utils.get_txmanager().get_output_tex_from_id(tx_node_id)
+            fingerprint.append((prop_name, prop, val, tx_val))
+        elif param_type == 'array':
+            array_len = getattr(node, '%s_arraylen' % prop_name)
+            sub_prop_names = getattr(node, prop_name)[:array_len]
+            fingerprint.append((prop_name, tuple([_fingerprint_value(getattr(node, nm)) for nm in sub_prop_names])))
+        elif param_type == 'colorramp':
+            nt = bpy.data.node_groups[node.rman_fake_node_group]
+            color_ramp = nt.nodes[prop].color_ramp
+            fingerprint.append((prop_name, color_ramp.interpolation,
+                                tuple([(e.position, tuple(e.color)) for e in color_ramp.elements])))
+        elif param_type == 'floatramp':
+            nt = bpy.data.node_groups[node.rman_fake_node_group]
+            curve = nt.nodes[prop].mapping.curves[0]
+            fingerprint.append((prop_name, tuple([tuple(p.location) for p in curve.points])))
+        else:
+            fingerprint.append((prop_name, _fingerprint_value(prop)))
+
+    return tuple(fingerprint)
+
 def set_node_rixparams(node, rman_sg_node, params, ob=None, mat_name=None):
     # If node is OSL node get properties from dynamic location.
     if node.bl_idname == "PxrOSLPatternNode":
@@ -382,222 +673,197 @@ def set_node_rixparams(node, rman_sg_node, params, ob=None, mat_name=None):
                 val = string_utils.convert_val(input.default_value, type_hint=prop_type)
                 set_rix_param(params, param_type, param_name, val, is_reference=False)
     else:
+        plan = get_node_param_plan(node)
+        emit_default_params = prefs_utils.get_pref('rman_emit_default_params', False)
+        inputs = getattr(node, 'inputs', None)
+
+        for entry in plan:
+            prop_name = entry.prop_name
+            meta = entry.meta
+            param_type = entry.param_type
+            param_name = entry.param_name
+
+            # if input socket is linked reference that
+            to_socket = inputs.get(prop_name, None) if inputs is not None else None
+            if to_socket is not None and to_socket.is_linked:
+                if entry.linked_mode == 'reference':
+                    from_socket = to_socket.links[0].from_socket
+                    from_node = to_socket.links[0].from_node
+                    val = get_output_param_str(
+                            from_node, mat_name, from_socket, to_socket, param_type)
+                    if val:
+                        entry.ref_setter(params, param_name, val)
+                continue
+
+            # see if vstruct linked
+            if entry.is_vstruct_member and is_vstruct_and_linked(node, prop_name):
+                vstruct_name, vstruct_member = entry.vstructmember
+                from_socket = node.inputs[
+                    vstruct_name].links[0].from_socket
+
+                temp_mat_name = mat_name
+
+                if from_socket.node.bl_idname == 'ShaderNodeGroup':
+                    ng = from_socket.node.node_tree
+                    group_output = next((n for n in ng.nodes if n.bl_idname == 'NodeGroupOutput'),
+                                        None)
+                    if group_output is None:
+                        return False
+
+                    in_sock = group_output.inputs[from_socket.name]
+                    if len(in_sock.links):
+                        from_socket = in_sock.links[0].from_socket
+                        #temp_mat_name = mat_name + '.' + from_socket.node.name
+                        temp_mat_name = mat_name
+                        
+                vstruct_from_param = "%s_%s" % (
+                    from_socket.identifier, vstruct_member)
+                if vstruct_from_param in from_socket.node.output_meta:
+                    actual_socket = from_socket.node.output_meta[
+                        vstruct_from_param]
+
+                    node_meta = node.output_meta                        
+                    node_meta = node_meta.get(vstruct_from_param)
+                    is_reference = True
+                    val = get_output_param_str(
+                           from_socket.node, temp_mat_name, actual_socket, to_socket=None, param_type=param_type)
+                    if node_meta:
+                        expr = node_meta.get('vstructConditionalExpr')
+                        # check if we should connect or just set a value
+                        if expr:
+                            if expr.split(' ')[0] == 'set':
+                                val = 1
+                                is_reference = False      
+                    if val:                  
+                        set_rix_param(params, param_type, param_name, val, is_reference=is_reference)
 
-        for prop_name, meta in node.prop_meta.items():
-            if node.plugin_name == 'PxrRamp' and prop_name in ['colors', 'positions']:
+                else:
+                    rfb_log().warning('Warning! %s not found on %s' %
+                          (vstruct_from_param, from_socket.node.name))
                 continue
 
-            param_widget = meta.get('widget', 'default')
-            param_type = meta['renderman_type']
-            param_name = meta['renderman_name']     
-                   
-            if param_widget == 'null' and 'vstructmember' not in meta:
-                # if widget is marked null, don't export parameter and rely on default
-                # unless it has a vstructmember
+            # else output rib
+            value_mode = entry.value_mode
+            if value_mode == 'skip':
                 continue
 
-            else:
-                prop = getattr(node, prop_name)
-                # if property group recurse
-                if param_type == 'page':
-                    continue
-                elif prop_name == 'inputMaterial' or \
-                        ('vstruct' in meta and meta['vstruct'] is True) or \
-                        ('type' in meta and meta['type'] == 'vstruct'):
-                    continue
-
-                # if input socket is linked reference that
-                elif hasattr(node, 'inputs') and prop_name in node.inputs and \
-                        node.inputs[prop_name].is_linked:
-
-                    to_socket = node.inputs[prop_name]
-                    from_socket = to_socket.links[0].from_socket
-                    from_node = to_socket.links[0].from_node
+            prop = getattr(node, prop_name)
+            val = None
+
+            # if this is a gain on PxrSurface and the lobe isn't
+            # enabled                    
+            if entry.gain_enable and not getattr(node, entry.gain_enable):
+                val = entry.gain_disabled_val
+
+            elif value_mode == 'string':
+                if rman_sg_node:
+                    set_frame_sensitive(rman_sg_node, prop)
+
+                val = string_utils.expand_string(prop)
+                string_mode = entry.string_mode
+                # ies profiles don't need txmanager for converting                       
+                if string_mode == 'ies':
+                    val = string_utils.expand_string(prop, display='ies', asFilePath=True)
+                # this is a texture
+                elif string_mode == 'texture':
+                    tx_node_id = texture_utils.generate_node_id(node, param_name, ob=ob)
+                    tx_val = texture_utils.get_txmanager().get_output_tex_from_id(tx_node_id)
+                    val = tx_val if tx_val != '' else val
+                elif string_mode == 'assetidoutput':
+                    val = string_utils.expand_string(prop, display=entry.string_display, asFilePath=True)
+
+            elif value_mode == 'array':
+                array_len = getattr(node, '%s_arraylen' % prop_name)
+                sub_prop_names = prop
+                sub_prop_names = sub_prop_names[:array_len]
+                val_array = []
+                val_ref_array = []
+                param_type = entry.array_type
+                
+                for nm in sub_prop_names:
+                    if inputs is not None and nm in inputs and \
+                        inputs[nm].is_linked:
+
+                        to_socket = inputs[nm]
+                        from_socket = to_socket.links[0].from_socket
+                        from_node = to_socket.links[0].from_node
 
-                    if 'arraySize' in meta:
-                        pass
-                    elif 'renderman_array_name' in meta:
-                        continue                    
-                    else:
                         val = get_output_param_str(
-                                from_node, mat_name, from_socket, to_socket, param_type)
+                            from_node, mat_name, from_socket, to_socket, param_type)
                         if val:
-                            set_rix_param(params, param_type, param_name, val, is_reference=True)                  
-
-                # see if vstruct linked
-                elif is_vstruct_and_linked(node, prop_name):
-                    vstruct_name, vstruct_member = meta[
-                        'vstructmember'].split('.')
-                    from_socket = node.inputs[
-                        vstruct_name].links[0].from_socket
-
-                    temp_mat_name = mat_name
-
-                    if from_socket.node.bl_idname == 'ShaderNodeGroup':
-                        ng = from_socket.node.node_tree
-                        group_output = next((n for n in ng.nodes if n.bl_idname == 'NodeGroupOutput'),
-                                            None)
-                        if group_output is None:
-                            return False
-
-                        in_sock = group_output.inputs[from_socket.name]
-                        if len(in_sock.links):
-                            from_socket = in_sock.links[0].from_socket
-                            #temp_mat_name = mat_name + '.' + from_socket.node.name
-                            temp_mat_name = mat_name
-                            
-                    vstruct_from_param = "%s_%s" % (
-                        from_socket.identifier, vstruct_member)
-                    if vstruct_from_param in from_socket.node.output_meta:
-                        actual_socket = from_socket.node.output_meta[
-                            vstruct_from_param]
-
-                        node_meta = getattr(
-                            node, 'shader_meta') if node.bl_idname == "PxrOSLPatternNode" else node.output_meta                        
-                        node_meta = node_meta.get(vstruct_from_param)
-                        is_reference = True
-                        val = get_output_param_str(
-                               from_socket.node, temp_mat_name, actual_socket, to_socket=None, param_type=param_type)
-                        if node_meta:
-                            expr = node_meta.get('vstructConditionalExpr')
-                            # check if we should connect or just set a value
-                            if expr:
-                                if expr.split(' ')[0] == 'set':
-                                    val = 1
-                                    is_reference = False      
-                        if val:                  
-                            set_rix_param(params, param_type, param_name, val, is_reference=is_reference)
-
+                            val_ref_array.append(val)
                     else:
-                        rfb_log().warning('Warning! %s not found on %s' %
-                              (vstruct_from_param, from_socket.node.name))
-
-                # else output rib
-                else:
-                    # if struct is not linked continue
-                    if param_type in ['struct', 'enum']:
-                        continue
-
-                    val = None
-
-                    # if this is a gain on PxrSurface and the lobe isn't
-                    # enabled                    
-                    if node.bl_idname == 'PxrSurfaceBxdfNode' and \
-                            prop_name in __GAINS_TO_ENABLE__ and \
-                            not getattr(node, __GAINS_TO_ENABLE__[prop_name]):
-                        val = [0, 0, 0] if param_type == 'color' else 0
-
-                    elif param_type == 'string':
-                        if rman_sg_node:
-                            set_frame_sensitive(rman_sg_node, prop)
-
-                        val = string_utils.expand_string(prop)
-                        options = meta['options']
-                        if param_widget in ['fileinput', 'assetidinput']:
-                            # ies profiles don't need txmanager for converting                       
-                            if 'ies' in options:
-                                val = string_utils.expand_string(prop, display='ies', asFilePath=True)
-                            # this is a texture
-                            elif ('texture' in options) or ('env' in options) or ('imageplane' in options):
-                                tx_node_id = texture_utils.generate_node_id(node, param_name, ob=ob)
-                                tx_val = texture_utils.get_txmanager().get_output_tex_from_id(tx_node_id)
-                                val = tx_val if tx_val != '' else val
-                        elif param_widget == 'assetidoutput':
-                            display = 'openexr'
-                            if 'texture' in options:
-                                display = 'texture'
-                            val = string_utils.expand_string(prop, display=display, asFilePath=True)
-
-                    elif 'renderman_array_name' in meta:
-                        continue
-                    elif param_type == 'array':
-                        array_len = getattr(node, '%s_arraylen' % prop_name)
-                        sub_prop_names = getattr(node, prop_name)
-                        sub_prop_names = sub_prop_names[:array_len]
-                        val_array = []
-                        val_ref_array = []
-                        param_type = meta['renderman_array_type']
-                        
-                        for nm in sub_prop_names:
-                            if hasattr(node, 'inputs')  and nm in node.inputs and \
-                                node.inputs[nm].is_linked:
-
-                                to_socket = node.inputs[nm]
-                                from_socket = to_socket.links[0].from_socket
-                                from_node = to_socket.links[0].from_node
-
-                                val = get_output_param_str(
-                                    from_node, mat_name, from_socket, to_socket, param_type)
-                                if val:
-                                    val_ref_array.append(val)
-                            else:
-                                prop = getattr(node, nm)
-                                val = string_utils.convert_val(prop, type_hint=param_type)
-                                if param_type in RFB_FLOAT3:
-                                    val_array.extend(val)
-                                else:
-                                    val_array.append(val)
-                        if val_ref_array:
-                            set_rix_param(params, param_type, param_name, val_ref_array, is_reference=True, is_array=True, array_len=len(val_ref_array))
+                        prop = getattr(node, nm)
+                        val = string_utils.convert_val(prop, type_hint=param_type)
+                        if param_type in RFB_FLOAT3:
+                            val_array.extend(val)
                         else:
-                            set_rix_param(params, param_type, param_name, val_array, is_reference=False, is_array=True, array_len=len(val_array))
-                        continue
-                    elif param_type == 'colorramp':
-                        nt = bpy.data.node_groups[node.rman_fake_node_group]
-                        if nt:
-                            ramp_name =  prop
-                            color_ramp_node = nt.nodes[ramp_name]                            
-                            colors = []
-                            positions = []
-                            # double the start and end points
-                            positions.append(float(color_ramp_node.color_ramp.elements[0].position))
-                            colors.append(color_ramp_node.color_ramp.elements[0].color[:3])
-                            for e in color_ramp_node.color_ramp.elements:
-                                positions.append(float(e.position))
-                                colors.append(e.color[:3])
-                            positions.append(
-                                float(color_ramp_node.color_ramp.elements[-1].position))
-                            colors.append(color_ramp_node.color_ramp.elements[-1].color[:3])
-
-                            params.SetInteger('%s' % prop_name, len(positions))
-                            params.SetFloatArray("%s_Knots" % prop_name, positions, len(positions))
-                            params.SetColorArray("%s_Colors" % prop_name, colors, len(positions))
-
-                            rman_interp_map = { 'B_SPLINE': 'bspline', 'LINEAR': 'linear', 'CONSTANT': 'constant'}
-                            interp = rman_interp_map.get(color_ramp_node.color_ramp.interpolation,'catmull-rom')
-                            params.SetString("%s_Interpolation" % prop_name, interp )         
-                        continue               
-                    elif param_type == 'floatramp':
-                        nt = bpy.data.node_groups[node.rman_fake_node_group]
-                        if nt:
-                            ramp_name =  prop
-                            float_ramp_node = nt.nodes[ramp_name]                            
-
-                            curve = float_ramp_node.mapping.curves[0]
-                            knots = []
-                            vals = []
-                            # double the start and end points
-                            knots.append(curve.points[0].location[0])
-                            vals.append(curve.points[0].location[1])
-                            for p in curve.points:
-                                knots.append(p.location[0])
-                                vals.append(p.location[1])
-                            knots.append(curve.points[-1].location[0])
-                            vals.append(curve.points[-1].location[1])
-
-                            params.SetInteger('%s' % prop_name, len(knots))
-                            params.SetFloatArray('%s_Knots' % prop_name, knots, len(knots))
-                            params.SetFloatArray('%s_Floats' % prop_name, vals, len(vals))    
-                            
-                            # Blender doesn't have an interpolation selection for float ramps. Default to catmull-rom
-                            interp = 'catmull-rom'
-                            params.SetString("%s_Interpolation" % prop_name, interp )                          
-                        continue
-                    else:
+                            val_array.append(val)
+                if val_ref_array:
+                    set_rix_param(params, param_type, param_name, val_ref_array, is_reference=True, is_array=True, array_len=len(val_ref_array))
+                else:
+                    set_rix_param(params, param_type, param_name, val_array, is_reference=False, is_array=True, array_len=len(val_array))
+                continue
+            elif value_mode == 'colorramp':
+                nt = bpy.data.node_groups[node.rman_fake_node_group]
+                if nt:
+                    ramp_name =  prop
+                    color_ramp_node = nt.nodes[ramp_name]                            
+                    colors = []
+                    positions = []
+                    # double the start and end points
+                    positions.append(float(color_ramp_node.color_ramp.elements[0].position))
+                    colors.append(color_ramp_node.color_ramp.elements[0].color[:3])
+                    for e in color_ramp_node.color_ramp.elements:
+                        positions.append(float(e.position))
+                        colors.append(e.color[:3])
+                    positions.append(
+                        float(color_ramp_node.color_ramp.elements[-1].position))
+                    colors.append(color_ramp_node.color_ramp.elements[-1].color[:3])
+
+                    params.SetInteger('%s' % prop_name, len(positions))
+                    params.SetFloatArray("%s_Knots" % prop_name, positions, len(positions))
+                    params.SetColorArray("%s_Colors" % prop_name, colors, len(positions))
+
+                    rman_interp_map = { 'B_SPLINE': 'bspline', 'LINEAR': 'linear', 'CONSTANT': 'constant'}
+                    interp = rman_interp_map.get(color_ramp_node.color_ramp.interpolation,'catmull-rom')
+                    params.SetString("%s_Interpolation" % prop_name, interp )         
+                continue               
+            elif value_mode == 'floatramp':
+                nt = bpy.data.node_groups[node.rman_fake_node_group]
+                if nt:
+                    ramp_name =  prop
+                    float_ramp_node = nt.nodes[ramp_name]                            
+
+                    curve = float_ramp_node.mapping.curves[0]
+                    knots = []
+                    vals = []
+                    # double the start and end points
+                    knots.append(curve.points[0].location[0])
+                    vals.append(curve.points[0].location[1])
+                    for p in curve.points:
+                        knots.append(p.location[0])
+                        vals.append(p.location[1])
+                    knots.append(curve.points[-1].location[0])
+                    vals.append(curve.points[-1].location[1])
+
+                    params.SetInteger('%s' % prop_name, len(knots))
+                    params.SetFloatArray('%s_Knots' % prop_name, knots, len(knots))
+                    params.SetFloatArray('%s_Floats' % prop_name, vals, len(vals))    
+                    
+                    # Blender doesn't have an interpolation selection for float ramps. Default to catmull-rom
+                    interp = 'catmull-rom'
+                    params.SetString("%s_Interpolation" % prop_name, interp )                          
+                continue
+            else:
 
-                        val = string_utils.convert_val(prop, type_hint=param_type)
+                val = string_utils.convert_val(prop, type_hint=param_type)
 
-                    set_rix_param(params, param_type, param_name, val, is_reference=False, node=node)
+            # check if we need to emit this parameter.
+            if not emit_default_params and _is_default_param_value(params, entry, val):
+                continue
+            if entry.setter:
+                entry.setter(params, param_name, val)
                         
     return params      
 
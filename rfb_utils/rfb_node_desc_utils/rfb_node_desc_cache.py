@@ -0,0 +1,115 @@
+"""Persistent cache of parsed node descriptions.
+"""
+
+import pickle
+import sys
+import os
+from ...rfb_logger import rfb_log
+
+# bump this if RfbNodeDesc changes in a way that makes old entries invalid
+__NODE_DESC_CACHE_VERSION__ = 1
+
+
+class RfbNodeDescCache(object):
+    """Cache of RfbNodeDesc objects, keyed by the path of the .args or .oso file
+    they were parsed from. An entry is only used if the file's mtime and size
+    still match. The whole cache is thrown away if the RenderMan or add-on version
+    changes.
+
+    Entries are stored before any overrides are applied
+    (see rman_config.apply_args_overrides), so that changes to the overrides
+    don't need a re-parse.
+
+    Attributes:
+        cache_file (str) - path to the cache file
+        version (tuple) - the versions the cache is valid for
+        hits (int) - number of descriptions read from the cache
+        misses (int) - number of descriptions that had to be parsed
+    """
+
+    def __init__(self, cache_file, version):
+        self.cache_file = cache_file
+        self.version = (__NODE_DESC_CACHE_VERSION__, sys.version_info[:2]) + tuple(version)
+        self.hits = 0
+        self.misses = 0
+        self._entries = dict()
+        self._used = set()
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'rb') as f:
+                version, entries = pickle.load(f)
+        except Exception as e:
+            rfb_log().debug("Could not read node description cache %s: %s" % (self.cache_file, str(e)))
+            return
+        if version != self.version:
+            rfb_log().debug("Node description cache is out of date. Rebuilding.")
+            self._dirty = True
+            return
+        self._entries = entries
+
+    def _get_key(self, path):
+        st = os.stat(path)
+        return (st.st_mtime, st.st_size)
+
+    def get(self, path):
+        """ Get the node description for a file, if it is in the cache and
+        the file has not changed.
+
+        Args:
+            path (str) - path to the .args or .oso file
+
+        Returns:
+            (RfbNodeDesc) - the node description, or None
+        """
+        self._used.add(path)
+        entry = self._entries.get(path, None)
+        if entry is not None:
+            key, data = entry
+            try:
+                if key == self._get_key(path):
+                    node_desc = pickle.loads(data)
+                    self.hits += 1
+                    return node_desc
+            except Exception as e:
+                rfb_log().debug("Could not read cached node description for %s: %s" % (path, str(e)))
+        self.misses += 1
+        return None
+
+    def put(self, path, node_desc):
+        """ Add a newly parsed node description to the cache.
+
+        Args:
+            path (str) - path to the .args or .oso file
+            node_desc (RfbNodeDesc) - the node description
+        """
+        try:
+            self._entries[path] = (self._get_key(path), pickle.dumps(node_desc, protocol=pickle.HIGHEST_PROTOCOL))
+            self._dirty = True
+        except Exception as e:
+            rfb_log().debug("Could not cache node description for %s: %s" % (path, str(e)))
+
+    def save(self):
+        """ Write the cache out, dropping entries for files we did not see
+        this session.
+        """
+        stale = [path for path in self._entries if path not in self._used]
+        for path in stale:
+            del self._entries[path]
+        if not self._dirty and not stale:
+            return
+        tmp_file = '%s.%d.tmp' % (self.cache_file, os.getpid())
+        try:
+            cache_dir = os.path.dirname(self.cache_file)
+            if not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+            with open(tmp_file, 'wb') as f:
+                pickle.dump((self.version, self._entries), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self.cache_file)
+            self._dirty = False
+        except Exception as e:
+            rfb_log().debug("Could not write node description cache %s: %s" % (self.cache_file, str(e)))
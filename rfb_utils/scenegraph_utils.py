@@ -1,3 +1,7 @@
+# whether the RixParamList setters accept objects that support
+# the buffer protocol (ex: NumPy arrays). None means we haven't checked yet.
+__RIX_BUFFER_PROTOCOL__ = None
+
 def set_material(sg_node, sg_material_node):
     '''Sets the material on a scenegraph group node and sets the materialid
     user attribute at the same time.
@@ -11,4 +15,30 @@ def set_material(sg_node, sg_material_node):
     sg_node.SetMaterial(sg_material_node)
     attrs = sg_node.GetAttributes()
     attrs.SetString('user:__materialid', sg_material_node.GetIdentifier().CStr())
-    sg_node.SetAttributes(attrs) 
\ No newline at end of file
+    sg_node.SetAttributes(attrs) 
+
+def set_primvar_array(setter, name, arr, *args):
+    '''Call a RixParamList setter (ex: SetPointDetail, SetIntegerArray) with a NumPy array.
+    The array is passed straight through to the setter, avoiding a copy into Python lists.
+    If the rman module we are running with does not accept buffers, we fall back
+    to converting the array to a list, and remember that for subsequent calls.
+
+    Arguments:
+        setter (function) - bound RixParamList setter, ex: primvar.SetPointDetail
+        name (str) - name of the parameter
+        arr (numpy.ndarray) - contiguous float32 or int32 array
+        args - any remaining arguments the setter expects (detail, length, time sample, etc.)
+    '''
+    global __RIX_BUFFER_PROTOCOL__
+
+    if __RIX_BUFFER_PROTOCOL__ is not False:
+        try:
+            setter(name, arr, *args)
+            __RIX_BUFFER_PROTOCOL__ = True
+            return
+        except TypeError:
+            if __RIX_BUFFER_PROTOCOL__:
+                raise
+            __RIX_BUFFER_PROTOCOL__ = False
+
+    setter(name, arr.tolist(), *args)
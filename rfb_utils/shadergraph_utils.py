@@ -296,32 +296,102 @@ def find_node_input(node, name):
     return None
 
 # walk the tree for nodes to export
-def gather_nodes(node):
-    nodes = []
+def _get_node_links_(node, links_cache):
+    # Return a list of (from_node, convert_node) for each linked input of node,
+    # where convert_node is the PxrToFloat3/PxrToFloat needed for the link, or None.
+    # Results are cached in links_cache, so we only walk each node's sockets once.
+    node_links = links_cache.get(node, None)
+    if node_links is not None:
+        return node_links
+
+    node_links = []
     for socket in node.inputs:
         if socket.is_linked:
             link = socket.links[0]
-            for sub_node in gather_nodes(socket.links[0].from_node):
-                if sub_node not in nodes:
-                    nodes.append(sub_node)
+            convert_node = None
 
             # if this is a float -> color inset a tofloat3
             if is_socket_float_type(link.from_socket) and is_socket_float3_type(socket):
                 convert_node = ('PxrToFloat3', link.from_node,
                                 link.from_socket)
-                if convert_node not in nodes:
-                    nodes.append(convert_node)
             elif is_socket_float3_type(link.from_socket) and is_socket_float_type(socket):
                 convert_node = ('PxrToFloat', link.from_node, link.from_socket)
-                if convert_node not in nodes:
-                    nodes.append(convert_node)
+            node_links.append((link.from_node, convert_node))
+
+    if hasattr(node, 'renderman_node_type'):
+        is_exported = (node.renderman_node_type != 'output')
+    else:
+        is_exported = (node.bl_idname not in ['ShaderNodeOutputMaterial', 'NodeGroupInput', 'NodeGroupOutput'])
+
+    links_cache[node] = (node_links, is_exported)
+    return links_cache[node]
+
+def gather_nodes(node, links_cache=None):
+    '''Return the list of nodes that need to be exported for node, upstream
+    nodes first. Each node appears once, in the order of the first time it is
+    reached, walking the inputs in order. Converter nodes needed between float and
+    float3 sockets are added as (node type, from_node, from_socket) tuples, right after
+    the upstream network of their link.
+
+    Arguments:
+        node (bpy.types.Node) - the node to start from
+        links_cache (dict) - optional cache of the links of each node. Pass the same dict
+                             when gathering from several nodes in the same node tree, to only
+                             look at each node's sockets once.
+
+    Returns:
+        (list) - list of nodes
+    '''
 
-    if hasattr(node, 'renderman_node_type') and node.renderman_node_type != 'output':
-        nodes.append(node)
-    elif not hasattr(node, 'renderman_node_type') and node.bl_idname not in ['ShaderNodeOutputMaterial', 'NodeGroupInput', 'NodeGroupOutput']:
-        nodes.append(node)
+    if links_cache is None:
+        links_cache = dict()
+
+    nodes = []
+    emitted = set()
+    visited = set()
+
+    # walk the graph with our own stack, rather than recursing, so that
+    # deep networks don't hit the recursion limit
+    stack = [(False, node)]
+    while stack:
+        is_emit, item = stack.pop()
+        if is_emit:
+            if item not in emitted:
+                emitted.add(item)
+                nodes.append(item)
+            continue
+        if item in visited:
+            continue
+        visited.add(item)
+        (node_links, is_exported) = _get_node_links_(item, links_cache)
+        if is_exported:
+            stack.append((True, item))
+        for from_node, convert_node in reversed(node_links):
+            if convert_node:
+                stack.append((True, convert_node))
+            stack.append((False, from_node))
+
+    return nodes
+
+def gather_terminal_nodes(out, terminals=('Bxdf', 'Light', 'Displacement')):
+    '''Gather the nodes for each of the terminals of a RenderMan output node,
+    sharing the work done on nodes that feed more than one terminal.
+
+    Arguments:
+        out (RendermanOutputNode) - the output node
+        terminals (list) - names of the terminal sockets to gather nodes for
+
+    Returns:
+        (dict) - for each linked terminal, the list of nodes from gather_nodes
+    '''
 
-    return nodes    
+    links_cache = dict()
+    terminal_nodes = dict()
+    for terminal in terminals:
+        socket = out.inputs.get(terminal, None)
+        if socket and socket.is_linked:
+            terminal_nodes[terminal] = gather_nodes(socket.links[0].from_node, links_cache=links_cache)
+    return terminal_nodes
 
 def get_rerouted_node(node):
     '''Find and return the rerouted node and socket, given
@@ -1,4 +1,5 @@
 from ..rfb_utils.rfb_node_desc_utils.rfb_node_desc import RfbNodeDesc
+from ..rfb_utils.rfb_node_desc_utils.rfb_node_desc_cache import RfbNodeDescCache
 from ..rfb_utils import filepath_utils
 from ..rfb_utils.filepath import FilePath
 from ..rfb_utils import generate_property_utils
@@ -6,8 +7,10 @@ from ..rfb_utils.property_callbacks import *
 from ..rfb_utils.rman_socket_utils import node_add_inputs
 from ..rfb_utils.rman_socket_utils import node_add_outputs
 from ..rfb_utils import shadergraph_utils
+from ..rfb_utils import property_utils
 from ..rfb_logger import rfb_log
 from ..rfb_utils.envconfig_utils import envconfig
+from ..rfb_utils.prefs_utils import get_pref
 from .. import rfb_icons
 from .. import rman_config
 from ..rman_properties import rman_properties_renderlayers
@@ -15,6 +18,7 @@ from ..rman_properties import rman_properties_world
 from ..rman_properties import rman_properties_camera
 from ..rman_constants import RFB_ARRAYS_MAX_LEN
 from ..rman_constants import CYCLES_NODE_MAP
+from ..rman_constants import RFB_ADDON_VERSION_STRING
 from nodeitems_utils import NodeCategory, NodeItem
 from collections import OrderedDict
 from bpy.props import *
@@ -22,6 +26,7 @@ import bpy
 import os
 import sys
 import traceback
+import time
 import nodeitems_utils
 from operator import attrgetter
 
@@ -447,6 +452,7 @@ def generate_node_type(node_desc, is_oso=False):
             default=True)        
 
     bpy.utils.register_class(ntype)
+    property_utils.register_node_param_plan(ntype, name)
 
     if nodeType == 'pattern' and is_oso:
         # This is mainly here for backwards compatability
@@ -482,6 +488,7 @@ def generate_node_type(node_desc, is_oso=False):
                 
         class_generate_properties(osl_node_type, name, node_desc)
         bpy.utils.register_class(osl_node_type)
+        property_utils.register_node_param_plan(osl_node_type, name)
 
     return (typename, ntype)
 
@@ -495,6 +502,7 @@ def register_plugin_to_parent(ntype, name, node_desc, plugin_type, parent):
 
     # register and add to scene_settings
     bpy.utils.register_class(ntype)
+    property_utils.register_node_param_plan(ntype, name)
     settings_name = "%s_settings" % name
     parent.__annotations__["%s_settings" % name] = PointerProperty(type=ntype, name="%s Settings" % name)
     
@@ -587,10 +595,28 @@ class RendermanNodeItem(NodeItem):
                 layout.menu('NODE_MT_RM_DisplayFilter_Category_Menu')
 
 
+def get_node_desc_cache():
+    ''' Get the cache of parsed node descriptions, if it is turned on
+    in the preferences.
+
+    Returns:
+        (RfbNodeDescCache) - the cache, or None
+    '''
+    if not get_pref('rman_node_desc_cache', default=True):
+        return None
+    cache_file = os.path.join(bpy.utils.user_resource('CONFIG'), 'rfb_node_desc_cache.pickle')
+    version = (envconfig().build_info.version(), RFB_ADDON_VERSION_STRING)
+    return RfbNodeDescCache(cache_file, version)
+
 def register_rman_nodes():
     global __RMAN_NODE_CATEGORIES__
 
     rfb_log().debug("Registering RenderMan Plugin Nodes:")
+    time_start = time.perf_counter()
+    phase_times = {'parse': 0.0, 'overrides': 0.0, 'generate': 0.0}
+    node_desc_cache = get_node_desc_cache()
+    num_nodes = 0
+
     path_list = envconfig().get_shader_registration_paths()
     visited = set()
     for path in path_list:
@@ -614,23 +640,38 @@ def register_rman_nodes():
                         is_oso = True
                         is_args = False
 
-                    node_desc = RfbNodeDesc(FilePath(root).join(FilePath(filename)))
+                    phase_start = time.perf_counter()
+                    node_desc_path = os.path.join(root, filename)
+                    node_desc = None
+                    if node_desc_cache:
+                        node_desc = node_desc_cache.get(node_desc_path)
+                    if node_desc is None:
+                        node_desc = RfbNodeDesc(FilePath(root).join(FilePath(filename)))
+                        if node_desc_cache:
+                            node_desc_cache.put(node_desc_path, node_desc)
+                    phase_times['parse'] += time.perf_counter() - phase_start
 
                     # apply any overrides
+                    phase_start = time.perf_counter()
                     rman_config.apply_args_overrides(filename, node_desc)
+                    phase_times['overrides'] += time.perf_counter() - phase_start
 
                     __RMAN_NODES__[node_desc.node_type].append(node_desc)
                     rfb_log().debug("\t%s" % node_desc.name)
+                    num_nodes += 1
 
                     # These plugin types are special. They are not actually shading
                     # nodes that can be used in Blender's shading editor, but 
                     # we still create PropertyGroups for them so they can be inserted
                     # into the correct UI panel.
+                    phase_start = time.perf_counter()
                     if node_desc.node_type in ['displaydriver']: 
                         register_plugin_types(node_desc)
+                        phase_times['generate'] += time.perf_counter() - phase_start
                         continue
                     
                     typename, nodetype = generate_node_type(node_desc, is_oso=is_oso)
+                    phase_times['generate'] += time.perf_counter() - phase_start
                     if not typename and not nodetype:
                         continue
 
@@ -719,7 +760,17 @@ def register_rman_nodes():
                         __RMAN_NODE_CATEGORIES__['projection']['projection'][0][1].append(node_item)  
                         __RMAN_NODE_CATEGORIES__['projection']['projection'][1].append(node_desc)                             
 
+    if node_desc_cache:
+        node_desc_cache.save()
+
+    total_time = time.perf_counter() - time_start
+    # directory walking and categories
+    phase_times['other'] = total_time - sum(phase_times.values())
     rfb_log().debug("Finished Registering RenderMan Plugin Nodes.")
+    rfb_log().debug("Registered %d nodes in %.2fs (%s)" % (num_nodes, total_time,
+                    ', '.join(['%s: %.2fs' % (k, v) for k, v in phase_times.items()])))
+    if node_desc_cache:
+        rfb_log().debug("Node descriptions: %d from cache, %d parsed" % (node_desc_cache.hits, node_desc_cache.misses))
 
 
 def register_node_categories():
@@ -1,5 +1,6 @@
 from ..rfb_utils import filepath_utils
 from ..rman_render import RmanRender
+from ..rfb_logger import rfb_log
 import bpy
 import os
 import time
@@ -152,10 +153,38 @@ class PRMAN_OT_ExternalRender(bpy.types.Operator):
         else:
             self.report({'ERROR'}, 'Queuing system set to none')       
 
+    def external_rib_render_parallel(self, context):
+        from .. import rman_rib_exporter
+        from .. import rman_spool
+
+        rm = context.scene.renderman
+        depsgraph = context.evaluated_depsgraph_get()
+        rr = RmanRender.get_rman_render()
+        exporter = rman_rib_exporter.RmanRibExporter(rr, depsgraph)
+        if not exporter.export():
+            self.report({'ERROR'}, 'Failed to export frames: %s' % ', '.join([str(f) for f in sorted(exporter.failed_frames)]))
+            return
+
+        if rm.queuing_system != 'none':
+            rr.rman_scene.bl_scene = depsgraph.scene_eval
+            rr.rman_scene.bl_view_layer = depsgraph.view_layer
+            rr.rman_scene.bl_frame_current = rr.rman_scene.bl_scene.frame_current
+            rr.rman_scene._find_renderman_layer()
+            rr.rman_scene.external_render = True
+            spooler = rman_spool.RmanSpool(rr, rr.rman_scene, depsgraph)
+            spooler.batch_render()
+
     def external_rib_render(self, context):
         scene = context.scene
         rm = scene.renderman
         if not rm.is_rman_interactive_running:
+            if rm.rib_parallel_export and rm.external_animation:
+                if bpy.data.filepath:
+                    self.external_rib_render_parallel(context)
+                    return
+                # the workers need a saved file, so that file paths 
+                # expand the same in all of them
+                rfb_log().warning("Parallel RIB export needs a saved file. Exporting frames serially.")
             scene.renderman.enable_external_rendering = True        
             bpy.ops.render.render(layer=context.view_layer.name)
             scene.renderman.enable_external_rendering = False
@@ -13,6 +13,7 @@ import socketserver
 import threading
 import subprocess
 import ctypes
+import numpy as np
 
 # for viewport buckets
 import gpu
@@ -34,6 +35,7 @@ from .rman_stats import RfBStatsManager
 __RMAN_RENDER__ = None
 __RMAN_IT_PORT__ = -1
 __BLENDER_DSPY_PLUGIN__ = None
+__BLENDER_DSPY_DIRTY_REGION__ = None
 __DRAW_THREAD__ = None
 __RMAN_STATS_THREAD__ = None
 
@@ -150,16 +152,92 @@ def start_cmd_server():
 
     return __RMAN_IT_PORT__        
 
+class RfBUpdateScheduler(object):
+    '''
+    Decides when the render loops should look for new pixels. The wait between
+    polls doubles every time nothing has changed, up to max_interval, and drops
+    back to min_interval as soon as something does. Any thread can call wake() 
+    (ex: from a progress event) to end the current wait early. Polls are never closer
+    together than min_interval, which caps the redraw frequency. Long waits are split
+    into slices of at most break_interval, so that a break request (ex: Esc) is
+    noticed quickly.
+
+    Attributes:
+        min_interval (float) - the shortest time, in seconds, between polls
+        max_interval (float) - the longest time, in seconds, between polls
+        break_interval (float) - the longest time, in seconds, before checking for a break
+        stats_label (str) - label used when recording delivered/skipped updates
+        stats_mgr (RfBStatsManager) - stats manager to record to
+    '''
+
+    def __init__(self, min_interval, max_interval, stats_label, stats_mgr, break_interval=0.05):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.break_interval = max(min_interval, break_interval)
+        self.stats_label = stats_label
+        self.stats_mgr = stats_mgr
+        self.interval = min_interval
+        self.last_poll = 0.0
+        self.event = threading.Event()
+
+    def wake(self):
+        self.interval = self.min_interval
+        self.event.set()
+
+    def wait(self, test_break=None):
+        """ Wait until the next poll
+
+        Args:
+            test_break (function) - called between slices of the wait, the wait ends
+                                    early if it returns True
+        """
+        deadline = time.time() + self.interval
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0.0:
+                break
+            if self.event.wait(min(remaining, self.break_interval)):
+                break
+            if test_break and test_break():
+                break
+        self.event.clear()
+        elapsed = time.time() - self.last_poll
+        if elapsed < self.min_interval:
+            time.sleep(self.min_interval - elapsed)
+        self.last_poll = time.time()
+
+    def backoff(self):
+        self.interval = min(self.interval * 2.0, self.max_interval)
+
+    def updated(self, changed):
+        if changed is None:
+            # there was nothing to update yet
+            self.backoff()
+        elif changed:
+            self.interval = self.min_interval
+            self.stats_mgr.incr_counter('%s Delivered' % self.stats_label)
+        else:
+            self.backoff()
+            self.stats_mgr.incr_counter('%s Skipped' % self.stats_label)
+
 def draw_threading_func(db):
     refresh_rate = get_pref('rman_viewport_refresh_rate', default=0.01)
+    max_interval = get_pref('rman_render_update_max_interval', default=0.5)
+    scheduler = RfBUpdateScheduler(refresh_rate, max_interval, 'Viewport Redraws', db.stats_mgr)
+    db.update_scheduler = scheduler
     while db.rman_is_live_rendering:
         if not __any_areas_shading():
             # if there are no 3d viewports, stop IPR
             db.rman_is_live_rendering = False
             db.stop_render(stop_draw_thread=False)
         try:
-            db.bl_engine.tag_redraw()
-            time.sleep(refresh_rate)
+            # only redraw if the display driver has new pixels for us, 
+            # or can't tell us
+            changed = (db._get_dirty_region(0) != ())
+            if changed:
+                db.bl_engine.tag_redraw()
+            scheduler.updated(changed)
+            scheduler.wait()
         except ReferenceError as e:
             # calling tag_redraw has failed. This might mean
             # that there are no more view_3d areas that are shading. Try to
@@ -193,6 +271,8 @@ def progress_cb(e, d, db):
         db.stats_mgr._progress = int(d)
     if db.rman_is_live_rendering and int(d) == 100:
         db.rman_is_live_rendering = False
+    if db.update_scheduler:
+        db.update_scheduler.wake()
 
 def bake_progress_cb(e, d, db): 
     if not db.stats_mgr.is_connected():
@@ -203,6 +283,8 @@ def render_cb(e, d, db):
         rfb_log().debug("RenderMan has exited.")
         if db.rman_is_live_rendering:
             db.rman_is_live_rendering = False
+        if db.update_scheduler:
+            db.update_scheduler.wake()
 
 def preload_xpu():
     """On linux there is a problem with std::call_once and
@@ -261,6 +343,8 @@ class RmanRender(object):
         self.viewport_buckets = list()
         self._draw_viewport_buckets = False
         self.stats_mgr = RfBStatsManager(self)
+        self.update_scheduler = None
+        self.rib_export_times = dict()
 
         self._start_prman_begin()
 
@@ -401,6 +485,11 @@ class RmanRender(object):
         self.rman_license_failed = False
         self.rman_license_failed_message = ''
 
+    def _create_update_scheduler(self, stats_label):
+        min_interval = get_pref('rman_render_update_min_interval', default=0.01)
+        max_interval = get_pref('rman_render_update_max_interval', default=0.5)
+        return RfBUpdateScheduler(min_interval, max_interval, stats_label, self.stats_mgr)
+
     def start_render(self, depsgraph, for_background=False):
     
         self.reset()
@@ -455,6 +544,7 @@ class RmanRender(object):
 
         self._dump_rib_()
         rfb_log().info("Finished parsing scene. Total time: %s" % string_utils._format_time_(time.time() - time_start)) 
+        self.stats_mgr.log_rfb_stats()
         self.rman_is_live_rendering = True
         
         render_cmd = ''
@@ -527,14 +617,43 @@ class RmanRender(object):
                         lyr = result.layers[0].passes.find_by_name(dspy_nm, render_view)
                     bl_image_lyrs[i] = lyr            
                 
-                while not self.bl_engine.test_break() and self.rman_is_live_rendering:
-                    time.sleep(0.01)
+                bl_image_buffers = dict()
+                def _update_image_layers():
+                    # returns None if none of the AOVs have any pixels yet
+                    tick_start = time.time()
+                    any_updated = False
+                    any_buffers = False
                     for i, img in bl_image_lyrs.items():
-                        buffer = self._get_buffer(width, height, image_num=i, as_flat=False, render=render)
-                        if buffer:
-                            img.rect = buffer
+                        buffer = bl_image_buffers.get(i, None)
+                        if buffer is None:
+                            buffer = self._get_buffer(width, height, image_num=i, as_flat=False, render=render)
+                            if buffer is None:
+                                continue
+                            bl_image_buffers[i] = buffer
+                        elif not self._update_buffer(buffer, width, height, image_num=i, render=render):
+                            # this AOV hasn't changed since the last update
+                            self.stats_mgr.incr_counter('AOV Updates Skipped')
+                            any_buffers = True
+                            continue
+                        img.rect = buffer
+                        any_updated = True
+                        any_buffers = True
             
-                    self.bl_engine.update_result(result)        
+                    if any_updated:
+                        self.bl_engine.update_result(result)        
+                        self.stats_mgr.add_framebuffer_update(time.time() - tick_start)
+                    if not any_buffers:
+                        return None
+                    return any_updated
+
+                scheduler = self._create_update_scheduler('Render Updates')
+                self.update_scheduler = scheduler
+                while not self.bl_engine.test_break() and self.rman_is_live_rendering:
+                    scheduler.wait(test_break=self.bl_engine.test_break)
+                    scheduler.updated(_update_image_layers())
+
+                # make sure we have the last pixels
+                _update_image_layers()
           
                 if result:   
                     self.bl_engine.end_result(result) 
@@ -544,11 +663,11 @@ class RmanRender(object):
                     for i, dspy_nm in enumerate(dspy_dict['displays'].keys()):
                         filepath = dspy_dict['displays'][dspy_nm]['filePath']
                         buffer = self._get_buffer(width, height, image_num=i, as_flat=True)
-                        if buffer:
+                        if buffer is not None:
                             bl_image = bpy.data.images.new(dspy_nm, width, height)
                             bl_image.use_generated_float = True
                             bl_image.filepath_raw = filepath                            
-                            bl_image.pixels = buffer
+                            bl_image.pixels.foreach_set(buffer)
                             bl_image.file_format = 'OPEN_EXR'
                             bl_image.update()
                             bl_image.save()
@@ -557,8 +676,13 @@ class RmanRender(object):
                 self.stop_render()                              
 
         else:
+            # nothing to copy, we're just waiting for the render to finish
+            scheduler = self._create_update_scheduler('Render Updates')
+            self.update_scheduler = scheduler
             while not self.bl_engine.test_break() and self.rman_is_live_rendering:
-                time.sleep(0.01)   
+                scheduler.wait(test_break=self.bl_engine.test_break)
+                # there is no framebuffer to update, so there is nothing to count
+                scheduler.backoff()
             self.stop_render()                                
 
         return True   
@@ -570,6 +694,7 @@ class RmanRender(object):
 
         self.rman_running = True
         self.rman_render_into = ''
+        self.stats_mgr.reset()
         rib_options = ""
         if rm.rib_compression == "gzip":
             rib_options += " -compression gzip"
@@ -582,23 +707,40 @@ class RmanRender(object):
 
         if rm.external_animation:
             original_frame = bl_scene.frame_current
+            # with incremental export, we keep the same scene for all frames
+            # and only apply what changed between frames. Motion blur
+            # needs a full export per frame.
+            incremental = rm.rib_incremental_animation and not rm.motion_blur
             rfb_log().debug("Writing to RIB...")             
+            self.sg_scene = None
+            self.rib_export_times = dict()
             for frame in range(bl_scene.frame_start, bl_scene.frame_end + 1):
                 bl_view_layer = depsgraph.view_layer
-                config = rman.Types.RtParamList()
-                render_config = rman.Types.RtParamList()
-
-                self.sg_scene = self.sgmngr.CreateScene(config, render_config, self.stats_mgr.rman_stats_session) 
                 self.bl_engine.frame_set(frame, subframe=0.0)
+                time_start = time.time()
                 self.rman_is_exporting = True
-                self.rman_scene.export_for_final_render(depsgraph, self.sg_scene, bl_view_layer, is_external=True)
+                if incremental and self.sg_scene:
+                    self.rman_scene_sync.update_frame(depsgraph)
+                else:
+                    config = rman.Types.RtParamList()
+                    render_config = rman.Types.RtParamList()
+
+                    self.sg_scene = self.sgmngr.CreateScene(config, render_config, self.stats_mgr.rman_stats_session) 
+                    self.rman_scene_sync.sg_scene = self.sg_scene
+                    self.rman_scene.export_for_final_render(depsgraph, self.sg_scene, bl_view_layer, is_external=True)
                 self.rman_is_exporting = False
+                self.rib_export_times[frame] = time.time() - time_start
+                rfb_log().debug("Frame %d exported. Time: %s" % (frame, string_utils._format_time_(self.rib_export_times[frame])))
                 rib_output = string_utils.expand_string(rm.path_rib_output, 
                                                         frame=frame, 
                                                         asFilePath=True)                                                                            
                 self.sg_scene.Render("rib %s %s" % (rib_output, rib_options))
-                self.sgmngr.DeleteScene(self.sg_scene)     
+                if not incremental:
+                    self.sgmngr.DeleteScene(self.sg_scene)     
+                    self.sg_scene = None
 
+            if self.sg_scene:
+                self.sgmngr.DeleteScene(self.sg_scene)
             self.bl_engine.frame_set(original_frame, subframe=0.0)
             
 
@@ -626,6 +768,7 @@ class RmanRender(object):
             rfb_log().info("Finished parsing scene. Total time: %s" % string_utils._format_time_(time.time() - time_start))
             self.sgmngr.DeleteScene(self.sg_scene)
 
+        self.stats_mgr.log_rfb_stats()
         if rm.queuing_system != 'none':
             spooler = rman_spool.RmanSpool(self, self.rman_scene, depsgraph)
             spooler.batch_render()
@@ -865,13 +1008,13 @@ class RmanRender(object):
             time.sleep(0.001)
             if layer:
                 buffer = self._get_buffer(width, height, image_num=0, as_flat=False)
-                if buffer:
+                if buffer is not None:
                     layer.rect = buffer
                     self.bl_engine.update_result(result)
         # try to get the buffer one last time before exiting
         if layer:
             buffer = self._get_buffer(width, height, image_num=0, as_flat=False)
-            if buffer:
+            if buffer is not None:
                 layer.rect = buffer
                 self.bl_engine.update_result(result)        
         self.stop_render()              
@@ -927,6 +1070,9 @@ class RmanRender(object):
         if not self.rman_interactive_running and not self.rman_running:
             return
 
+        # make sure any held edits are sent before we stop
+        self.rman_scene_sync.flush_edits()
+
         self.rman_running = False
         self.rman_interactive_running = False  
         self.rman_swatch_render_running = False
@@ -940,6 +1086,8 @@ class RmanRender(object):
         self.rman_callbacks.clear()          
 
         self.rman_is_live_rendering = False
+        if self.update_scheduler:
+            self.update_scheduler.wake()
 
         # wait for the drawing thread to finish
         # if we are told to. stop_render() may also
@@ -947,6 +1095,7 @@ class RmanRender(object):
         if stop_draw_thread and __DRAW_THREAD__:
             __DRAW_THREAD__.join()
             __DRAW_THREAD__ = None
+        self.update_scheduler = None
 
         # stop retrieving stats
         if __RMAN_STATS_THREAD__:
@@ -1045,94 +1194,139 @@ class RmanRender(object):
                 shader.bind()
                 batch.draw(shader)
 
-    def _get_buffer(self, width, height, image_num=0, as_flat=True, render=None):
+    def _get_framebuffer_view(self, width, height, image_num=0, as_flat=True, render=None):
+        # Wrap the framebuffer for this display without copying it. The view 
+        # is flipped to match Blender, and cropped to the render border if as_flat is False.
+        # Returns the view and the framebuffer coordinates of its first row and column.
         dspy_plugin = self.get_blender_dspy_plugin()
         num_channels = dspy_plugin.GetNumberOfChannels(ctypes.c_size_t(image_num))
-        if num_channels > 4 or num_channels < 0:
+        if num_channels > 4 or num_channels < 1:
             rfb_log().debug("Could not get buffer. Incorrect number of channels: %d" % num_channels)
-            return None
+            return (None, 0, 0)
 
-        ArrayType = ctypes.c_float * (width * height * num_channels)
         f = dspy_plugin.GetFloatFramebuffer
-        f.restype = ctypes.POINTER(ArrayType)
+        f.restype = ctypes.POINTER(ctypes.c_float)
+
+        ptr = f(ctypes.c_size_t(image_num))
+        if not ptr:
+            return (None, 0, 0)
+        buffer = np.ctypeslib.as_array(ptr, shape=(height, width, num_channels))
+
+        start_x = 0
+        end_x = width
+        start_y = height-1
+        end_y = -1
+
+        if not as_flat and render and render.use_border:
+            start_y = int(height * (render.border_max_y))-1 
+            end_y = int(height * (render.border_min_y))-1
+            if render.border_min_x > 0.0:
+                start_x = max(int(width * render.border_min_x)-1, 0)
+            if render.border_max_x < 1.0:
+                end_x =  int(width * render.border_max_x)-2
+
+        if end_y < 0:
+            end_y = None
+        return (buffer[start_y:end_y:-1, start_x:end_x], start_x, start_y)
+
+    def _copy_to_rgba(self, src, dst):
+        # Blender is expecting a 4 channel image
+        num_channels = src.shape[2]
+        if num_channels == 4:
+            dst[...] = src
+        elif num_channels == 3:
+            dst[..., :3] = src
+            dst[..., 3] = 1.0
+        elif num_channels == 2:
+            dst[..., :2] = src
+            dst[..., 2:] = 1.0
+        elif num_channels == 1:
+            dst[..., :3] = src
+            dst[..., 3] = 1.0
+
+    def _get_dirty_region(self, image_num):
+        # Ask the display driver which region of the display has changed since 
+        # the last time we asked. Returns None if the driver can't tell us, 
+        # an empty tuple if nothing has changed or (xmin, xmax, ymin, ymax).
+        global __BLENDER_DSPY_DIRTY_REGION__
+        dspy_plugin = self.get_blender_dspy_plugin()
+        if __BLENDER_DSPY_DIRTY_REGION__ is None:
+            # older versions of d_blender don't have GetDirtyRegion
+            __BLENDER_DSPY_DIRTY_REGION__ = hasattr(dspy_plugin, 'GetDirtyRegion')
+        if not __BLENDER_DSPY_DIRTY_REGION__:
+            return None
+
+        xmin = ctypes.c_int(0)
+        xmax = ctypes.c_int(0)
+        ymin = ctypes.c_int(0)
+        ymax = ctypes.c_int(0)
+        ret = dspy_plugin.GetDirtyRegion(ctypes.c_size_t(image_num), ctypes.byref(xmin), ctypes.byref(xmax), ctypes.byref(ymin), ctypes.byref(ymax))
+        if ret < 0:
+            return None
+        if ret == 0:
+            return ()
+        return (xmin.value, xmax.value, ymin.value, ymax.value)
+
+    def _update_buffer(self, pixels, width, height, image_num=0, render=None):
+        """ Update pixels, a buffer previously returned by _get_buffer(as_flat=False), 
+        with only the region of the framebuffer that has changed since the last update.
+
+        Args:
+            pixels (numpy.ndarray) - the buffer to update
+            width (int) - width of the framebuffer
+            height (int) - height of the framebuffer
+            image_num (int) - the display to update from
+            render (bpy.types.RenderSettings) - render settings, used for the render border
+
+        Returns:
+            (bool) - True if pixels was updated, False if nothing changed
+        """
+
+        region = self._get_dirty_region(image_num)
+        if region is not None and len(region) == 0:
+            return False
 
         try:
-            buffer = f(ctypes.c_size_t(image_num)).contents
-            pixels = list()
+            buffer, start_x, start_y = self._get_framebuffer_view(width, height, image_num=image_num, as_flat=False, render=render)
+            if buffer is None:
+                return False
+            num_rows, num_cols = buffer.shape[:2]
+            if len(pixels) != num_rows * num_cols:
+                return False
+            pixels = pixels.reshape(num_rows, num_cols, 4)
+            if region is None:
+                self._copy_to_rgba(buffer, pixels)
+                return True
+
+            # convert the dirty region into rows and columns of our flipped, cropped view
+            xmin, xmax, ymin, ymax = region
+            r0 = max(start_y - ymax, 0)
+            r1 = min(start_y - ymin + 1, num_rows)
+            c0 = max(xmin - start_x, 0)
+            c1 = min(xmax - start_x + 1, num_cols)
+            if r0 >= r1 or c0 >= c1:
+                return False
+            self._copy_to_rgba(buffer[r0:r1, c0:c1], pixels[r0:r1, c0:c1])
+            return True
+        except Exception as e:
+            rfb_log().error("Could not update buffer: %s" % str(e))
+            return False
+
+    def _get_buffer(self, width, height, image_num=0, as_flat=True, render=None):
+        try:
+            buffer, start_x, start_y = self._get_framebuffer_view(width, height, image_num=image_num, as_flat=as_flat, render=render)
+            if buffer is None:
+                return None
 
-            # we need to flip the image
-            # also, Blender is expecting a 4 channel image
+            pixels = np.empty(buffer.shape[:2] + (4,), dtype=np.float32)
+            self._copy_to_rgba(buffer, pixels)
 
             if as_flat:
-                # return the buffer as a flat list
-                for y in range(height-1, -1, -1):
-                    i = (width * y * num_channels)
-                    
-                    # if this is already a 4 channel image, just slice it
-                    if num_channels == 4:
-                        j = i + (num_channels * (width))          
-                        pixels.extend(buffer[i:j])
-                        continue
-
-                    for x in range(0, width):
-                        j = i + (num_channels * x)
-                        if num_channels == 3:
-                            pixels.append(buffer[j])
-                            pixels.append(buffer[j+1])
-                            pixels.append(buffer[j+2])
-                            pixels.append(1.0)
-                        elif num_channels == 2:
-                            pixels.append(buffer[j])
-                            pixels.append(buffer[j+1])
-                            pixels.append(1.0)                        
-                            pixels.append(1.0)                        
-                        elif num_channels == 1:
-                            pixels.append(buffer[j])
-                            pixels.append(buffer[j])
-                            pixels.append(buffer[j])   
-                            pixels.append(1.0)                               
-            else:
-                start_x = 0
-                end_x = width
-                start_y = height-1
-                end_y = -1
-
-                if render and render.use_border:
-                    start_y = int(height * (render.border_max_y))-1 
-                    end_y = int(height * (render.border_min_y))-1
-                    if render.border_min_x > 0.0:
-                        start_x = int(width * render.border_min_x)-1
-                    if render.border_max_x < 1.0:
-                        end_x =  int(width * render.border_max_x)-2
-
-                # return the buffer as a list of lists
-                for y in range(start_y, end_y, -1):
-                    i = (width * y * num_channels)
-
-                    for x in range(start_x, end_x):
-                        j = i + (num_channels * x)
-                        pixel = []
-                        pixel.append(buffer[j])    
-                        if num_channels == 4:
-                            pixel.append(buffer[j+1])
-                            pixel.append(buffer[j+2])
-                            pixel.append(buffer[j+3])                            
-                        elif num_channels == 3:
-                            pixel.append(buffer[j+1])
-                            pixel.append(buffer[j+2])
-                            pixel.append(1.0)
-                        elif num_channels == 2:
-                            pixel.append(buffer[j+1])
-                            pixel.append(1.0)                        
-                            pixel.append(1.0)                        
-                        elif num_channels == 1:
-                            pixel.append(buffer[j])
-                            pixel.append(buffer[j])      
-                            pixel.append(1.0)  
-
-                        pixels.append(pixel)            
-
-            return pixels
+                # return the buffer as a flat array
+                return pixels.reshape(-1)
+
+            # return the buffer as an array of pixels
+            return pixels.reshape(-1, 4)
         except Exception as e:
             rfb_log().error("Could not get buffer: %s" % str(e))
             return None                             
@@ -1145,20 +1339,25 @@ class RmanRender(object):
         height = self.viewport_res_y
 
         pixels = self._get_buffer(width, height)
-        if not pixels:
+        if pixels is None:
             rfb_log().error("Could not save snapshot.")
             return
 
         nm = 'rman_viewport_snapshot_<F4>_%d' % len(bpy.data.images)
         nm = string_utils.expand_string(nm, frame=frame)
         img = bpy.data.images.new(nm, width, height, float_buffer=True, alpha=True)                
-        img.pixels = pixels
+        img.pixels.foreach_set(pixels)
         img.update()
        
     def update_scene(self, context, depsgraph):
         if self.rman_interactive_running:
             self.rman_scene_sync.update_scene(context, depsgraph)
+            if self.update_scheduler:
+                # the edit will restart the render, start polling quickly again
+                self.update_scheduler.wake()
 
     def update_view(self, context, depsgraph):
         if self.rman_interactive_running:
             self.rman_scene_sync.update_view(context, depsgraph)
+            if self.update_scheduler:
+                self.update_scheduler.wake()
@@ -0,0 +1,172 @@
+import subprocess
+import tempfile
+import json
+import time
+import os
+import bpy
+from .rfb_utils import string_utils
+from .rfb_utils.prefs_utils import get_pref
+from .rfb_logger import rfb_log
+
+# Script run by each worker. It exports its chunk of frames to RIB, the same
+# way a regular external render does, then writes out how long each frame took.
+__RIB_WORKER_SCRIPT__ = '''
+import bpy
+import json
+import importlib
+scene = bpy.data.scenes[%(scene)r]
+rm = scene.renderman
+scene.frame_start = %(frame_start)d
+scene.frame_end = %(frame_end)d
+rm.external_animation = True
+rm.enable_external_rendering = True
+rm.rib_parallel_export = 0
+rm.queuing_system = 'none'
+bpy.ops.render.render(layer=%(layer)r, scene=%(scene)r)
+rman_render = importlib.import_module('%(package)s.rman_render').RmanRender.get_rman_render()
+with open(%(report)r, 'w') as f:
+    json.dump(rman_render.rib_export_times, f)
+'''
+
+class RmanRibExporter(object):
+    '''
+    Export a frame range to RIB using several background Blender processes.
+    The current file needs to have been saved.
+    The frame range is split into contiguous chunks, one per worker. Each worker
+    writes its frames to the usual path_rib_output location, so the RIB files can
+    be spooled exactly like the ones from a serial export.
+
+    Attributes:
+        rman_render (RmanRender) - the RmanRender instance
+        bl_scene (bpy.types.Scene) - the scene being exported
+        bl_view_layer (bpy.types.ViewLayer) - the view layer being exported
+        num_workers (int) - maximum number of worker processes
+        frame_times (dict) - export time, in seconds, for each frame that was exported
+        failed_frames (list) - frames that did not get exported
+    '''
+
+    def __init__(self, rman_render, depsgraph):
+        self.rman_render = rman_render
+        self.bl_scene = depsgraph.scene_eval
+        self.bl_view_layer = depsgraph.view_layer
+        self.num_workers = get_pref('rman_rib_export_processes', default=4)
+        self.frame_times = dict()
+        self.failed_frames = list()
+
+    def _get_chunks(self, frame_start, frame_end):
+        frames = list(range(frame_start, frame_end + 1))
+        num_chunks = max(1, min(self.num_workers, len(frames)))
+        chunk_size, remainder = divmod(len(frames), num_chunks)
+        chunks = []
+        i = 0
+        for c in range(num_chunks):
+            size = chunk_size + (1 if c < remainder else 0)
+            chunks.append((frames[i], frames[i + size - 1]))
+            i += size
+        return chunks
+
+    def _save_stash_file(self):
+        # workers load a copy of the current file, so that unsaved
+        # changes are exported as well. Like external_blender_batch, save the
+        # copy next to the original, and set blend_token to the real filename,
+        # so that <blend>, <blend_dir> and <OUT> expand the same in the workers.
+        bl_scene_file = bpy.data.filepath
+        _id = 'pid%s_%d' % (str(os.getpid()), int(time.time()))
+        bl_filepath = os.path.dirname(bl_scene_file)
+        bl_filename = os.path.splitext(os.path.basename(bl_scene_file))[0]
+        bl_stash_scene_file = os.path.join(bl_filepath, '_%s%s_ribexport_.blend' % (bl_filename, _id))
+        rm = self.bl_scene.original.renderman
+        rm.blend_token = bl_filename
+        try:
+            bpy.ops.wm.save_as_mainfile(filepath=bl_stash_scene_file, copy=True)
+        finally:
+            # now reset the token back
+            rm.blend_token = ''
+        return bl_stash_scene_file
+
+    def _start_worker(self, bl_stash_scene_file, frame_start, frame_end, tmp_dir):
+        report = os.path.join(tmp_dir, 'frames_%d_%d.json' % (frame_start, frame_end))
+        log = os.path.join(tmp_dir, 'frames_%d_%d.log' % (frame_start, frame_end))
+        script = __RIB_WORKER_SCRIPT__ % {'frame_start': frame_start,
+                                          'frame_end': frame_end,
+                                          'scene': self.bl_scene.name,
+                                          'layer': self.bl_view_layer.name,
+                                          'package': __package__,
+                                          'report': report}
+        args = [bpy.app.binary_path, '-b', bl_stash_scene_file,
+                '--python-exit-code', '1',
+                '--python-expr', script]
+        rfb_log().debug("Starting RIB export worker for frames %d-%d" % (frame_start, frame_end))
+        log_file = open(log, 'w')
+        proc = subprocess.Popen(args, stdout=log_file, stderr=subprocess.STDOUT)
+        return {'proc': proc, 'frame_start': frame_start, 'frame_end': frame_end,
+                'report': report, 'log': log, 'log_file': log_file}
+
+    def _collect_worker(self, worker):
+        worker['log_file'].close()
+        frame_start = worker['frame_start']
+        frame_end = worker['frame_end']
+        times = dict()
+        if os.path.exists(worker['report']):
+            try:
+                with open(worker['report'], 'r') as f:
+                    times = dict([(int(k), v) for k, v in json.load(f).items()])
+            except (IOError, ValueError) as e:
+                rfb_log().error("Could not read RIB export report %s: %s" % (worker['report'], str(e)))
+
+        if worker['proc'].returncode != 0:
+            log_tail = ''
+            try:
+                with open(worker['log'], 'r') as f:
+                    log_tail = ''.join(f.readlines()[-20:])
+            except IOError:
+                pass
+            rfb_log().error("RIB export worker for frames %d-%d failed (exit code %d):\n%s" %
+                            (frame_start, frame_end, worker['proc'].returncode, log_tail))
+
+        for frame in range(frame_start, frame_end + 1):
+            if frame in times:
+                self.frame_times[frame] = times[frame]
+            else:
+                self.failed_frames.append(frame)
+
+    def export(self):
+        """ Export the scene's frame range to RIB.
+
+        Returns:
+            (bool) - True if all frames were exported
+        """
+        frame_start = self.bl_scene.frame_start
+        frame_end = self.bl_scene.frame_end
+        chunks = self._get_chunks(frame_start, frame_end)
+        rfb_log().info("Exporting frames %d-%d to RIB using %d processes..." % (frame_start, frame_end, len(chunks)))
+
+        time_start = time.time()
+        tmp_dir = tempfile.mkdtemp(prefix='rfb_ribexport_')
+        bl_stash_scene_file = self._save_stash_file()
+        workers = [self._start_worker(bl_stash_scene_file, s, e, tmp_dir) for (s, e) in chunks]
+        for worker in workers:
+            worker['proc'].wait()
+            self._collect_worker(worker)
+
+        for frame in sorted(self.frame_times.keys()):
+            rib_output = string_utils.expand_string(self.bl_scene.renderman.path_rib_output,
+                                                    frame=frame,
+                                                    asFilePath=True)
+            rfb_log().info("Frame %d exported to %s. Time: %s" % (frame, rib_output, string_utils._format_time_(self.frame_times[frame])))
+        if self.failed_frames:
+            rfb_log().error("Failed to export frames: %s" % ', '.join([str(f) for f in sorted(self.failed_frames)]))
+
+        try:
+            os.remove(bl_stash_scene_file)
+        except OSError:
+            pass
+        if not self.failed_frames:
+            for f in os.listdir(tmp_dir):
+                os.remove(os.path.join(tmp_dir, f))
+            os.rmdir(tmp_dir)
+        else:
+            rfb_log().error("RIB export worker logs are in %s" % tmp_dir)
+
+        rfb_log().info("Finished exporting %d frames. Total time: %s" % (len(self.frame_times), string_utils._format_time_(time.time() - time_start)))
+        return not self.failed_frames
@@ -3,6 +3,7 @@ from .rman_translators.rman_camera_translator import RmanCameraTranslator
 from .rman_translators.rman_light_translator import RmanLightTranslator
 from .rman_translators.rman_lightfilter_translator import RmanLightFilterTranslator
 from .rman_translators.rman_mesh_translator import RmanMeshTranslator
+from .rman_translators import rman_mesh_translator
 from .rman_translators.rman_material_translator import RmanMaterialTranslator
 from .rman_translators.rman_hair_translator import RmanHairTranslator
 from .rman_translators.rman_group_translator import RmanGroupTranslator
@@ -23,6 +24,7 @@ from .rman_translators.rman_brickmap_translator import RmanBrickmapTranslator
 from .rman_translators.rman_emitter_translator import RmanEmitterTranslator
 from .rman_translators.rman_empty_translator import RmanEmptyTranslator
 from .rman_translators.rman_alembic_translator import RmanAlembicTranslator
+from .rman_sg_nodes.rman_sg_node_dict import RmanSgNodeDict
 
 # utils
 from .rfb_utils import object_utils
@@ -38,6 +40,7 @@ from .rfb_utils.prefs_utils import get_pref
 from .rfb_utils import shadergraph_utils
 from .rfb_utils import color_manager_blender
 from .rfb_utils import scenegraph_utils
+from .rfb_utils import geocache_utils
 
 # config
 from .rman_config import __RFB_CONFIG_DICT__ as rfb_config
@@ -49,6 +52,9 @@ from .rman_sg_nodes.rman_sg_node import RmanSgNode
 import bpy
 import os
 import sys
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
 class RmanScene(object):
     '''
@@ -70,14 +76,22 @@ class RmanScene(object):
         external_render (bool) - whether we are exporting for external (RIB) renders
         is_viewport_render (bool) - whether we are rendering into Blender's viewport
         scene_solo_light (bool) - user has solo'd a light (all other lights are muted)
-        rman_materials (dict) - dictionary of scene's materials
-        rman_objects (dict) - dictionary of all objects
+        rman_materials (RmanSgNodeDict) - dictionary of scene's materials
+        rman_objects (RmanSgNodeDict) - dictionary of all objects
         rman_translators (dict) - dictionary of all RmanTranslator(s)
         rman_particles (dict) - dictionary of all particle systems used
         rman_cameras (dict) - dictionary of all cameras in the scene
         obj_hash (dict) - dictionary of hashes to objects ( for object picking )
         moving_objects (dict) - dictionary of objects that are moving/deforming in the scene
-        processed_obs (dict) - dictionary of objects already processed
+        processed_obs (set) - set of objects already processed
+        rman_instance_owners (dict) - dictionary of group db_names to the RmanSgNode that owns the
+                                instance (reverse index of RmanSgNode.instances)
+        rman_instance_batches (dict) - dictionary of (prototype, particle settings, parent) keys to the
+                                group that holds the attributes and material shared by a batch of instances
+        rman_prototypes (dict) - dictionary of mesh prototype keys to the RmanSgMesh that owns
+                                the shared RixSGMesh (see object_utils.get_mesh_prototype_key)
+        rman_frame_sensitive (set) - set of RmanSgNodes that need to be updated when the frame changes
+                                (see RmanSgNode.is_frame_sensitive)
         motion_steps (set) - the full set of motion steps for the scene, including 
                             overrides from individual objects
         main_camera (RmanSgCamera) - pointer to the main scene camera                            
@@ -112,14 +126,18 @@ class RmanScene(object):
         self.scene_any_lights = False
         self.is_xpu = False
 
-        self.rman_materials = dict()
-        self.rman_objects = dict()
+        self.rman_materials = RmanSgNodeDict()
+        self.rman_objects = RmanSgNodeDict()
         self.rman_translators = dict()
         self.rman_particles = dict()
         self.rman_cameras = dict()
         self.obj_hash = dict() 
         self.moving_objects = dict()
-        self.processed_obs = []
+        self.processed_obs = set()
+        self.rman_instance_owners = dict()
+        self.rman_instance_batches = dict()
+        self.rman_prototypes = dict()
+        self.rman_frame_sensitive = set()
 
         self.motion_steps = set()
         self.main_camera = None
@@ -181,6 +199,10 @@ class RmanScene(object):
         self.moving_objects.clear()
         
         self.processed_obs.clear()
+        self.rman_instance_owners.clear()
+        self.rman_instance_batches.clear()
+        self.rman_prototypes.clear()
+        self.rman_frame_sensitive.clear()
   
         self.render_default_light = False
         self.world_df_node = None
@@ -326,6 +348,10 @@ class RmanScene(object):
         self.export_samplefilters()
         self.export_displayfilters()
 
+        if not self.is_interactive:
+            rfb_log().debug("Calling export_mesh_data_blocks()")
+            self.export_mesh_data_blocks()
+
         if self.do_motion_blur:
             rfb_log().debug("Calling export_instances_motion()")
             self.export_instances_motion()
@@ -522,6 +548,137 @@ class RmanScene(object):
     def get_root_sg_node(self):
         return self.sg_scene.Root()
 
+    def _remove_instancer(self, rman_sg_node, rman_sg_group):
+        bl_instancer = getattr(rman_sg_group, 'bl_instancer', None)
+        if bl_instancer is None:
+            return
+        num = rman_sg_node.instancers.get(bl_instancer, 0) - 1
+        if num > 0:
+            rman_sg_node.instancers[bl_instancer] = num
+        else:
+            rman_sg_node.instancers.pop(bl_instancer, None)
+
+    def add_instance(self, rman_sg_node, group_db_name, rman_sg_group, bl_instancer=None):
+        """ Add an instance to rman_sg_node, and record rman_sg_node as its owner
+
+        Args:
+            rman_sg_node (RmanSgNode) - the node being instanced
+            group_db_name (str) - the group db_name of the instance
+            rman_sg_group (RmanSgGroup) - the instance
+            bl_instancer (bpy.types.Object) - the original object that made this instance, 
+                                              if it is not an instance of the object itself
+        """
+        old_rman_sg_group = rman_sg_node.instances.get(group_db_name, None)
+        if old_rman_sg_group:
+            self._remove_instancer(rman_sg_node, old_rman_sg_group)
+        rman_sg_group.bl_instancer = bl_instancer
+        if bl_instancer is not None:
+            rman_sg_node.instancers[bl_instancer] = rman_sg_node.instancers.get(bl_instancer, 0) + 1
+        rman_sg_node.instances[group_db_name] = rman_sg_group
+        self.rman_instance_owners[group_db_name] = rman_sg_node
+
+    def remove_instance(self, rman_sg_node, group_db_name):
+        """ Remove an instance from rman_sg_node. This does not delete the
+        scene graph node of the instance.
+
+        Args:
+            rman_sg_node (RmanSgNode) - the node being instanced
+            group_db_name (str) - the group db_name of the instance
+
+        Returns:
+            (RmanSgGroup) - the removed instance, or None if it was not found
+        """
+        if self.rman_instance_owners.get(group_db_name, None) == rman_sg_node:
+            self.rman_instance_owners.pop(group_db_name)
+        rman_sg_group = rman_sg_node.instances.pop(group_db_name, None)
+        if rman_sg_group:
+            self._remove_instancer(rman_sg_node, rman_sg_group)
+        return rman_sg_group
+
+    def clear_instances(self, rman_sg_node):
+        """ Remove all instances from rman_sg_node. This does not delete the
+        scene graph nodes of the instances.
+
+        Args:
+            rman_sg_node (RmanSgNode) - the node being instanced
+        """
+        for group_db_name in rman_sg_node.instances.keys():
+            if self.rman_instance_owners.get(group_db_name, None) == rman_sg_node:
+                self.rman_instance_owners.pop(group_db_name)
+        rman_sg_node.instances.clear()
+        rman_sg_node.instancers.clear()
+
+    def has_only_own_instances(self, rman_sg_node):
+        """ Check if all of the instances of rman_sg_node are instances of
+        the object itself, i.e.: none of them come from an instancer. The
+        instances of these objects can be updated without going through 
+        depsgraph.object_instances.
+
+        Args:
+            rman_sg_node (RmanSgNode) - the node being instanced
+
+        Returns:
+            (bool) - True if rman_sg_node has instances, and none come from an instancer
+        """
+        return len(rman_sg_node.instances) > 0 and not rman_sg_node.instancers
+
+    def set_frame_sensitive(self, rman_sg_node, is_frame_sensitive):
+        """ Add or remove rman_sg_node from the set of nodes that need to be
+        updated when the frame changes. This is called when 
+        RmanSgNode.is_frame_sensitive is set.
+
+        Args:
+            rman_sg_node (RmanSgNode) - the node
+            is_frame_sensitive (bool) - whether the node is frame sensitive
+        """
+        if is_frame_sensitive:
+            self.rman_frame_sensitive.add(rman_sg_node)
+        else:
+            self.rman_frame_sensitive.discard(rman_sg_node)
+
+    def get_frame_sensitive(self):
+        """ Get the materials and objects that need to be updated when the frame
+        changes. Nodes that are no longer part of the scene are dropped. IDs
+        that have been invalidated by an undo are skipped, until
+        RmanSceneSync remaps them.
+
+        Returns:
+            (list) - list of (bpy.types.ID, RmanSgNode, RmanTranslator) tuples
+        """
+        frame_sensitive = list()
+        for rman_sg_node in list(self.rman_frame_sensitive):
+            id, rsn = self.rman_materials.find_db_name(rman_sg_node.db_name)
+            if rsn is rman_sg_node:
+                try:
+                    id.name
+                except ReferenceError:
+                    continue
+                frame_sensitive.append((id, rman_sg_node, self.rman_translators['MATERIAL']))
+                continue
+            id, rsn = self.rman_objects.find_db_name(rman_sg_node.db_name)
+            if rsn is not rman_sg_node:
+                self.rman_frame_sensitive.discard(rman_sg_node)
+                continue
+            try:
+                rman_type = object_utils._detect_primitive_(id)
+            except ReferenceError:
+                continue
+            translator = self.rman_translators.get(rman_type, None)
+            if translator:
+                frame_sensitive.append((id, rman_sg_node, translator))
+        return frame_sensitive
+
+    def get_instance_owner(self, group_db_name):
+        """ Get the RmanSgNode that owns the instance group_db_name
+
+        Args:
+            group_db_name (str) - the group db_name of the instance
+
+        Returns:
+            (RmanSgNode) - the owner, or None if there is no such instance
+        """
+        return self.rman_instance_owners.get(group_db_name, None)
+
     def export_materials(self, materials):
         for mat in materials:   
             db_name = object_utils.get_db_name(mat)
@@ -540,16 +697,16 @@ class RmanScene(object):
 
     def export_data_block(self, db_ob):
 
-        # FIXME? 
-        # We currently export a unique geometry/mesh per Object
-        # This means we're not actually sharing datablocks per Object, even if they are shared
-        # in Blender. We do this for a couple of reasons:
+        # For final renders, objects that share a mesh datablock share a single
+        # RixSGMesh, as long as they also have the same modifier stack, the same number
+        # of motion samples and are not deforming (see object_utils.get_mesh_prototype_key).
+        # Otherwise, we export a unique geometry/mesh per Object. We do this because:
         # 
         # 1. Each object can have different modifiers applied. This includes applying a subdiv and/or bevel modifiers.
         # 2. Each object may want a different number of deformation motion samples
         #
-        # This is incredibly wasteful when these don't apply. We could try and detect this case and
-        # create a shareable geometry.
+        # In IPR, we always export a unique mesh per Object, so that edits to one
+        # object don't affect another.
 
         obj = bpy.data.objects.get(db_ob.name, None)
         if not obj and self.is_swatch_render:
@@ -573,7 +730,23 @@ class RmanScene(object):
             if ob.original in self.rman_objects:
                 return
 
-            rman_sg_node = translator.export(ob, db_name)
+            mb_segs = self.bl_scene.renderman.motion_segments
+            if mb_segs > 1 and ob.renderman.motion_segments_override:
+                mb_segs = ob.renderman.motion_segments
+
+            prototype_key = None
+            if rman_type == 'MESH' and not self.is_interactive:
+                if not (self.do_motion_blur and object_utils._is_deforming_(ob)):
+                    prototype_key = object_utils.get_mesh_prototype_key(ob, motion_segments=mb_segs)
+
+            if prototype_key:
+                rman_sg_prototype = self.rman_prototypes.get(prototype_key, None)
+                rman_sg_node = translator.export(ob, db_name, rman_sg_prototype=rman_sg_prototype)
+                if rman_sg_node and not rman_sg_prototype:
+                    rman_sg_node.rman_sg_prototype = rman_sg_node
+                    self.rman_prototypes[prototype_key] = rman_sg_node
+            else:
+                rman_sg_node = translator.export(ob, db_name)
             if not rman_sg_node:
                 return
             rman_sg_node.rman_type = rman_type
@@ -605,7 +778,7 @@ class RmanScene(object):
                     ob_psys[psys.settings.original] = rman_sg_particles
                     self.rman_particles[ob.original] = ob_psys 
                     self.rman_objects[psys.settings.original] = rman_sg_particles  
-                    self.processed_obs.append(psys.settings.original)
+                    self.processed_obs.add(psys.settings.original)
                     rman_sg_node.rman_sg_particle_group_node.sg_node.AddChild(rman_sg_particles.sg_node)
 
             elif rman_type == 'EMPTY' and (ob.hide_render or ob.hide_viewport):
@@ -617,10 +790,7 @@ class RmanScene(object):
             # motion blur
             # we set motion steps for this object, even if it's not moving
             # it could be moving as part of a particle system
-            mb_segs = self.bl_scene.renderman.motion_segments
             if mb_segs > 1:
-                if ob.renderman.motion_segments_override:
-                    mb_segs = ob.renderman.motion_segments
                 subframes = scene_utils._get_subframes_(mb_segs, self.bl_scene)
                 rman_sg_node.motion_steps = subframes
                 self.motion_steps.update(subframes)
@@ -632,6 +802,142 @@ class RmanScene(object):
                     rman_sg_node.is_transforming = False
                     rman_sg_node.is_deforming = False                
 
+    def export_mesh_data_blocks(self):
+        '''Translate the geometry of all visible, non-deforming meshes in batches.
+
+        Each batch is gathered from Blender on the main thread, the primvar arrays
+        are then built in a pool of worker threads, while the next batch is being
+        gathered. Finally, the results are handed to the scene graph, again on the main
+        thread. Objects handled here are added to processed_obs, so _export_instance
+        will not translate them again.
+        '''
+        translator = self.rman_translators['MESH']
+        num_workers = get_pref('rman_export_workers', default=4)
+        batch_size = num_workers * 4
+        stats_mgr = self.rman_render.stats_mgr
+
+        # collect the meshes we need to translate. Objects that share a prototype
+        # only need to be translated once.
+        mesh_obs = []
+        visited = set()
+        visited_prototypes = set()
+        for ob_inst in self.depsgraph.object_instances:
+            if not ob_inst.show_self:
+                continue
+            if ob_inst.is_instance:
+                ob = ob_inst.instance_object
+            else:
+                ob = ob_inst.object
+            if ob.original in visited:
+                continue
+            visited.add(ob.original)
+            if ob.original in self.processed_obs:
+                continue
+            rman_sg_node = self.rman_objects.get(ob.original, None)
+            if not rman_sg_node or rman_sg_node.rman_type != 'MESH':
+                continue
+            if rman_sg_node.is_deforming or not rman_sg_node.sg_node:
+                # deforming meshes are translated at the first motion sample
+                continue
+            rman_sg_target = rman_sg_node.rman_sg_prototype
+            if rman_sg_target:
+                if rman_sg_target.npoints > -1 or id(rman_sg_target) in visited_prototypes:
+                    continue
+                visited_prototypes.add(id(rman_sg_target))
+            else:
+                rman_sg_target = rman_sg_node
+            mesh_obs.append((ob, rman_sg_node, rman_sg_target))
+
+        total = len(mesh_obs)
+        if total < 1:
+            return
+
+        gather_time = 0.0
+        build_time = 0.0
+        apply_time = 0.0
+        cache_hits = 0
+        cache_misses = 0
+        geocache = geocache_utils.get_geocache()
+
+        def _build(mesh_data, cache_key):
+            start = time.perf_counter()
+            rman_mesh_translator.build_mesh_data(mesh_data)
+            if cache_key:
+                geocache.put(cache_key, mesh_data)
+            return time.perf_counter() - start
+
+        def _gather(batch):
+            # Returns a list of (mesh data, cache key, whether the mesh data
+            # came from the geometry cache, and so is already built)
+            nonlocal cache_hits, cache_misses
+            results = []
+            for ob, rman_sg_node, rman_sg_target in batch:
+                cache_key = None
+                if geocache:
+                    cache_key = rman_mesh_translator.get_geo_cache_key(ob, self.bl_frame_current)
+                if cache_key:
+                    mesh_data = geocache.get(cache_key)
+                    if mesh_data:
+                        cache_hits += 1
+                        results.append((mesh_data, cache_key, True))
+                        continue
+                    cache_misses += 1
+                results.append((rman_mesh_translator.gather_mesh_data(ob), cache_key, False))
+            return results
+
+        batches = [mesh_obs[i:i+batch_size] for i in range(0, total, batch_size)]
+        executor = None
+        if num_workers > 1:
+            executor = ThreadPoolExecutor(max_workers=num_workers)
+
+        try:
+            start = time.perf_counter()
+            next_data = _gather(batches[0])
+            gather_time += time.perf_counter() - start
+            num_done = 0
+            for i, batch in enumerate(batches):
+                batch_data = next_data
+                if executor:
+                    futures = [executor.submit(_build, d, k) for (d, k, cached) in batch_data if d and not cached]
+                else:
+                    build_time += sum([_build(d, k) for (d, k, cached) in batch_data if d and not cached])
+
+                # gather the next batch while this one builds
+                if i+1 < len(batches):
+                    start = time.perf_counter()
+                    next_data = _gather(batches[i+1])
+                    gather_time += time.perf_counter() - start
+
+                if executor:
+                    build_time += sum([f.result() for f in futures])
+
+                start = time.perf_counter()
+                for (ob, rman_sg_node, rman_sg_target), (mesh_data, cache_key, cached) in zip(batch, batch_data):
+                    if mesh_data:
+                        translator.update(ob, rman_sg_target, mesh_data=mesh_data)
+                    if rman_sg_node == rman_sg_target:
+                        translator.export_object_primvars(ob, rman_sg_node)
+                        self.processed_obs.add(ob.original)
+                    num_done += 1
+                    stats_mgr.set_export_stats("Exporting meshes", num_done/total)
+                apply_time += time.perf_counter() - start
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+
+        stats_mgr.add_timing('Mesh Gather', gather_time)
+        stats_mgr.add_timing('Mesh Build', build_time)
+        stats_mgr.add_timing('Mesh Apply', apply_time)
+        stats_mgr.incr_counter('Meshes Exported', total)
+        if geocache:
+            stats_mgr.incr_counter('Geometry Cache Hits', cache_hits)
+            stats_mgr.incr_counter('Geometry Cache Misses', cache_misses)
+            geocache_stats = geocache.get_stats()
+            rfb_log().info("Geometry cache: %d hits, %d misses, %d evictions, %d entries (%.1f MB)" % 
+                            (geocache_stats['hits'], geocache_stats['misses'], geocache_stats['evictions'],
+                             geocache_stats['entries'], geocache_stats['size'] / (1024.0 * 1024.0)))
+        rfb_log().debug("Exported %d meshes using %d threads (gather: %.3f secs, build: %.3f secs, apply: %.3f secs)" % (total, num_workers, gather_time, build_time, apply_time))
+
     def export_defaultlight(self):
         # Export a headlight light if needed
         if not self.default_light:
@@ -741,7 +1047,7 @@ class RmanScene(object):
                 if not ob.original in self.processed_obs:
                     translator.update(ob, rman_sg_node)
                     translator.export_object_primvars(ob, rman_sg_node)
-                    self.processed_obs.append(ob.original)
+                    self.processed_obs.add(ob.original)
 
                 rman_sg_group = rman_group_translator.export(ob, group_db_name)
                 if ob.is_instancer and ob.instance_type != 'NONE':
@@ -766,7 +1072,7 @@ class RmanScene(object):
                     self.get_root_sg_node().AddChild(rman_sg_group.sg_node)
 
                 # add this instance to rman_sg_node
-                rman_sg_node.instances[group_db_name] = rman_sg_group                     
+                self.add_instance(rman_sg_node, group_db_name, rman_sg_group, bl_instancer=parent.original if parent else None)
 
             # object attrs       
             translator.export_object_attributes(ob, rman_sg_group)                    
@@ -806,8 +1112,124 @@ class RmanScene(object):
             else:
                 rman_group_translator.update_transform(ob_inst, rman_sg_group)
 
+    def _add_instance_to_batch(self, ob_inst, batches):
+        """ Add a particle or geometry node instance to a batch of instances
+        that share the same prototype, material and attributes. Only the
+        instance groups and their ids are created here, their transforms are
+        set in _export_instance_batches.
+
+        Args:
+            ob_inst (bpy.types.DepsgraphObjectInstance) - the instance
+            batches (dict) - the batches being collected
+
+        Returns:
+            (bool) - False if this instance cannot be batched, and should go
+                     through _export_instance
+        """
+        if not ob_inst.is_instance:
+            return False
+
+        ob = ob_inst.instance_object
+        psys = ob_inst.particle_system
+        parent = ob_inst.parent
+        if ob.type in ('ARMATURE', 'CAMERA'):
+            return False
+        if ob.is_instancer and ob.instance_type != 'NONE':
+            return False
+
+        rman_type = object_utils._detect_primitive_(ob)
+        if rman_type in ('LIGHT', 'LIGHTFILTER', 'EMPTY', 'META'):
+            return False
+        if ob.parent and object_utils._detect_primitive_(ob.parent) == 'EMPTY':
+            return False
+
+        rman_sg_node = self.rman_objects.get(ob.original, None)
+        if not rman_sg_node or rman_sg_node.sg_node is None or rman_sg_node.is_transforming:
+            return False
+
+        translator = self.rman_translators.get(rman_type, None)
+        if not translator:
+            return False
+
+        group_db_name = object_utils.get_group_db_name(ob_inst)
+        if group_db_name in rman_sg_node.instances:
+            # we've already added this instance
+            return True
+
+        psys_settings = None
+        if psys:
+            psys_settings = psys.settings.original
+            parent_sg_node = self.rman_objects.get(parent.original, None)
+            if parent_sg_node:
+                parent_sg_node.objects_instanced.add(ob.original)
+
+        key = (ob.original, psys_settings, parent.original)
+        batch = batches.get(key, None)
+        if not batch:
+            if not ob.original in self.processed_obs:
+                translator.update(ob, rman_sg_node)
+                translator.export_object_primvars(ob, rman_sg_node)
+                self.processed_obs.add(ob.original)
+                # the update may have left us without a prototype
+                # (ex: the mesh is now empty)
+                if rman_sg_node.sg_node is None:
+                    return False
+
+            # the attributes and material are the same for every instance in the
+            # batch, so we only set them once, on a group shared by all of the instances
+            rman_sg_batch = self.rman_instance_batches.get(key, None)
+            if not rman_sg_batch:
+                batch_db_name = '%s|batch%d' % (rman_sg_node.db_name, len(self.rman_instance_batches))
+                rman_sg_batch = self.rman_translators['GROUP'].export(ob, batch_db_name)
+                rman_sg_batch.sg_node.AddChild(rman_sg_node.sg_node)
+                rman_sg_batch.rman_sg_node_instance = rman_sg_node
+                translator.export_object_attributes(ob, rman_sg_batch)
+                if psys:
+                    self.attach_particle_material(psys.settings, parent, ob, rman_sg_batch)
+                    rman_sg_batch.bl_psys_settings = psys_settings
+                else:
+                    self.attach_material(ob, rman_sg_batch)
+                self.rman_instance_batches[key] = rman_sg_batch
+
+            batch = (rman_sg_node, rman_sg_batch, list(), list())
+            batches[key] = batch
+
+        (rman_sg_node, rman_sg_batch, rman_sg_groups, matrices) = batch
+        rman_sg_group = self.rman_translators['GROUP'].export(None, group_db_name)
+        rman_sg_group.sg_node.AddChild(rman_sg_batch.sg_node)
+        rman_sg_group.rman_sg_node_instance = rman_sg_node
+        rman_sg_group.bl_psys_settings = rman_sg_batch.bl_psys_settings
+        translator.export_object_id(ob, rman_sg_group, ob_inst)
+        self.get_root_sg_node().AddChild(rman_sg_group.sg_node)
+        self.add_instance(rman_sg_node, group_db_name, rman_sg_group, bl_instancer=parent.original)
+        rman_sg_groups.append(rman_sg_group)
+        matrices.append(ob_inst.matrix_world.copy())
+        return True
+
+    def _export_instance_batches(self, batches):
+        """ Set the transforms of the instances collected by
+        _add_instance_to_batch. Each instance is a group that only holds a
+        transform and its ids, with the shared group of its batch as its child.
+
+        Args:
+            batches (dict) - the batches collected by _add_instance_to_batch
+        """
+        num_instances = 0
+        for (rman_sg_node, rman_sg_batch, rman_sg_groups, matrices) in batches.values():
+            # convert all of the transforms to RenderMan's column order in one go
+            mtxs = np.array(matrices, dtype=np.float32).transpose(0, 2, 1).reshape(-1, 16).tolist()
+            for rman_sg_group, mtx in zip(rman_sg_groups, mtxs):
+                rman_sg_group.sg_node.SetTransform(mtx)
+            num_instances += len(rman_sg_groups)
+
+        stats_mgr = self.rman_render.stats_mgr
+        stats_mgr.incr_counter('Instance Batches', len(batches))
+        stats_mgr.incr_counter('Batched Instances', num_instances)
+
     def export_instances(self, obj_selected=None):
         total = len(self.depsgraph.object_instances)
+        batches = dict()
+        batch_instances = self.bl_scene.renderman.rman_batch_instances and not self.is_interactive
         obj_selected_names = []
         if obj_selected:
             obj_selected_names = [o.name for o in obj_selected]
@@ -827,11 +1249,15 @@ class RmanScene(object):
             if not ob_inst.show_self:
                 continue
 
-            self._export_instance(ob_inst)  
+            if not batch_instances or not self._add_instance_to_batch(ob_inst, batches):
+                self._export_instance(ob_inst)  
             self.rman_render.stats_mgr.set_export_stats("Exporting instances", i/total)
             
             rfb_log().debug("   Exported %d/%d instances..." % (i, total))
 
+        if batches:
+            self._export_instance_batches(batches)
+
     def attach_material(self, ob, rman_sg_node):
         mat = object_utils.get_active_material(ob)
         if mat:
@@ -863,118 +1289,166 @@ class RmanScene(object):
                     scenegraph_utils.set_material(group.sg_node, rman_sg_material.sg_node)
                     group.is_meshlight = rman_sg_material.has_meshlight 
 
+    def _set_motion_sample(self, origframe, seg):
+        if seg < 0.0:
+            self.rman_render.bl_engine.frame_set(origframe - 1, subframe=1.0 + seg)
+        else:
+            self.rman_render.bl_engine.frame_set(origframe, subframe=seg)  
+        self.depsgraph.update()
+
     def export_instances_motion(self, obj_selected=None):
+        '''Export all instances, with motion blur.
+
+        The first motion sample exports every instance with _export_instance(), and
+        works out which instances actually move, and which objects deform. Only those
+        are looked at for the remaining samples. Deformation samples are exported for
+        every sample, including the first. Transform samples are cached per
+        group db_name and written to the scene graph in one pass at the end.
+        '''
         origframe = self.bl_scene.frame_current
-
-        mb_segs = self.bl_scene.renderman.motion_segments
-        origframe = self.bl_scene.frame_current      
-
         motion_steps = sorted(list(self.motion_steps))
-
-        first_sample = False
         delta = -motion_steps[0]
-        for samp, seg in enumerate(motion_steps):
-            first_sample = (samp == 0)
-            if seg < 0.0:
-                self.rman_render.bl_engine.frame_set(origframe - 1, subframe=1.0 + seg)
-            else:
-                self.rman_render.bl_engine.frame_set(origframe, subframe=seg)  
+        stats_mgr = self.rman_render.stats_mgr
+        obj_selected_names = []
+        if obj_selected:
+            obj_selected_names = [o.name for o in obj_selected]
 
-            self.depsgraph.update()
-            time_samp = seg + delta # get the normlized version of the segment
-            total = len(self.depsgraph.object_instances)
-            objFound = False
-            
-            # update camera
-            if not first_sample and self.main_camera.is_transforming and seg in self.main_camera.motion_steps:
-                cam_translator =  self.rman_translators['CAMERA']
-                idx = 0
-                for i, s in enumerate(self.main_camera.motion_steps):
-                    if s == seg:
-                        idx = i
-                        break
-                cam_translator.update_transform(self.depsgraph.scene_eval.camera, self.main_camera, idx, time_samp)
+        # group db_name -> (rman_sg_node, rman_sg_group, (N, 4, 4) matrix samples, sample times)
+        moving_instances = dict()
+        # non-instanced moving objects, we can get their matrices without
+        # walking all of the depsgraph instances
+        moving_objects = list()
+        # prototypes of instances that move
+        moving_prototypes = set()
+        num_static = 0
 
-            for i, ob_inst in enumerate(self.depsgraph.object_instances):  
-                if obj_selected:
-                    if objFound:
-                        break
-
-                    if ob_inst.is_instance:
-                        if ob_inst.instance_object.name == obj_selected:
-                            objFound = True
-                    elif ob_inst.object.name == obj_selected.name:
-                            objFound = True
+        self._set_motion_sample(origframe, motion_steps[0])
+        total = len(self.depsgraph.object_instances)
+        for i, ob_inst in enumerate(self.depsgraph.object_instances):
+            psys = None
+            if ob_inst.is_instance:
+                ob = ob_inst.instance_object.original
+                psys = ob_inst.particle_system
+            else:
+                ob = ob_inst.object.original
 
-                    if not objFound:
-                        continue       
+            if obj_selected and ob.name not in obj_selected_names:
+                continue
 
-                if not ob_inst.show_self:
-                    continue                    
+            if not ob_inst.show_self:
+                continue
 
-                if first_sample:
-                    # for the first motion sample use _export_instance()
-                    self._export_instance(ob_inst, seg=time_samp)  
-                    self.rman_render.stats_mgr.set_export_stats("Exporting instances (%f)" % seg, i/total)
-                    continue  
+            # for the first motion sample use _export_instance()
+            self._export_instance(ob_inst, seg=0.0)
+            stats_mgr.set_export_stats("Exporting instances (%f)" % motion_steps[0], i/total)
 
-                rman_group_translator = self.rman_translators['GROUP']
-                psys = None
-                if ob_inst.is_instance:
-                    ob = ob_inst.instance_object.original  
-                    psys = ob_inst.particle_system
-                else:
-                    ob = ob_inst.object
+            rman_sg_node = self.rman_objects.get(ob, None)
+            if not rman_sg_node or ob.type != 'MESH':
+                continue
+            if not (rman_sg_node.is_transforming or psys) or len(rman_sg_node.motion_steps) < 2:
+                num_static += 1
+                continue
 
-                if ob.name_full not in self.moving_objects and not psys:
-                    continue
+            group_db_name = object_utils.get_group_db_name(ob_inst)
+            rman_sg_group = rman_sg_node.instances.get(group_db_name, None)
+            if not rman_sg_group or group_db_name in moving_instances:
+                continue
+            num_samples = len(rman_sg_node.motion_steps)
+            moving_instances[group_db_name] = (rman_sg_node, rman_sg_group, np.zeros((num_samples, 4, 4), dtype=np.float32), [None] * num_samples)
+            if ob_inst.is_instance:
+                moving_prototypes.add(ob)
+            else:
+                moving_objects.append((ob, group_db_name))
+
+        deforming_meshes = [(ob, rman_sg_node) for ob, rman_sg_node in self.rman_objects.items() 
+                            if rman_sg_node.is_deforming and rman_sg_node.rman_type == 'MESH']
+        deforming_particles = list()
+        for ob, ob_psys in self.rman_particles.items():
+            for psys_settings, rman_sg_particles in ob_psys.items():
+                if rman_sg_particles.motion_steps:
+                    deforming_particles.append((ob, psys_settings, rman_sg_particles))
+
+        stats_mgr.incr_counter('Motion Blur Static Instances', num_static)
+        stats_mgr.incr_counter('Motion Blur Moving Instances', len(moving_instances))
+        rfb_log().debug("Motion blur: %d moving instances, %d static instances skipped" % (len(moving_instances), num_static))
+
+        camera_moving = self.main_camera.is_transforming
+        if not (moving_instances or deforming_meshes or deforming_particles or camera_moving):
+            # nothing moves, there's no need to evaluate the other samples
+            self.rman_render.bl_engine.frame_set(origframe, subframe=0)
+            return
 
-                if ob.type not in ['MESH']:
-                    continue                
+        # cache of motion step indices for each rman_sg_node
+        sample_indices = dict()
+        def get_sample_index(rman_sg_node, seg):
+            indices = sample_indices.get(rman_sg_node, None)
+            if indices is None:
+                indices = {s: idx for idx, s in enumerate(rman_sg_node.motion_steps)}
+                sample_indices[rman_sg_node] = indices
+            return indices.get(seg, None)
+
+        def cache_sample(group_db_name, mtx, seg, time_samp):
+            (rman_sg_node, rman_sg_group, samples, times) = moving_instances[group_db_name]
+            idx = get_sample_index(rman_sg_node, seg)
+            if idx is None:
+                return
+            samples[idx] = mtx
+            times[idx] = time_samp
 
-                group_db_name = object_utils.get_group_db_name(ob_inst)          
+        psys_translator = self.rman_translators['PARTICLES']
+        mesh_translator = self.rman_translators['MESH']
+        for samp, seg in enumerate(motion_steps):
+            if samp > 0:
+                # the first sample is already set, and the transforms for it were
+                # exported by _export_instance()
+                self._set_motion_sample(origframe, seg)
+                time_samp = seg + delta # get the normlized version of the segment
+
+                # update camera
+                if camera_moving:
+                    idx = get_sample_index(self.main_camera, seg)
+                    if idx is not None:
+                        cam_translator =  self.rman_translators['CAMERA']
+                        cam_translator.update_transform(self.depsgraph.scene_eval.camera, self.main_camera, idx, time_samp)
+
+                for ob, group_db_name in moving_objects:
+                    cache_sample(group_db_name, ob.evaluated_get(self.depsgraph).matrix_world, seg, time_samp)
+
+                if moving_prototypes:
+                    for ob_inst in self.depsgraph.object_instances:
+                        if not ob_inst.is_instance or ob_inst.instance_object.original not in moving_prototypes:
+                            continue
+                        group_db_name = object_utils.get_group_db_name(ob_inst)
+                        if group_db_name in moving_instances:
+                            cache_sample(group_db_name, ob_inst.matrix_world, seg, time_samp)
 
-                rman_sg_node = self.rman_objects.get(ob.original, None)
-                if not rman_sg_node:
-                    continue
-                
-                if not seg in rman_sg_node.motion_steps:
+            # deformation samples, including the first one
+            for ob, psys_settings, rman_sg_particles in deforming_particles:
+                if not seg in rman_sg_particles.motion_steps:
                     continue
+                ob_eval = ob.evaluated_get(self.depsgraph)
+                for psys in ob_eval.particle_systems:
+                    if psys.settings.original == psys_settings:
+                        psys_translator.export_deform_sample(rman_sg_particles, ob_eval, psys, samp)
+                        break
 
-                idx = 0
-                for i, s in enumerate(rman_sg_node.motion_steps):
-                    if s == seg:
-                        idx = i
-                        break                
-
-                if rman_sg_node.is_transforming or psys:
-                    rman_sg_group = rman_sg_node.instances.get(group_db_name, None)
-                    if rman_sg_group:
-                        rman_group_translator.update_transform_num_samples(rman_sg_group, rman_sg_node.motion_steps ) # should have been set in _export_instances()                       
-                        rman_group_translator.update_transform_sample( ob_inst, rman_sg_group, idx, time_samp)
-
-                self.rman_render.stats_mgr.set_export_stats("Exporting instances (%f)" % seg, i/total)
-
-            for ob_original,rman_sg_node in self.rman_objects.items():
-                ob = ob_original.evaluated_get(self.depsgraph)
-                psys_translator = self.rman_translators['PARTICLES']
-                for psys in ob.particle_systems:
-                    ob_psys = self.rman_particles.get(ob.original, dict())
-                    rman_sg_particles = ob_psys.get(psys.settings.original, None)
-                    if rman_sg_particles:
-                        if not seg in rman_sg_particles.motion_steps:
-                            continue
-                        psys_translator.export_deform_sample(rman_sg_particles, ob, psys, samp)                                    
-
+            for ob, rman_sg_node in deforming_meshes:
                 if rman_sg_node.is_deforming:
-                    rman_type = rman_sg_node.rman_type
-                    if rman_type == 'MESH':
-                        translator = self.rman_translators.get(rman_type, None)
-                        if translator:
-                            translator.export_deform_sample(rman_sg_node, ob, samp)                     
+                    mesh_translator.export_deform_sample(rman_sg_node, ob.evaluated_get(self.depsgraph), samp)
+
+            stats_mgr.set_export_stats("Exporting instances (%f)" % seg, samp/len(motion_steps))
 
         self.rman_render.bl_engine.frame_set(origframe, subframe=0)  
 
+        # write out all of the cached transform samples. The first sample
+        # was already set by _export_instance()
+        for (rman_sg_node, rman_sg_group, samples, times) in moving_instances.values():
+            mtxs = samples.transpose(0, 2, 1).reshape(-1, 16).tolist()
+            for idx, time_samp in enumerate(times):
+                if time_samp is None:
+                    continue
+                rman_sg_group.sg_node.SetTransformSample(idx, mtxs[idx], time_samp)
+
     def check_light_local_view(self, ob, rman_sg_node):
         if self.is_interactive and self.context.space_data:
             if not ob.visible_in_viewport_get(self.context.space_data):  
@@ -1229,7 +1703,7 @@ class RmanScene(object):
                 self.rman_cameras[main_cam.original] = self.main_camera
                 self.rman_objects[main_cam.original] = self.main_camera
       
-                self.processed_obs.append(main_cam.original)
+                self.processed_obs.add(main_cam.original)
         else:
             if self.is_interactive:
                 main_cam = self.context.space_data.camera
@@ -4,11 +4,16 @@ from .rfb_utils import transform_utils
 from .rfb_utils import texture_utils
 from .rfb_utils import scene_utils
 from .rfb_utils import shadergraph_utils
+from .rfb_utils.prefs_utils import get_pref
 
 from .rfb_logger import rfb_log
 from .rman_sg_nodes.rman_sg_lightfilter import RmanSgLightFilter
+from .rman_translators import rman_mesh_translator
 
 from . import rman_constants
+from contextlib import contextmanager
+import threading
+import time
 import bpy
 
 class RmanSceneSync(object):
@@ -38,6 +43,15 @@ class RmanSceneSync(object):
         self.do_add = False # whether or not we need to add an object
         self.num_instances_changed = False # if the number of instances has changed since the last update
 
+        # scene edit that is currently open, see edit()
+        self._edit = None
+        self._edit_depth = 0
+        self._edit_lock = threading.RLock()
+        self._edit_start = 0.0 # time the open edit was started
+        self._edit_last_update = 0.0 # time of the last update_scene call in the open edit
+        self._edit_num_updates = 0 # number of update_scene calls in the open edit
+        self._edit_timer_registered = False
+
     @property
     def sg_scene(self):
         return self.__sg_scene
@@ -46,6 +60,76 @@ class RmanSceneSync(object):
     def sg_scene(self, sg_scene):
         self.__sg_scene = sg_scene          
 
+    def _begin_edit(self):
+        with self._edit_lock:
+            if self._edit is None:
+                self._edit = self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene)
+                self._edit.__enter__()
+                self._edit_start = time.time()
+                self._edit_num_updates = 0
+            self._edit_depth += 1
+
+    def _end_edit(self, debounce=False):
+        with self._edit_lock:
+            self._edit_depth -= 1
+            if self._edit_depth > 0:
+                return
+            if debounce:
+                self._edit_num_updates += 1
+                self._edit_last_update = time.time()
+                debounce_window = get_pref('rman_ipr_edit_debounce', default=0) / 1000.0
+                if debounce_window > 0.0:
+                    # hold the edit open, in case more updates come in
+                    if not self._edit_timer_registered:
+                        self._edit_timer_registered = True
+                        bpy.app.timers.register(self._edit_debounce_timer, first_interval=debounce_window)
+                    return
+            self._commit_edit()
+
+    def _commit_edit(self):
+        with self._edit_lock:
+            if self._edit is None or self._edit_depth > 0:
+                return
+            edit = self._edit
+            self._edit = None
+            edit.__exit__(None, None, None)
+            if self._edit_num_updates > 0:
+                latency = time.time() - self._edit_start
+                self.rman_render.stats_mgr.add_ipr_edit(self._edit_num_updates, latency)
+
+    def _edit_debounce_timer(self):
+        with self._edit_lock:
+            if self._edit is None:
+                self._edit_timer_registered = False
+                return None
+            debounce_window = get_pref('rman_ipr_edit_debounce', default=0) / 1000.0
+            now = time.time()
+            # commit once updates stop coming in. Don't hold the edit
+            # for too long, so that we still see progress during long drags.
+            remaining = debounce_window - (now - self._edit_last_update)
+            if remaining > 0.0 and (now - self._edit_start) < debounce_window * 10.0:
+                return remaining
+            self._edit_timer_registered = False
+            self._commit_edit()
+        return None
+
+    @contextmanager
+    def edit(self):
+        """ Context manager for edits to the scene graph. Edits made while
+        another edit is open are part of the same change set, so the renderer
+        only restarts once, when the outermost edit ends.
+        """
+        self._begin_edit()
+        try:
+            yield
+        finally:
+            self._end_edit()
+
+    def flush_edits(self):
+        """ Commit any edit that is being held open by update debouncing.
+        """
+        self._commit_edit()
+
     def update_view(self, context, depsgraph):
         camera = depsgraph.scene.camera
         self.rman_scene.context = context
@@ -53,7 +137,7 @@ class RmanSceneSync(object):
         self.rman_scene.bl_scene = depsgraph.scene_eval
         rman_sg_camera = self.rman_scene.main_camera
         translator = self.rman_scene.rman_translators['CAMERA']
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+        with self.edit():
             if self.rman_scene.is_viewport_render:
                 ob = translator.update_viewport_resolution(rman_sg_camera)
                 if ob:
@@ -72,7 +156,7 @@ class RmanSceneSync(object):
                     continue
                 self.clear_instances(ob)
                 self.update_instances.add(ob.original)
-            with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):         
+            with self.edit():         
                 self.rman_scene.check_solo_light()
         elif not self.rman_scene.bl_local_view and (self.rman_scene.context.space_data.local_view is not None):
             self.rman_scene.bl_local_view = True   
@@ -81,58 +165,65 @@ class RmanSceneSync(object):
                     continue
                 self.clear_instances(ob)               
                 self.update_instances.add(ob.original)
-            with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):                     
+            with self.edit():                     
                 self.rman_scene.check_solo_light()  
 
         if self.rman_scene.bl_frame_current != self.rman_scene.bl_scene.frame_current:
             # frame changed, update any materials and objects that 
             # are marked as frame sensitive
             self.rman_scene.bl_frame_current = self.rman_scene.bl_scene.frame_current
-            material_translator = self.rman_scene.rman_translators["MATERIAL"]
 
-            with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):  
-                for mat in bpy.data.materials:   
-                    db_name = object_utils.get_db_name(mat)  
-                    rman_sg_material = self.rman_scene.rman_materials.get(mat.original, None)
-                    if rman_sg_material and rman_sg_material.is_frame_sensitive:
-                        material_translator.update(mat, rman_sg_material)
-
-                for o in bpy.data.objects:
-                    rman_type = object_utils._detect_primitive_(o)
-                    rman_sg_node = self.rman_scene.rman_objects.get(o.original, None)
-                    if not rman_sg_node:
-                        continue
-                    translator = self.rman_scene.rman_translators.get(rman_type, None)
-                    if translator and rman_sg_node.is_frame_sensitive:
-                        translator.update(o, rman_sg_node)                   
+            with self.edit():  
+                self._update_frame_sensitive()
+
+    def _update_frame_sensitive(self):
+        for id, rman_sg_node, translator in self.rman_scene.get_frame_sensitive():
+            try:
+                translator.update(id, rman_sg_node)
+            except ReferenceError:
+                rfb_log().debug("Skipping frame sensitive update for %s. ID is no longer valid." % rman_sg_node.db_name)
 
     def _mesh_light_update(self, mat):
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+        # First, find the objects that use this material, and how many instances
+        # they have. We only need to go through the depsgraph instances
+        # until we've seen all of them.
+        mesh_light_obs = set()
+        num_instances = 0
+        for ob, rman_sg_node in self.rman_scene.rman_objects.items():
+            if not rman_sg_node or not rman_sg_node.instances:
+                continue
+            try:
+                if not hasattr(ob.data, 'materials'):
+                    continue
+                if ob.type in ('ARMATURE', 'CURVE', 'CAMERA'):
+                    continue
+                if mat.name not in ob.data.materials:
+                    continue
+            except ReferenceError:
+                continue
+            mesh_light_obs.add(ob)
+            num_instances += len(rman_sg_node.instances)
+
+        if not mesh_light_obs:
+            return
+
+        with self.edit():
             for ob_inst in self.rman_scene.depsgraph.object_instances:
-                psys = None
+                if num_instances < 1:
+                    break
                 if ob_inst.is_instance:
                     ob = ob_inst.instance_object
-                    group_db_name =  object_utils.get_group_db_name(ob_inst)
                 else:
                     ob = ob_inst.object
-                    group_db_name =  object_utils.get_group_db_name(ob_inst)
-                if not hasattr(ob.data, 'materials'):
-                    continue   
-                if ob.type in ('ARMATURE', 'CURVE', 'CAMERA'):
-                    continue                         
+                if ob.original not in mesh_light_obs:
+                    continue
                 rman_sg_node = self.rman_scene.rman_objects.get(ob.original, None)
-                if rman_sg_node:
-                    found = False
-                    for name, material in ob.data.materials.items():
-                        if name == mat.name:
-                            found = True
-
-                    if found:
-                        rman_sg_group = rman_sg_node.instances.get(group_db_name, None)
-                        if rman_sg_group:
-                            rman_sg_node.instances.pop(group_db_name)
-                            self.rman_scene.sg_scene.DeleteDagNode(rman_sg_group.sg_node)                              
-                            self.rman_scene._export_instance(ob_inst)                 
+                group_db_name =  object_utils.get_group_db_name(ob_inst)
+                rman_sg_group = self.rman_scene.remove_instance(rman_sg_node, group_db_name)
+                if rman_sg_group:
+                    num_instances -= 1
+                    self.rman_scene.sg_scene.DeleteDagNode(rman_sg_group.sg_node)                              
+                    self.rman_scene._export_instance(ob_inst)                 
 
     def _material_updated(self, obj):
         mat = obj.id
@@ -143,7 +234,7 @@ class RmanSceneSync(object):
             # Double check if we can't find the material because of an undo
             rman_sg_material = self.update_materials_dict(mat)
 
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):   
+        with self.edit():   
             mat = obj.id              
             if not rman_sg_material:
                 rfb_log().debug("New material: %s" % mat.name)
@@ -155,27 +246,24 @@ class RmanSceneSync(object):
                 translator.update(mat, rman_sg_material)   
 
         # update db_name
-        rman_sg_material.db_name = db_name
+        self.rman_scene.rman_materials.set_db_name(mat.original, db_name)
 
     def _light_filter_transform_updated(self, obj):
         ob = obj.id
         rman_sg_lightfilter = self.rman_scene.rman_objects.get(ob.original, None)
         if rman_sg_lightfilter:
             rman_group_translator = self.rman_scene.rman_translators['GROUP']  
-            with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):              
+            with self.edit():              
                 rman_group_translator.update_transform(ob, rman_sg_lightfilter)
 
     def _gpencil_transform_updated(self, obj):
         ob = obj.id
         rman_sg_gpencil = self.rman_scene.rman_objects.get(ob.original, None)
         if rman_sg_gpencil:
-            with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):       
+            with self.edit():       
                 rman_group_translator = self.rman_scene.rman_translators['GROUP']         
-                for ob_inst in self.rman_scene.depsgraph.object_instances: 
-                    group_db_name = object_utils.get_group_db_name(ob_inst)
-                    rman_sg_group = rman_sg_gpencil.instances.get(group_db_name, None)
-                    if rman_sg_group:
-                        rman_group_translator.update_transform(ob, rman_sg_group)                
+                for rman_sg_group in rman_sg_gpencil.instances.values():
+                    rman_group_translator.update_transform(ob, rman_sg_group)                
 
     def _obj_geometry_updated(self, obj):
         ob = obj.id
@@ -184,7 +272,7 @@ class RmanSceneSync(object):
         rman_sg_node = self.rman_scene.rman_objects.get(ob.original, None)
 
         if rman_type in ['LIGHT', 'LIGHTFILTER', 'CAMERA']:
-            with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+            with self.edit():
                 if rman_type == 'LIGHTFILTER':
                     self.rman_scene.rman_translators['LIGHTFILTER'].update(ob, rman_sg_node)
                     for light_ob in rman_sg_node.lights_list:
@@ -217,7 +305,7 @@ class RmanSceneSync(object):
                 # for now, we don't allow the rman_type to be changed
                 rfb_log().error("Changing primitive type is currently not supported.")
                 return
-            with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):     
+            with self.edit():     
                 translator = self.rman_scene.rman_translators.get(rman_type, None)
                 if not translator:
                     return
@@ -234,7 +322,7 @@ class RmanSceneSync(object):
             # if vis is inherit, and none of the other visibility attrs are set to hide
             if vis == -1 and not ob.hide_get() and int(ob.renderman.mute) == 0:
                 return
-            with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+            with self.edit():
                 if self.rman_scene.check_light_local_view(rman_sg_node):
                     return True                
                 if not ob.hide_get():
@@ -252,7 +340,7 @@ class RmanSceneSync(object):
                 ob_psys = self.rman_scene.rman_particles.get(obj.id.original, dict())
                 rman_sg_particles = ob_psys.get(psys.settings.original, None)
                 if rman_sg_particles:
-                    with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+                    with self.edit():
                         psys_translator = self.rman_scene.rman_translators['PARTICLES']
                         psys_translator.update(obj.id, psys, rman_sg_particles)
                     return
@@ -278,7 +366,7 @@ class RmanSceneSync(object):
 
     def update_particle_systems(self):
 
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):       
+        with self.edit():       
             for ob in self.update_particles:
                 rman_type = object_utils._detect_primitive_(ob)   
                 if rman_type not in ['MESH', 'POINTS']:    
@@ -360,21 +448,68 @@ class RmanSceneSync(object):
     
         else:
             translator = self.rman_scene.rman_translators['EMPTY']
-            with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+            with self.edit():
                 translator.export_transform(ob, rman_sg_node.sg_node)
                 if ob.renderman.export_as_coordsys:
                     self.rman_scene.get_root_sg_node().AddCoordinateSystem(rman_sg_node.sg_node)
                 else:
                     self.rman_scene.get_root_sg_node().RemoveCoordinateSystem(rman_sg_node.sg_node)                       
 
+    def _reemit_own_instances(self, ob, rman_sg_node):
+        # Update the instances of an object that is only instanced by itself. 
+        # The evaluated object has everything we need, so there's no need to find
+        # its instance in depsgraph.object_instances. Returns False if the object
+        # would not be in depsgraph.object_instances as a plain visible object,
+        # and should go through the depsgraph instead.
+        try:
+            ob = ob.evaluated_get(self.rman_scene.depsgraph)
+            if not ob.visible_get(view_layer=self.rman_scene.bl_view_layer):
+                return False
+        except ReferenceError:
+            return True
+        if ob.is_instancer and ob.instance_type != 'NONE':
+            # whether the instancer itself is shown depends on the depsgraph instance
+            return False
+        rman_type = object_utils._detect_primitive_(ob)
+        translator = self.rman_scene.rman_translators.get(rman_type, None)
+        if not translator:
+            return True
+        rman_group_translator = self.rman_scene.rman_translators['GROUP']
+        translator.export_object_primvars(ob, rman_sg_node)
+        for rman_sg_group in rman_sg_node.instances.values():
+            # the depsgraph instance of a non-instanced object has the same
+            # matrix as the object itself
+            rman_group_translator.update_transform_matrix(ob.matrix_world, rman_sg_group)
+            rman_group_translator.export_object_attributes(ob, rman_sg_group)
+            self.rman_scene.attach_material(ob, rman_sg_group)
+        return True
+
     def reemit_instances(self):    
         # update instances
         if not self.update_instances:
             return
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+        with self.edit():
             # Re-emit instances for all objects in self.update_instances
             rfb_log().debug("Re-emit instances")
             rman_group_translator = self.rman_scene.rman_translators['GROUP']
+
+            # Objects that are only instanced by themselves can be updated directly.
+            # Everything else (instances that are missing, or made by an instancer) 
+            # can only be found by going through depsgraph.object_instances. 
+            # If the number of instances changed, we can't trust what we have, so
+            # go through the depsgraph for everything.
+            update_instances = self.update_instances
+            if not self.num_instances_changed:
+                update_instances = set()
+                for ob in self.update_instances:
+                    rman_sg_node = self.rman_scene.rman_objects.get(ob, None)
+                    if rman_sg_node and self.rman_scene.has_only_own_instances(rman_sg_node):
+                        if self._reemit_own_instances(ob, rman_sg_node):
+                            continue
+                    update_instances.add(ob)
+                if not update_instances:
+                    return
+
             for ob_inst in self.rman_scene.depsgraph.object_instances: 
                 parent = None
                 if ob_inst.is_instance:
@@ -383,7 +518,7 @@ class RmanSceneSync(object):
                 else:
                     ob = ob_inst.object
 
-                if ob.original not in self.update_instances:
+                if ob.original not in update_instances:
                     continue
 
                 rman_type = object_utils._detect_primitive_(ob)
@@ -408,7 +543,7 @@ class RmanSceneSync(object):
 
     def clear_instances(self, ob, rman_sg_node=None):
         rfb_log().debug("Deleting instances")
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+        with self.edit():
             if not rman_sg_node:
                 rman_sg_node = self.rman_scene.rman_objects.get(ob.original)
             for k,rman_sg_group in rman_sg_node.instances.items():
@@ -417,20 +552,14 @@ class RmanSceneSync(object):
                     rman_empty_node.sg_node.RemoveChild(rman_sg_group.sg_node)
                 else:
                     self.rman_scene.get_root_sg_node().RemoveChild(rman_sg_group.sg_node)                            
-            rman_sg_node.instances.clear()      
+            self.rman_scene.clear_instances(rman_sg_node)      
 
     def update_materials_dict(self, mat):    
         # See comment below in update_objects_dict 
-        rman_sg_material = None
-        for id, rman_sg_node in self.rman_scene.rman_materials.items():
-            if rman_sg_node:
-                db_name = object_utils.get_db_name(mat)
-                if rman_sg_node.db_name == db_name:
-                    self.rman_scene.rman_materials[mat.original] = rman_sg_node
-                    del self.rman_scene.rman_materials[id]
-                    rman_sg_material = rman_sg_node 
-                    break
-        
+        db_name = object_utils.get_db_name(mat)
+        id, rman_sg_material = self.rman_scene.rman_materials.find_db_name(db_name)
+        if rman_sg_material:
+            self.rman_scene.rman_materials.remap(id, mat.original)
         return rman_sg_material
 
     def update_objects_dict(self, ob, rman_type=None):      
@@ -439,15 +568,10 @@ class RmanSceneSync(object):
         # references to be invalidated (see: https://docs.blender.org/api/current/info_gotcha.html)
         # We don't want to accidentally mistake this for a new object, so we need to update
         # our objects dictionary with the new bpy.types.ID reference
-        rman_sg_node = None
-        for id, rsn in self.rman_scene.rman_objects.items():
-            if rsn:
-                db_name = object_utils.get_db_name(ob, rman_type=rman_type)
-                if rsn.db_name == db_name:
-                    self.rman_scene.rman_objects[ob.original] = rsn
-                    del self.rman_scene.rman_objects[id]
-                    rman_sg_node = rsn
-                    break
+        db_name = object_utils.get_db_name(ob, rman_type=rman_type)
+        id, rman_sg_node = self.rman_scene.rman_objects.find_db_name(db_name)
+        if rman_sg_node:
+            self.rman_scene.rman_objects.remap(id, ob.original)
         return rman_sg_node
 
     def update_collection(self, coll):
@@ -503,6 +627,17 @@ class RmanSceneSync(object):
                         update_geo_instances(modifier.node_group.nodes)
 
     def update_scene(self, context, depsgraph):
+        # Apply all of the changes from this depsgraph update in a single
+        # scene edit. With update debouncing on, the edit stays open
+        # across a burst of updates (ex: dragging an object), and is committed
+        # once the updates stop.
+        self._begin_edit()
+        try:
+            self._update_scene(context, depsgraph)
+        finally:
+            self._end_edit(debounce=self.rman_scene.is_interactive)
+
+    def _update_scene(self, context, depsgraph):
         ## FIXME: this function is waaayyy too big and is doing too much stuff
 
         self.new_objects.clear() 
@@ -540,7 +675,7 @@ class RmanSceneSync(object):
                 self._scene_updated()
 
             elif isinstance(obj.id, bpy.types.World):
-                with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene): 
+                with self.edit(): 
                     self.rman_scene.export_integrator()
                     self.rman_scene.export_samplefilters()
                     self.rman_scene.export_displayfilters()
@@ -553,7 +688,7 @@ class RmanSceneSync(object):
                         continue
                     rman_sg_camera = self.rman_scene.main_camera
                     translator = self.rman_scene.rman_translators['CAMERA']
-                    with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+                    with self.edit():
                         translator.update_viewport_cam(self.rman_scene.bl_scene.camera, rman_sg_camera)       
 
             elif isinstance(obj.id, bpy.types.Material):
@@ -572,7 +707,7 @@ class RmanSceneSync(object):
                 # two loops thru user_map
                 users = context.blend_data.user_map(subset={obj.id.original}, value_types={'OBJECT'})
                 translator = self.rman_scene.rman_translators['MESH']
-                with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+                with self.edit():
                     for o in users[obj.id.original]:
                         rman_type = object_utils._detect_primitive_(o)
                         if rman_type != 'MESH':
@@ -658,7 +793,7 @@ class RmanSceneSync(object):
                 if rman_sg_node and rman_sg_node.sg_node:
                     # update db_name
                     db_name = object_utils.get_db_name(ob, rman_type=rman_type)
-                    rman_sg_node.db_name = db_name
+                    self.rman_scene.rman_objects.set_db_name(obj.id.original, db_name)
 
                     # double check hidden value
                     if rman_type in ['LIGHT']:
@@ -687,7 +822,7 @@ class RmanSceneSync(object):
                         if rman_sg_camera == self.rman_scene.main_camera:
                             continue
                         translator = self.rman_scene.rman_translators['CAMERA']
-                        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+                        with self.edit():
                             translator._update_render_cam_transform(ob, rman_sg_camera)                        
                         continue
                     
@@ -768,8 +903,140 @@ class RmanSceneSync(object):
  
         rfb_log().debug("------End update scene----------")
 
+    def update_frame(self, depsgraph):
+        '''Bring a final render scene up to date after the frame has changed. This is 
+        used for incremental animation RIB export, where one scene is kept across all
+        frames. Only the things that can change from frame to frame are updated: 
+        frame sensitive and animated materials, geometry that the depsgraph updated or that
+        may be animated (see object_utils.is_geometry_animated), particles, animated
+        lights and cameras, instance transforms, and instances that came or went.
+
+        Args:
+            depsgraph (bpy.types.Depsgraph) - the Blender dependency graph, already
+                                              evaluated at the new frame
+        '''
+
+        self.rman_scene.depsgraph = depsgraph
+        self.rman_scene.bl_scene = depsgraph.scene_eval
+        self.rman_scene.bl_frame_current = self.rman_scene.bl_scene.frame_current
+        rman_group_translator = self.rman_scene.rman_translators['GROUP']
+        num_transforms = 0
+        num_geometry = 0
+
+        with self.edit():
+            # options and displays can reference the frame number
+            self.rman_scene.export_global_options()
+            self.rman_scene.export_displays()
+
+            self._update_frame_sensitive()
+            material_translator = self.rman_scene.rman_translators["MATERIAL"]
+            for mat in [m for m in depsgraph.ids if isinstance(m, bpy.types.Material)]:
+                if not (mat.animation_data or (mat.node_tree and mat.node_tree.animation_data)):
+                    continue
+                rman_sg_material = self.rman_scene.rman_materials.get(mat.original, None)
+                if rman_sg_material and not rman_sg_material.is_frame_sensitive:
+                    material_translator.update(mat, rman_sg_material)
+
+            # geometry and lights
+            geometry_updated = set()
+            for update in depsgraph.updates:
+                if isinstance(update.id, bpy.types.Object) and update.is_updated_geometry:
+                    geometry_updated.add(update.id.original)
+
+            psys_translator = self.rman_scene.rman_translators['PARTICLES']
+            for ob in depsgraph.objects:
+                rman_sg_node = self.rman_scene.rman_objects.get(ob.original, None)
+                if not rman_sg_node or rman_sg_node.is_frame_sensitive:
+                    continue
+                rman_type = object_utils._detect_primitive_(ob)
+                translator = self.rman_scene.rman_translators.get(rman_type, None)
+                if not translator:
+                    continue
+
+                is_updated = ob.original in geometry_updated or object_utils.is_geometry_animated(ob)
+                if rman_type == 'MESH':
+                    if is_updated:
+                        rman_sg_prototype = rman_sg_node.rman_sg_prototype
+                        if rman_sg_prototype and rman_sg_prototype != rman_sg_node:
+                            # the owner of the prototype does the update
+                            continue
+                        mesh_data = rman_mesh_translator.gather_mesh_data(ob)
+                        if mesh_data:
+                            rman_mesh_translator.build_mesh_data(mesh_data)
+                            translator.update(ob, rman_sg_node, mesh_data=mesh_data)
+                            translator.export_object_primvars(ob, rman_sg_node)
+                            num_geometry += 1
+                elif rman_type == 'LIGHT':
+                    if ob.data.animation_data or (ob.data.node_tree and ob.data.node_tree.animation_data):
+                        translator.update(ob, rman_sg_node)
+                elif rman_type == 'EMPTY':
+                    if ob.renderman.export_as_coordsys and rman_sg_node.sg_node:
+                        translator.export_transform(ob, rman_sg_node.sg_node)
+                elif rman_type not in ('CAMERA', 'LIGHTFILTER'):
+                    # curves, points, volumes, metaballs, grease pencil, procedurals etc.
+                    if is_updated:
+                        translator.update(ob, rman_sg_node)
+                        translator.export_object_primvars(ob, rman_sg_node)
+                        num_geometry += 1
+
+                ob_psys = self.rman_scene.rman_particles.get(ob.original, dict())
+                for psys in getattr(ob, 'particle_systems', list()):
+                    rman_sg_particles = ob_psys.get(psys.settings.original, None)
+                    if not rman_sg_particles or object_utils.is_particle_instancer(psys):
+                        continue
+                    if psys.settings.type == 'HAIR' and not object_utils.is_hair_deforming(ob, psys):
+                        # static hair
+                        continue
+                    psys_translator.update(ob, psys, rman_sg_particles)
+                    num_geometry += 1
+
+            # camera
+            cam = self.rman_scene.bl_scene.camera
+            rman_sg_camera = self.rman_scene.main_camera
+            if cam and rman_sg_camera:
+                cam_translator = self.rman_scene.rman_translators['CAMERA']
+                cam_translator.update(cam, rman_sg_camera)
+                cam_translator.update_transform(cam, rman_sg_camera)
+
+            # instances. Only update transforms that actually changed, export
+            # any new instances, and delete instances that are gone.
+            seen = set()
+            for ob_inst in depsgraph.object_instances:
+                if not ob_inst.show_self:
+                    continue
+                group_db_name = object_utils.get_group_db_name(ob_inst)
+                seen.add(group_db_name)
+                rman_sg_node = self.rman_scene.get_instance_owner(group_db_name)
+                if not rman_sg_node:
+                    ob = ob_inst.instance_object if ob_inst.is_instance else ob_inst.object
+                    if object_utils._detect_primitive_(ob) == 'EMPTY' and not ob.is_instancer:
+                        # hidden empties were already added during the first frame
+                        continue
+                    self.rman_scene._export_instance(ob_inst)
+                    continue
+                if rman_sg_node.rman_type == 'META':
+                    continue
+                rman_sg_group = rman_sg_node.instances.get(group_db_name, None)
+                if not rman_sg_group:
+                    continue
+                mtx = ob_inst.matrix_world
+                if rman_sg_group.matrix_world is not None and rman_sg_group.matrix_world == mtx:
+                    continue
+                rman_group_translator.update_transform(ob_inst, rman_sg_group)
+                rman_sg_group.matrix_world = mtx.copy()
+                num_transforms += 1
+
+            for group_db_name in [k for k in self.rman_scene.rman_instance_owners.keys() if k not in seen]:
+                rman_sg_node = self.rman_scene.get_instance_owner(group_db_name)
+                rman_sg_group = self.rman_scene.remove_instance(rman_sg_node, group_db_name)
+                if rman_sg_group and rman_sg_group.sg_node:
+                    self.rman_scene.sg_scene.DeleteDagNode(rman_sg_group.sg_node)
+
+        self.rman_scene.num_object_instances = len(depsgraph.object_instances)
+        rfb_log().debug("Frame %d: updated %d transforms, %d geometry" % (self.rman_scene.bl_frame_current, num_transforms, num_geometry))
+
     def add_objects(self):
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene): 
+        with self.edit(): 
             rfb_log().debug("Adding new objects:")
             self.rman_scene.export_data_blocks(self.new_objects)
 
@@ -779,7 +1046,7 @@ class RmanSceneSync(object):
 
     def delete_objects(self):
         rfb_log().debug("Deleting objects")
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+        with self.edit():
             keys = [k for k in self.rman_scene.rman_objects.keys()]
             for obj in keys:
                 try:
@@ -796,7 +1063,7 @@ class RmanSceneSync(object):
                     for k,v in rman_sg_node.instances.items():
                         if v.sg_node:
                             self.rman_scene.sg_scene.DeleteDagNode(v.sg_node)    
-                    rman_sg_node.instances.clear()             
+                    self.rman_scene.clear_instances(rman_sg_node)             
 
                     # For now, don't delete the geometry itself
                     # there may be a collection instance still referencing the geo
@@ -812,11 +1079,7 @@ class RmanSceneSync(object):
                             rman_sg_light = self.rman_scene.rman_objects.get(light_ob.original, None)
                             if rman_sg_light:
                                 self.rman_scene.rman_translators['LIGHT'].update_light_filters(light_ob, rman_sg_light)                                
-                    try:
-                        self.rman_scene.processed_obs.remove(obj)
-                    except ValueError:
-                        rfb_log().debug("Obj not in self.rman_scene.processed_obs: %s")
-                        pass
+                    self.rman_scene.processed_obs.discard(obj)
 
                 if self.rman_scene.render_default_light:
                     self.rman_scene.scene_any_lights = self.rman_scene._scene_has_lights()     
@@ -827,7 +1090,7 @@ class RmanSceneSync(object):
         if not self.rman_render.rman_interactive_running:
             return
         if cropwindow:
-            with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene): 
+            with self.edit(): 
                 options = self.rman_scene.sg_scene.GetOptions()
                 options.SetFloatArray(self.rman_scene.rman.Tokens.Rix.k_Ri_CropWindow, cropwindow, 4)  
                 self.rman_scene.sg_scene.SetOptions(options)           
@@ -837,7 +1100,7 @@ class RmanSceneSync(object):
             return        
         if context:
             self.rman_scene.bl_scene = context.scene
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+        with self.edit():
             self.rman_scene.export_integrator() 
             self.rman_scene.export_viewport_stats()
 
@@ -845,7 +1108,7 @@ class RmanSceneSync(object):
         if not self.rman_render.rman_interactive_running:
             return        
         self.rman_scene.bl_scene = context.scene
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+        with self.edit():
             integrator_sg = self.rman_scene.rman.SGManager.RixSGShader("Integrator", integrator, "integrator")       
             self.rman_scene.sg_scene.SetIntegrator(integrator_sg)     
             self.rman_scene.export_viewport_stats(integrator=integrator)  
@@ -861,7 +1124,7 @@ class RmanSceneSync(object):
             self.rman_scene.viewport_render_res_mult = float(context.scene.renderman.viewport_render_res_mult)
         rman_sg_camera = self.rman_scene.main_camera
         translator = self.rman_scene.rman_translators['CAMERA']
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+        with self.edit():
             translator.update_viewport_resolution(rman_sg_camera)
             translator.update_transform(None, rman_sg_camera)
             self.rman_scene.export_viewport_stats()                  
@@ -870,7 +1133,7 @@ class RmanSceneSync(object):
         if not self.rman_render.rman_interactive_running:
             return        
         self.rman_scene.bl_scene = context.scene
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+        with self.edit():
             self.rman_scene.export_global_options()            
             self.rman_scene.export_hider()
             self.rman_scene.export_viewport_stats()
@@ -879,7 +1142,7 @@ class RmanSceneSync(object):
         if not self.rman_render.rman_interactive_running:
             return        
         self.rman_scene.bl_scene = context.scene
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+        with self.edit():
             self.rman_scene.export_root_sg_node()         
  
     def update_material(self, mat):
@@ -891,7 +1154,7 @@ class RmanSceneSync(object):
         translator = self.rman_scene.rman_translators["MATERIAL"]     
         has_meshlight = rman_sg_material.has_meshlight   
         rfb_log().debug("Manual material update called for: %s." % mat.name)
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):                  
+        with self.edit():                  
             translator.update(mat, rman_sg_material)
 
         if has_meshlight != rman_sg_material.has_meshlight:
@@ -907,7 +1170,7 @@ class RmanSceneSync(object):
         if not rman_sg_light:
             return
         translator = self.rman_scene.rman_translators["LIGHT"]        
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+        with self.edit():
             translator.update(ob, rman_sg_light)         
 
     def update_light_filter(self, ob):
@@ -917,7 +1180,7 @@ class RmanSceneSync(object):
         if not rman_sg_node:
             return
 
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+        with self.edit():
             self.rman_scene.rman_translators['LIGHTFILTER'].update(ob, rman_sg_node)
             for light_ob in rman_sg_node.lights_list:
                 light_key = object_utils.get_db_name(light_ob, rman_type='LIGHT')
@@ -932,7 +1195,7 @@ class RmanSceneSync(object):
         self.rman_scene.bl_scene = context.scene
         self.rman_scene.scene_solo_light = self.rman_scene.bl_scene.renderman.solo_light
                     
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):            
+        with self.edit():            
             for light_ob in scene_utils.get_all_lights(self.rman_scene.bl_scene, include_light_filters=False):
                 rman_sg_node = self.rman_scene.rman_objects.get(light_ob.original, None)
                 if not rman_sg_node:
@@ -953,7 +1216,7 @@ class RmanSceneSync(object):
         self.rman_scene.bl_scene = context.scene
         self.rman_scene.scene_solo_light = self.rman_scene.bl_scene.renderman.solo_light
                     
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):                                               
+        with self.edit():                                               
             for light_ob in scene_utils.get_all_lights(self.rman_scene.bl_scene, include_light_filters=False):
                 rman_sg_node = self.rman_scene.rman_objects.get(light_ob.original, None)
                 if not rman_sg_node:
@@ -968,7 +1231,7 @@ class RmanSceneSync(object):
     def update_viewport_chan(self, context, chan_name):
         if not self.rman_render.rman_interactive_running:
             return        
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+        with self.edit():
             self.rman_scene.export_samplefilters(sel_chan_name=chan_name)
 
     def update_displays(self, context):
@@ -976,7 +1239,7 @@ class RmanSceneSync(object):
             return        
         self.rman_scene.bl_scene = context.scene    
         self.rman_scene._find_renderman_layer()
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):
+        with self.edit():
             self.rman_scene.export_displays()         
 
     def texture_updated(self, nodeID):
@@ -1007,7 +1270,7 @@ class RmanSceneSync(object):
     def flush_texture_cache(self, texture_list):
         if not self.rman_render.rman_interactive_running:
             return         
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):  
+        with self.edit():  
             for tex in texture_list:
                 self.rman_scene.sg_scene.InvalidateTexture(tex)   
 
@@ -1018,7 +1281,7 @@ class RmanSceneSync(object):
         if rman_sg_camera.projection_shader.name.CStr() != 'PxrCamera':
             return
 
-        with self.rman_scene.rman.SGManager.ScopedEdit(self.rman_scene.sg_scene):              
+        with self.edit():              
             projparams = rman_sg_camera.projection_shader.params         
             projparams.SetVector("enhance", [x, y, zoom])
             rman_sg_camera.sg_camera_node.SetProjection(rman_sg_camera.projection_shader)
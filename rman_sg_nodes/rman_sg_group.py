@@ -5,6 +5,8 @@ class RmanSgGroup(RmanSgNode):
     def __init__(self, rman_scene, sg_node, db_name):
         super().__init__(rman_scene, sg_node, db_name)
         self.matrix_world = None
+        # original object that made this instance, if any
+        self.bl_instancer = None
 
     @property
     def matrix_world(self):
@@ -6,3 +6,12 @@ class RmanSgHair(RmanSgNode):
         super().__init__(rman_scene, sg_node, db_name)
 
         self.sg_curves_list = list()
+
+        # cached topology, used for deformation motion blur
+        self.strand_lengths = None
+        self.curve_sets_indices = list()
+
+        # points of each curve set exported by update(), and the frame they
+        # were taken at, so that deformation motion blur can reuse them
+        self.frame_points = None
+        self.frame_points_time = None
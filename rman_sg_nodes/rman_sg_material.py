@@ -10,6 +10,12 @@ class RmanSgMaterial(RmanSgNode):
         self.sg_stroke_mat = None
         self.sg_fill_mat = None
 
+        # shaders from the last time the material was translated during IPR, 
+        # keyed by shader instance name. Each entry is (fingerprint, [RixSGShader]),
+        # so that shaders whose parameters and connections did not change 
+        # can be reused.
+        self.shader_cache = dict()
+
     @property
     def has_meshlight(self):
         return self.__has_meshlight
@@ -34,6 +40,14 @@ class RmanSgMaterial(RmanSgNode):
     def sg_stroke_mat(self, sg_stroke_mat):
         self.__sg_stroke_mat = sg_stroke_mat            
 
+    @property
+    def shader_cache(self):
+        return self.__shader_cache
+
+    @shader_cache.setter
+    def shader_cache(self, shader_cache):
+        self.__shader_cache = shader_cache
+
     @property
     def sg_fill_mat(self):
         return self.__sg_fill_mat
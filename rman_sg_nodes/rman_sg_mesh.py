@@ -13,6 +13,14 @@ class RmanSgMesh(RmanSgNode):
         self.is_multi_material = False
         self.multi_material_children = []
 
+        # fingerprint of everything but the points and normals, as of the
+        # last full update. See rman_mesh_translator.get_topology_fingerprint
+        self.topology_fingerprint = None
+
+        # the RmanSgMesh that owns the RixSGMesh we share, if any.
+        # See RmanScene.export_data_block
+        self.rman_sg_prototype = None
+
     @property
     def matrix_world(self):
         return self.__matrix_world
@@ -59,4 +67,20 @@ class RmanSgMesh(RmanSgNode):
 
     @subdiv_scheme.setter
     def subdiv_scheme(self, subdiv_scheme):
-        self.__subdiv_scheme = subdiv_scheme                                       
\ No newline at end of file
+        self.__subdiv_scheme = subdiv_scheme
+
+    @property
+    def topology_fingerprint(self):
+        return self.__topology_fingerprint
+
+    @topology_fingerprint.setter
+    def topology_fingerprint(self, topology_fingerprint):
+        self.__topology_fingerprint = topology_fingerprint
+
+    @property
+    def rman_sg_prototype(self):
+        return self.__rman_sg_prototype
+
+    @rman_sg_prototype.setter
+    def rman_sg_prototype(self, rman_sg_prototype):
+        self.__rman_sg_prototype = rman_sg_prototype
@@ -7,6 +7,9 @@ class RmanSgNode(object):
         sg_node (RixSgNode) - main scene graph node
         db_name (str) - unique datablock name for this node
         instances (dict) - instances that uses this sg_node
+        instancers (dict) - number of the instances in instances that were made by each instancer object
+                            (particle systems, collection instances, etc.). Instances of this
+                            object itself are not counted.
         motion_steps (list) - the full list of motion time samples that are required for this Blender object
         is_transforming (bool) - if this object is moving
         is_deforming (bool) - if this object is deforming
@@ -22,6 +25,7 @@ class RmanSgNode(object):
         self.sg_node = sg_node
         self.db_name = db_name
         self.instances = dict()
+        self.instancers = dict()
         self.motion_steps = []
         self.is_transforming = False
         self.is_deforming = False
@@ -122,6 +126,8 @@ class RmanSgNode(object):
     @is_frame_sensitive.setter
     def is_frame_sensitive(self, is_frame_sensitive):
         self.__is_frame_sensitive = is_frame_sensitive           
+        if self.rman_scene is not None:
+            self.rman_scene.set_frame_sensitive(self, is_frame_sensitive)
 
     @property
     def is_instancer(self):
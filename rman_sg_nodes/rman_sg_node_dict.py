@@ -0,0 +1,92 @@
+class RmanSgNodeDict(dict):
+    '''
+    A dictionary of Blender IDs to RmanSgNodes, that also keeps an index
+    of the nodes' db_names. Undo/redo invalidates all bpy.types.ID references, so
+    after an undo we need to find nodes by their db_name instead (see
+    RmanSceneSync.update_objects_dict).
+
+    The index is kept up to date when items are added or removed. If the db_name
+    of a node that is already in the dictionary changes, use set_db_name, so that
+    the index follows.
+    '''
+
+    def __init__(self):
+        super().__init__()
+        self._db_names = dict()
+
+    def _index(self, key, rman_sg_node):
+        if rman_sg_node is not None:
+            self._db_names[rman_sg_node.db_name] = key
+
+    def _unindex(self, key, rman_sg_node):
+        if rman_sg_node is None:
+            return
+        db_name = rman_sg_node.db_name
+        if db_name in self._db_names and self._db_names[db_name] == key:
+            del self._db_names[db_name]
+
+    def __setitem__(self, key, rman_sg_node):
+        if key in self:
+            self._unindex(key, dict.__getitem__(self, key))
+        dict.__setitem__(self, key, rman_sg_node)
+        self._index(key, rman_sg_node)
+
+    def __delitem__(self, key):
+        self._unindex(key, dict.__getitem__(self, key))
+        dict.__delitem__(self, key)
+
+    def pop(self, key, *args):
+        if key in self:
+            self._unindex(key, dict.__getitem__(self, key))
+        return dict.pop(self, key, *args)
+
+    def clear(self):
+        dict.clear(self)
+        self._db_names.clear()
+
+    def set_db_name(self, key, db_name):
+        """ Change the db_name of the node stored under key
+
+        Args:
+            key (bpy.types.ID) - the key of the node
+            db_name (str) - the new db_name
+        """
+        rman_sg_node = self.get(key, None)
+        if rman_sg_node is None:
+            return
+        self._unindex(key, rman_sg_node)
+        rman_sg_node.db_name = db_name
+        self._index(key, rman_sg_node)
+
+    def find_db_name(self, db_name):
+        """ Find the node with the given db_name
+
+        Args:
+            db_name (str) - the db_name to look for
+
+        Returns:
+            (tuple) - the key and the node, or (None, None) if there is no such node
+        """
+        key = self._db_names.get(db_name, None)
+        if key is None:
+            return (None, None)
+        rman_sg_node = self.get(key, None)
+        if rman_sg_node is None or rman_sg_node.db_name != db_name:
+            # the node's db_name was changed behind our back
+            del self._db_names[db_name]
+            return (None, None)
+        return (key, rman_sg_node)
+
+    def remap(self, old_key, new_key):
+        """ Move the node stored under old_key to new_key
+
+        Args:
+            old_key (bpy.types.ID) - the current key of the node
+            new_key (bpy.types.ID) - the new key of the node
+
+        Returns:
+            (RmanSgNode) - the node that was moved
+        """
+        rman_sg_node = self.pop(old_key)
+        self[new_key] = rman_sg_node
+        return rman_sg_node
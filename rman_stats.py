@@ -8,6 +8,7 @@ import threading
 import time
 
 from collections import OrderedDict
+from collections import deque
 import rman_utils.stats_config.core as stcore
 from . import rman_render
 from .rfb_utils import prefs_utils
@@ -56,6 +57,13 @@ class RfBStatsManager(object):
         self.export_stat_label = ''
         self.export_stat_progress = 0.0
 
+        # timings (in seconds) and counters recorded by RfB itself
+        self.rfb_timings = OrderedDict()
+        self.rfb_counters = OrderedDict()
+        self._framebuffer_update_time = 0.0
+        self._ipr_edit_times = deque()
+        self._ipr_edit_latency = 0.0
+
         self._integrator = 'PxrPathTracer'
         self._maxSamples = 0
         self._iterations = 0
@@ -93,6 +101,11 @@ class RfBStatsManager(object):
         self._prevTotalRaysValid = True      
         self.export_stat_label = ''
         self.export_stat_progress = 0.0              
+        self.rfb_timings.clear()
+        self.rfb_counters.clear()
+        self._framebuffer_update_time = 0.0
+        self._ipr_edit_times.clear()
+        self._ipr_edit_latency = 0.0
 
     def create_stats_manager(self): 
         if self.mgr:
@@ -279,6 +292,67 @@ class RfBStatsManager(object):
         self.export_stat_label = label
         self.export_stat_progress = progress
 
+    def add_timing(self, label, secs):
+        """ Accumulate time spent in one of RfB's own stages
+
+        Args:
+            label (str) - name of the stage
+            secs (float) - time, in seconds, to add
+        """
+        self.rfb_timings[label] = self.rfb_timings.get(label, 0.0) + secs
+
+    def incr_counter(self, label, num=1):
+        """ Increment one of RfB's own counters
+
+        Args:
+            label (str) - name of the counter
+            num (int) - amount to add
+        """
+        self.rfb_counters[label] = self.rfb_counters.get(label, 0) + num
+
+    def add_framebuffer_update(self, secs):
+        """ Record the time it took to copy the framebuffers into Blender
+        for one tick of the render loop
+
+        Args:
+            secs (float) - time, in seconds
+        """
+        self._framebuffer_update_time = secs
+        self.add_timing('Framebuffer Update', secs)
+        self.incr_counter('Framebuffer Updates')
+
+    def add_ipr_edit(self, num_updates, latency):
+        """ Record a scene edit made during IPR
+
+        Args:
+            num_updates (int) - number of scene updates that went into this edit
+            latency (float) - time, in seconds, from the first update to the renderer restarting
+        """
+        now = time.time()
+        self._ipr_edit_times.append(now)
+        while self._ipr_edit_times and now - self._ipr_edit_times[0] > 1.0:
+            self._ipr_edit_times.popleft()
+        self._ipr_edit_latency = latency
+        self.add_timing('IPR Edit Latency', latency)
+        self.incr_counter('IPR Edits')
+        self.incr_counter('IPR Scene Updates', num_updates)
+
+    def get_ipr_edits_per_sec(self):
+        """ Returns:
+            (int) - number of scene edits made during IPR in the last second
+        """
+        now = time.time()
+        return len([t for t in self._ipr_edit_times if now - t <= 1.0])
+
+    def log_rfb_stats(self):
+        if not self.rfb_timings and not self.rfb_counters:
+            return
+        rfb_log().info("RenderMan for Blender stats:")
+        for label, secs in self.rfb_timings.items():
+            rfb_log().info("\t%s: %.3f secs" % (label, secs))
+        for label, num in self.rfb_counters.items():
+            rfb_log().info("\t%s: %d" % (label, num))
+
     def draw_stats(self):
         if self.rman_render.rman_is_exporting:
             self.draw_export_stats()
@@ -316,6 +390,8 @@ class RfBStatsManager(object):
                     message = message + '\n%s: %s' % (label, data)
                 # iterations
                 message = message + '\nIterations: %d / %d' % (self._iterations, self._maxSamples)
+            if self._ipr_edit_times:
+                message = message + '\nEdits/Sec: %d, Edit Latency: %.1f ms' % (self.get_ipr_edits_per_sec(), self._ipr_edit_latency * 1000.0)
             try:
                 self.rman_render.bl_engine.update_stats('RenderMan (Stats)', message)
             except ReferenceError as e:
@@ -331,6 +407,7 @@ class RfBStatsManager(object):
                 message = message + 'Iterations: %d / %d ' % (self._iterations, self._maxSamples)                             
             else:
                 message = '(no stats connection) '          
+            message = message + 'Display: %.1f ms ' % (self._framebuffer_update_time * 1000.0)
 
             try:
                 self.rman_render.bl_engine.update_stats(message, "%d%%" % self._progress)  
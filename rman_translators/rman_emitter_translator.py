@@ -113,7 +113,7 @@ class RmanEmitterTranslator(RmanTranslator):
 
     def add_object_instance(self, rman_sg_emitter, rman_sg_group):
         rman_sg_emitter.sg_node.AddChild(rman_sg_group.sg_node)
-        rman_sg_emitter.instances[rman_sg_group.db_name] = rman_sg_group
+        self.rman_scene.add_instance(rman_sg_emitter, rman_sg_group.db_name, rman_sg_group)
         rman_sg_group.rman_sg_group_parent = rman_sg_emitter
 
     def update(self, ob, psys, rman_sg_emitter):
@@ -18,8 +18,11 @@ class RmanGroupTranslator(RmanTranslator):
             m = transform_utils.convert_matrix(m)
             rman_sg_group.sg_node.SetTransform(m)     
         else:       
-            mtx = transform_utils.convert_matrix(ob.matrix_world.copy())
-            rman_sg_group.sg_node.SetTransform( mtx )
+            self.update_transform_matrix(ob.matrix_world, rman_sg_group)
+
+    def update_transform_matrix(self, matrix_world, rman_sg_group):
+        mtx = transform_utils.convert_matrix(matrix_world.copy())
+        rman_sg_group.sg_node.SetTransform( mtx )
 
     def update_transform_sample(self, ob, rman_sg_group, index, seg):
         mtx = transform_utils.convert_matrix(ob.matrix_world.copy())
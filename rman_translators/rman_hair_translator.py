@@ -30,14 +30,32 @@ class RmanHairTranslator(RmanTranslator):
 
     def export_deform_sample(self, rman_sg_hair, ob, psys, time_sample):
 
-        curves = self._get_points(ob, psys)
+        if not rman_sg_hair.is_deforming:
+            return
+
+        if rman_sg_hair.frame_points is not None and self.rman_scene.bl_scene.frame_float == rman_sg_hair.frame_points_time:
+            # this sample is at the frame update() exported, reuse its points
+            curves = rman_sg_hair.frame_points
+            rman_sg_hair.frame_points = None
+        else:
+            curves = self._get_points(ob, psys, rman_sg_hair)
+        if curves is None or len(curves) != len(rman_sg_hair.sg_curves_list):
+            # the strands have changed between samples,
+            # fall back to exporting the hair without deformation blur
+            for curves_sg in rman_sg_hair.sg_curves_list:
+                primvar = curves_sg.GetPrimVars()
+                primvar.SetTimes([])
+                curves_sg.SetPrimVars(primvar)
+            rman_sg_hair.is_deforming = False
+            return
+
         for i, points in enumerate(curves):
             curves_sg = rman_sg_hair.sg_curves_list[i]
             if not curves_sg:
                 continue
             primvar = curves_sg.GetPrimVars()
 
-            primvar.SetPointDetail(self.rman_scene.rman.Tokens.Rix.k_P, points, "vertex", time_sample)  
+            scenegraph_utils.set_primvar_array(primvar.SetPointDetail, self.rman_scene.rman.Tokens.Rix.k_P, points, "vertex", time_sample)
             curves_sg.SetPrimVars(primvar)
 
     def update(self, ob, psys, rman_sg_hair):
@@ -45,37 +63,49 @@ class RmanHairTranslator(RmanTranslator):
             if rman_sg_hair.sg_node.GetNumChildren() > 0:
                 self.clear_children(ob, psys, rman_sg_hair)
 
-        curves = self._get_strands_(ob, psys)
+        rman_sg_hair.is_deforming = False
+        rman_sg_hair.strand_lengths = None
+        rman_sg_hair.curve_sets_indices = []
+        rman_sg_hair.frame_points = None
+        curves = self._get_strands_(ob, psys, rman_sg_hair=rman_sg_hair)
         if not curves:
             return
 
+        # static hair doesn't need deformation samples, even with motion blur on
+        is_deforming = bool(rman_sg_hair.motion_steps) and object_utils.is_hair_deforming(ob, psys)
+
         for i, (vertsArray, points, widths, scalpST) in enumerate(curves):
             curves_sg = self.rman_scene.sg_scene.CreateCurves("%s-%d" % (rman_sg_hair.db_name, i))
             curves_sg.Define(self.rman_scene.rman.Tokens.Rix.k_cubic, "nonperiodic", "catmull-rom", len(vertsArray), len(points))
             primvar = curves_sg.GetPrimVars()
 
-            primvar.SetPointDetail(self.rman_scene.rman.Tokens.Rix.k_P, points, "vertex")                
-            primvar.SetIntegerDetail(self.rman_scene.rman.Tokens.Rix.k_Ri_nvertices, vertsArray, "uniform")
+            scenegraph_utils.set_primvar_array(primvar.SetPointDetail, self.rman_scene.rman.Tokens.Rix.k_P, points, "vertex")
+            scenegraph_utils.set_primvar_array(primvar.SetIntegerDetail, self.rman_scene.rman.Tokens.Rix.k_Ri_nvertices, vertsArray, "uniform")
             index_nm = psys.settings.renderman.hair_index_name
             if index_nm == '':
                 index_nm = 'index'
-            primvar.SetIntegerDetail(index_nm, range(len(vertsArray)), "uniform")
+            scenegraph_utils.set_primvar_array(primvar.SetIntegerDetail, index_nm, np.arange(len(vertsArray), dtype=np.int32), "uniform")
 
-            width_detail = "constant"
-            if isinstance(widths, list):
-                width_detail = "vertex"
-            primvar.SetFloatDetail(self.rman_scene.rman.Tokens.Rix.k_width, widths, width_detail)
+            if isinstance(widths, np.ndarray):
+                scenegraph_utils.set_primvar_array(primvar.SetFloatDetail, self.rman_scene.rman.Tokens.Rix.k_width, widths, "vertex")
+            else:
+                primvar.SetFloatDetail(self.rman_scene.rman.Tokens.Rix.k_width, widths, "constant")
             
             if len(scalpST):
-                primvar.SetFloatArrayDetail("scalpST", scalpST, 2, "uniform")
+                scenegraph_utils.set_primvar_array(primvar.SetFloatArrayDetail, "scalpST", scalpST, 2, "uniform")
                     
-            if rman_sg_hair.motion_steps:
+            if is_deforming:
                 super().set_primvar_times(rman_sg_hair.motion_steps, primvar)
 
             curves_sg.SetPrimVars(primvar)
             rman_sg_hair.sg_node.AddChild(curves_sg)  
             rman_sg_hair.sg_curves_list.append(curves_sg)
 
+        if is_deforming:
+            rman_sg_hair.is_deforming = True
+            rman_sg_hair.frame_points = [points for (vertsArray, points, widths, scalpST) in curves]
+            rman_sg_hair.frame_points_time = self.rman_scene.bl_scene.frame_float
+
         # Attach material
         mat_idx = psys.settings.material - 1
         if mat_idx < len(ob.material_slots):
@@ -89,196 +119,222 @@ class RmanHairTranslator(RmanTranslator):
         
     def add_object_instance(self, rman_sg_hair, rman_sg_group):
         rman_sg_hair.sg_node.AddChild(rman_sg_group.sg_node)                
-        rman_sg_hair.instances[rman_sg_group.db_name] = rman_sg_group
+        self.rman_scene.add_instance(rman_sg_hair, rman_sg_group.db_name, rman_sg_group)
         rman_sg_group.rman_sg_group_parent = rman_sg_particles
 
-    def _get_points(self, ob, psys):
+    def _get_psys_modifier(self, ob, psys):
         psys_modifier = None
         for mod in ob.modifiers:
             if hasattr(mod, 'particle_system') and mod.particle_system == psys:
                 psys_modifier = mod
                 break
+        return psys_modifier
 
+    def _is_psys_visible(self, psys_modifier):
+        if not psys_modifier:
+            return True
         if self.rman_scene.is_interactive:
-            if psys_modifier and not psys_modifier.show_viewport:
+            return psys_modifier.show_viewport
+        return psys_modifier.show_render
+
+    def _get_parent_points_(self, ob, psys, steps):
+        """ Get the points of the parent strands in psys, in object space, by reading
+        the hair keys in bulk and interpolating them the same way Blender's path cache
+        does (cardinal spline, 2^steps segments). Only works when the path cache is a
+        plain interpolation of the hair keys.
+
+        Args:
+            ob (bpy.types.Object) - the emitter object
+            psys (bpy.types.ParticleSystem) - the hair particle system
+            steps (int) - number of segments per strand
+
+        Returns:
+            (numpy.ndarray) - (N, steps+1, 3) float32 array of strand points, or None
+                              if co_hair needs to be used instead
+        """
+        # dynamics, a deforming emitter and b-spline interpolation all change
+        # the path cache, and the hair keys alone are not enough
+        if psys.use_hair_dynamics or psys.settings.use_hair_bspline:
+            return None
+        if object_utils._is_deforming_(ob):
+            return None
+
+        particles = psys.particles
+        num_keys = len(particles[0].hair_keys) if len(particles) else 0
+        if num_keys < 2:
+            return None
+        keys = np.zeros((len(particles), num_keys, 3), dtype=np.float32)
+        for i, particle in enumerate(particles):
+            hair_keys = particle.hair_keys
+            if len(hair_keys) != num_keys:
                 return None
-        else:
-            if psys_modifier and not psys_modifier.show_render:
-                return None             
-                
+            hair_keys.foreach_get('co', keys[i].ravel())
+
+        # repeat the end keys, so every segment has 4 keys to interpolate between
+        keys = np.concatenate([keys[:, :1], keys, keys[:, -1:]], axis=1)
+
+        # the key segment each point falls in, and the position within that segment
+        t = np.linspace(0.0, num_keys - 1, steps + 1)
+        seg = np.minimum(t.astype(np.int32), num_keys - 2)
+        t = (t - seg).astype(np.float32)
+        t2 = t * t
+        t3 = t2 * t
+        fc = 0.71
+        weights = np.stack([-fc * t3 + 2.0 * fc * t2 - fc * t,
+                            (2.0 - fc) * t3 + (fc - 3.0) * t2 + 1.0,
+                            (fc - 2.0) * t3 + (3.0 - 2.0 * fc) * t2 + fc * t,
+                            fc * t3 - fc * t2], axis=1)
+
+        points = np.zeros((len(particles), steps + 1, 3), dtype=np.float32)
+        for k in range(4):
+            points += keys[:, seg + k] * weights[:, k, None]
+        return points
+
+    def _get_strand_points_(self, ob, psys):
+        """ Get the points of every strand in psys, in object space.
+
+        Args:
+            ob (bpy.types.Object) - the emitter object
+            psys (bpy.types.ParticleSystem) - the hair particle system
+
+        Returns:
+            (numpy.ndarray) - (N, steps+1, 3) float32 array of strand points. Points
+                              past the end of a strand are zero.
+            (numpy.ndarray) - number of valid points in each strand
+            (numpy.ndarray) - particle index of each strand
+        """
+
         if self.rman_scene.is_interactive:
             steps = 2 ** psys.settings.display_step
         else:
             steps = 2 ** psys.settings.render_step
-            
+
         num_parents = len(psys.particles)
         num_children = len(psys.child_particles)
         total_hair_count = num_parents + num_children
-        curve_sets = []
-        points = []
-        vertsArray = []
-        nverts = 0
-
-        ob_inv_mtx = ob.matrix_world.inverted_safe()
-        
-        for pindex in range(total_hair_count):
-            if psys.settings.child_type != 'NONE' and pindex < num_parents:
-                continue
-
-            strand_points = []
-            # walk through each strand
-            for step in range(0, steps + 1):           
-                pt = psys.co_hair(ob, particle_no=pindex, step=step)
-
-                if pt.length_squared == 0:
-                    # this strand ends prematurely                    
-                    break                
-
-                # put points in object space
-                pt = ob_inv_mtx @ pt
-
-                strand_points.append(pt)
-
-            if len(strand_points) > 1:
-                # double the first and last
-                strand_points = strand_points[:1] + \
-                    strand_points + strand_points[-1:]
-                vertsInStrand = len(strand_points)
-
-                if vertsInStrand < 4:
-                    continue
-
-                # add the last point again
-                points.extend(strand_points)
-                vertsArray.append(vertsInStrand)
-                nverts += vertsInStrand
-
-            if nverts > 100000:
-                curve_sets.append(points)
-
-                nverts = 0
-                points = []
-                vertsArray = []
-
-        if nverts > 0:
-            curve_sets.append(points)
-
-        return curve_sets              
-                    
-
-    def _get_strands_(self, ob, psys):
-
-        psys_modifier = None
-        for mod in ob.modifiers:
-            if hasattr(mod, 'particle_system') and mod.particle_system == psys:
-                psys_modifier = mod
-                break
+        first = num_parents if psys.settings.child_type != 'NONE' else 0
+        pindices = np.arange(first, total_hair_count, dtype=np.int32)
+
+        if first == 0:
+            # only parent strands, try to get them all in one go
+            points = self._get_parent_points_(ob, psys, steps)
+            if points is not None:
+                lengths = np.full(len(pindices), steps+1, dtype=np.int64)
+                return (points, lengths, pindices)
+
+        # there is no bulk accessor for child strands, so we still need to
+        # ask for each point, but we only do one RNA call per point.
+        raw = np.zeros((len(pindices), steps+1, 3), dtype=np.float32)
+        co_hair = psys.co_hair
+        for j, pindex in enumerate(pindices.tolist()):
+            strand = raw[j]
+            for step in range(0, steps + 1):
+                strand[step] = co_hair(ob, particle_no=pindex, step=step)
+
+        # a zero point means this strand ends prematurely
+        valid = raw.any(axis=2)
+        lengths = np.where(valid.all(axis=1), steps+1, np.argmin(valid, axis=1))
+
+        # put points in object space
+        ob_inv_mtx = np.array(ob.matrix_world.inverted_safe(), dtype=np.float32)
+        points = raw @ ob_inv_mtx[:3, :3].T + ob_inv_mtx[:3, 3]
+
+        return (points, lengths, pindices)
+
+    def _get_curve_sets_(self, lengths, num_steps):
+        # Double the first and last point of each strand, and split the strands
+        # into sets of roughly 100000 vertices, to avoid a maxint on the array length.
+        # Returns a list of (strand indices, nvertices, index of each point into the
+        # flattened strand points array, index of each point within its strand)
+
+        # catmull-rom requires at least 4 vertices, so we need at least 2 points
+        strands = np.nonzero(lengths > 1)[0]
+        if len(strands) < 1:
+            return []
+        nverts = (lengths[strands] + 2).astype(np.int32)
+        offsets = np.cumsum(nverts) - nverts
+        set_ids = offsets // 100000
 
-        if self.rman_scene.is_interactive:
-            if psys_modifier and not psys_modifier.show_viewport:
-                return None
-        else:
-            if psys_modifier and not psys_modifier.show_render:
-                return None             
+        curve_sets = []
+        for set_id in np.unique(set_ids):
+            in_set = (set_ids == set_id)
+            set_strands = strands[in_set]
+            set_nverts = nverts[in_set]
+            strand_ids = np.repeat(np.arange(len(set_strands)), set_nverts)
+            starts = np.cumsum(set_nverts) - set_nverts
+            t = np.arange(len(strand_ids)) - starts[strand_ids]
+            k = np.clip(t - 1, 0, lengths[set_strands][strand_ids] - 1)
+            point_indices = set_strands[strand_ids] * num_steps + k
+            curve_sets.append((set_strands, set_nverts, point_indices, t))
+
+        return curve_sets
+
+    def _get_points(self, ob, psys, rman_sg_hair):
+        # Get the points for each of the curve sets in rman_sg_hair.
+        # Returns None if the strands no longer match the cached topology.
+        psys_modifier = self._get_psys_modifier(ob, psys)
+        if not self._is_psys_visible(psys_modifier):
+            return None
+
+        (points, lengths, pindices) = self._get_strand_points_(ob, psys)
+        if rman_sg_hair.strand_lengths is None or not np.array_equal(lengths, rman_sg_hair.strand_lengths):
+            return None
+
+        flat_points = points.reshape(-1, 3)
+        return [flat_points[point_indices] for point_indices in rman_sg_hair.curve_sets_indices]
+
+    def _get_strands_(self, ob, psys, rman_sg_hair=None):
+
+        psys_modifier = self._get_psys_modifier(ob, psys)
+        if not self._is_psys_visible(psys_modifier):
+            return None
 
         tip_width = psys.settings.tip_radius * psys.settings.radius_scale
         base_width = psys.settings.root_radius * psys.settings.radius_scale
 
         conwidth = (tip_width == base_width)
 
-        if self.rman_scene.is_interactive:
-            steps = 2 ** psys.settings.display_step
-        else:
-            steps = 2 ** psys.settings.render_step        
-        
-        if conwidth:
-            hair_width = base_width
-        else:
-            hair_width = []
-
         num_parents = len(psys.particles)
-        num_children = len(psys.child_particles)
-        total_hair_count = num_parents + num_children
         export_st = psys.settings.renderman.export_scalp_st and psys_modifier and len(
             ob.data.uv_layers) > 0
 
-        curve_sets = []
-
-        points = []
+        (points, lengths, pindices) = self._get_strand_points_(ob, psys)
 
-        vertsArray = []
-        scalpST = []
-        nverts = 0
-
-        ob_inv_mtx = ob.matrix_world.inverted_safe()
-        
-        for pindex in range(total_hair_count):
-            if psys.settings.child_type != 'NONE' and pindex < num_parents:
-                continue
-
-            strand_points = []
-            # walk through each strand
-            for step in range(0, steps + 1):           
-                pt = psys.co_hair(ob, particle_no=pindex, step=step)
-
-                if pt.length_squared == 0:
-                    # this strand ends prematurely                    
-                    break                
-
-                # put points in object space
-                pt = ob_inv_mtx @ pt
-
-                strand_points.append(pt)
-
-            if len(strand_points) > 1:
-                # double the first and last
-                strand_points = strand_points[:1] + \
-                    strand_points + strand_points[-1:]
-                vertsInStrand = len(strand_points)
-
-                # catmull-rom requires at least 4 vertices
-                if vertsInStrand < 4:
-                    continue
-
-                # for varying width make the width array
-                if not conwidth:
-                    decr = (base_width - tip_width) / (vertsInStrand - 2)
-                    hair_width.extend([base_width] + [(base_width - decr * i)
-                                                    for i in range(vertsInStrand - 2)] +
-                                    [tip_width])
-
-                # add the last point again
-                points.extend(strand_points)
-                vertsArray.append(vertsInStrand)
-                nverts += vertsInStrand
-
-                # get the scalp S
-                if export_st:
+        flat_points = points.reshape(-1, 3)
+        curve_sets = []
+        curve_sets_indices = []
+        for (set_strands, vertsArray, point_indices, t) in self._get_curve_sets_(lengths, points.shape[1]):
+            set_points = flat_points[point_indices]
+            curve_sets_indices.append(point_indices)
+
+            # for varying width make the width array
+            if conwidth:
+                hair_width = base_width
+            else:
+                strand_nverts = np.repeat(vertsArray, vertsArray)
+                decr = (base_width - tip_width) / (strand_nverts - 2)
+                hair_width = (base_width - decr * (t - 1)).astype(np.float32)
+                hair_width[t == 0] = base_width
+                hair_width[t == strand_nverts - 1] = tip_width
+
+            # get the scalp S
+            scalpST = np.zeros((0, 2), dtype=np.float32)
+            if export_st:
+                scalpST = np.zeros((len(set_strands), 2), dtype=np.float32)
+                for j, pindex in enumerate(pindices[set_strands].tolist()):
                     if pindex >= num_parents:
                         particle = psys.particles[
                             (pindex - num_parents) % num_parents]
                     else:
                         particle = psys.particles[pindex]
                     st = psys.uv_on_emitter(psys_modifier, particle=particle, particle_no=pindex)
-                    scalpST.append([st[0], st[1]])
-
-            # if we get more than 100000 vertices, export ri.Curve and reset.  This
-            # is to avoid a maxint on the array length
-            if nverts > 100000:
-                curve_sets.append(
-                    (vertsArray, points, hair_width, scalpST))
-
-                nverts = 0
-                points = []
-                vertsArray = []
-                if not conwidth:
-                    hair_width = []
-                scalpS = []
-                scalpT = []
-
-        if nverts > 0:
-            curve_sets.append((vertsArray, points,
-                            hair_width, scalpST))
-
-        return curve_sets              
-            
\ No newline at end of file
+                    scalpST[j] = (st[0], st[1])
+
+            curve_sets.append((vertsArray, set_points, hair_width, scalpST))
+
+        if rman_sg_hair:
+            # cache the topology, so deformation samples only need to update P
+            rman_sg_hair.strand_lengths = lengths
+            rman_sg_hair.curve_sets_indices = curve_sets_indices
+
+        return curve_sets
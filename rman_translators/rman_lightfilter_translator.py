@@ -41,7 +41,7 @@ class RmanLightFilterTranslator(RmanTranslator):
                     # it as a RmanSgLightFilter
                     for k,rman_sg_group in rman_sg_lightfilter.instances.items():
                         self.rman_scene.get_root_sg_node().RemoveChild(rman_sg_group.sg_node)
-                    rman_sg_lightfilter.instances.clear() 
+                    self.rman_scene.clear_instances(rman_sg_lightfilter)
                     del rman_sg_lightfilter
                     self.rman_scene.rman_objects.pop(light_filter.original)
                     rman_sg_lightfilter = self.export(light_filter, light_filter_db_name)
@@ -19,6 +19,8 @@ class RmanMaterialTranslator(RmanTranslator):
     def __init__(self, rman_scene):
         super().__init__(rman_scene)
         self.bl_type = 'MATERIAL'
+        self._shader_cache = None
+        self._shaders_reused = 0
 
     def export(self, mat, db_name):
 
@@ -37,6 +39,12 @@ class RmanMaterialTranslator(RmanTranslator):
         rman_sg_material.sg_node.SetLight(None)
         rman_sg_material.sg_node.SetDisplace(None)        
 
+        # only keep the shader cache during IPR
+        self._shader_cache = None
+        self._shaders_reused = 0
+        if self.rman_scene.is_interactive:
+            self._shader_cache = dict()
+
         handle = string_utils.sanitize_node_name(rman_sg_material.db_name)
         if mat.grease_pencil:
             if not mat.node_tree or not shadergraph_utils.is_renderman_nodetree(mat):
@@ -49,6 +57,12 @@ class RmanMaterialTranslator(RmanTranslator):
         if not succeed:
             succeed = self.export_simple_shader(mat, rman_sg_material, mat_handle=handle)     
 
+        if self._shader_cache is not None:
+            # anything not used this time is dropped
+            rfb_log().debug("Material %s: reused %d of %d shaders" % (mat.name, self._shaders_reused, len(self._shader_cache)))
+            rman_sg_material.shader_cache = self._shader_cache
+            self._shader_cache = None
+
     def export_shader_grease_pencil(self, mat, rman_sg_material, handle):
         gp_mat = mat.grease_pencil
         rman_sg_material.is_gp_material = True
@@ -95,11 +109,12 @@ class RmanMaterialTranslator(RmanTranslator):
                         if success:
                             return True
 
+                terminal_nodes = shadergraph_utils.gather_terminal_nodes(out)
+
                 # bxdf
-                socket = out.inputs['Bxdf']
-                if socket.is_linked:
+                if 'Bxdf' in terminal_nodes:
                     bxdfList = []
-                    for sub_node in shadergraph_utils.gather_nodes(socket.links[0].from_node):
+                    for sub_node in terminal_nodes['Bxdf']:
                         shader_sg_nodes = self.shader_node_sg(material, sub_node, rman_sg_material, mat_name=handle)
                         for s in shader_sg_nodes:
                             bxdfList.append(s) 
@@ -107,10 +122,9 @@ class RmanMaterialTranslator(RmanTranslator):
                         rman_sg_material.sg_node.SetBxdf(bxdfList)         
 
                 # light
-                socket = out.inputs['Light']
-                if socket.is_linked:
+                if 'Light' in terminal_nodes:
                     lightNodesList = []
-                    for sub_node in shadergraph_utils.gather_nodes(socket.links[0].from_node):
+                    for sub_node in terminal_nodes['Light']:
                         shader_sg_nodes = self.shader_node_sg(material, sub_node, rman_sg_material, mat_name=handle)
                         for s in shader_sg_nodes:
                             lightNodesList.append(s) 
@@ -118,10 +132,9 @@ class RmanMaterialTranslator(RmanTranslator):
                         rman_sg_material.sg_node.SetLight(lightNodesList)                                   
 
                 # displacement
-                socket = out.inputs['Displacement']
-                if socket.is_linked:
+                if 'Displacement' in terminal_nodes:
                     dispList = []
-                    for sub_node in shadergraph_utils.gather_nodes(socket.links[0].from_node):
+                    for sub_node in terminal_nodes['Displacement']:
                         shader_sg_nodes = self.shader_node_sg(material, sub_node, rman_sg_material, mat_name=handle)
                         for s in shader_sg_nodes:
                             dispList.append(s) 
@@ -334,6 +347,33 @@ class RmanMaterialTranslator(RmanTranslator):
         return [sg_node]        
 
     def shader_node_sg(self, mat, node, rman_sg_material, mat_name):
+        if self._shader_cache is None:
+            return self._shader_node_sg(mat, node, rman_sg_material, mat_name)
+
+        # During IPR, reuse the shaders from the last update if nothing
+        # they depend on has changed
+        if type(node) == type(()):
+            shader, from_node, from_socket = node
+            key = (shader, from_node.name, from_socket.identifier, mat_name)
+            fingerprint = key
+        elif getattr(node, 'renderman_node_type', '') in ['pattern', 'bxdf', 'displace']:
+            key = (node.name, mat_name)
+            fingerprint = property_utils.get_node_fingerprint(node, mat_name, ob=mat)
+        else:
+            return self._shader_node_sg(mat, node, rman_sg_material, mat_name)
+
+        cached = rman_sg_material.shader_cache.get(key, None)
+        if fingerprint is not None and cached and cached[0] == fingerprint:
+            self._shader_cache[key] = cached
+            self._shaders_reused += 1
+            return cached[1]
+
+        sg_nodes = self._shader_node_sg(mat, node, rman_sg_material, mat_name)
+        if fingerprint is not None:
+            self._shader_cache[key] = (fingerprint, sg_nodes)
+        return sg_nodes
+
+    def _shader_node_sg(self, mat, node, rman_sg_material, mat_name):
  
         sg_node = None
 
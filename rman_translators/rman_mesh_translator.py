@@ -4,33 +4,19 @@ from ..rfb_utils import object_utils
 from ..rfb_utils import string_utils
 from ..rfb_utils import property_utils
 from ..rfb_utils import scenegraph_utils
+from ..rfb_utils import geocache_utils
+from ..rfb_logger import rfb_log
 
 import bpy
 import math
+import hashlib
 import numpy as np
 
-def _get_mats_faces_(nverts, material_ids):
-
-    mats = {}
-    for face_id, num_verts in enumerate(nverts):
-        mat_id = material_ids[face_id]
-        if mat_id not in mats:
-            mats[mat_id] = []
-        mats[mat_id].append(face_id)
-    return mats
-
-def _is_multi_material_(ob, mesh):
-    if type(mesh) != bpy.types.Mesh or len(ob.data.materials) < 2 \
-            or len(mesh.polygons) == 0:
-        return False
-    first_mat = mesh.polygons[0].material_index
-    for p in mesh.polygons:
-        if p.material_index != first_mat:
-            return True
-    return False
+def _get_mats_faces_(material_ids):
+    return object_utils._get_mats_faces_(material_ids)
 
 # requires facevertex interpolation
-def _get_mesh_uv_(mesh, name=""):
+def _get_mesh_uv_(mesh, name="", as_numpy=False):
     uvs = []
     if not name:
         uv_loop_layer = mesh.uv_layers.active
@@ -43,14 +29,16 @@ def _get_mesh_uv_(mesh, name=""):
         return None
 
     uv_count = len(uv_loop_layer.data)
-    fastuvs = np.zeros(uv_count * 2)
+    fastuvs = np.zeros(uv_count * 2, dtype=np.float32)
     uv_loop_layer.data.foreach_get("uv", fastuvs)
     fastuvs = fastuvs.reshape(uv_count, 2)    
+    if as_numpy:
+        return fastuvs
     uvs = fastuvs.tolist()
 
     return uvs
 
-def _get_mesh_vcol_(mesh, name=""):
+def _get_mesh_vcol_rgba_(mesh, name=""):
     vcol_layer = mesh.vertex_colors[name] if name != "" \
         else mesh.vertex_colors.active
 
@@ -58,14 +46,22 @@ def _get_mesh_vcol_(mesh, name=""):
         return None
 
     vcol_count = len(vcol_layer.data)
-    fastvcols = np.zeros(vcol_count * 4)
+    fastvcols = np.zeros(vcol_count * 4, dtype=np.float32)
     vcol_layer.data.foreach_get("color", fastvcols)
-    fastvcols = np.reshape(fastvcols, (vcol_count, 4))
-    pre_cols = fastvcols.tolist()     
-    
-    cols = [ [c[0], c[1], c[2]] for c in pre_cols ]
+    return np.reshape(fastvcols, (vcol_count, 4))
 
-    return cols    
+def _get_mesh_vcol_(mesh, name="", as_numpy=False):
+    fastvcols = _get_mesh_vcol_rgba_(mesh, name)
+
+    if fastvcols is None:
+        return None
+
+    # drop alpha
+    cols = np.ascontiguousarray(fastvcols[:, :3])
+    if as_numpy:
+        return cols
+
+    return cols.tolist()    
 
 def _get_mesh_vgroup_(ob, mesh, name=""):
     vgroup = ob.vertex_groups[name] if name != "" else ob.vertex_groups.active
@@ -83,104 +79,143 @@ def _get_mesh_vgroup_(ob, mesh, name=""):
 
     return weights
 
-def _get_material_ids(ob, geo):
-        
-    material_ids = string_utils.convert_val([p.material_index for p in geo.polygons])
-    return material_ids
-
-def _export_reference_pose(ob, rm, rixparams, vertex_detail):
-    rman__Pref = []
-    rman__WPref = []
-    rman__Nref = []
-    rman__WNref = []
-    for rp in rm.reference_pose:
-        if rp.has_Pref:
-            rman__Pref.append( rp.rman__Pref)
-        if rp.has_WPref:
-            rman__WPref.append( rp.rman__WPref)
-        if rp.has_Nref:
-            rman__Nref.append( rp.rman__Nref)
-        if rp.has_WPref:
-            rman__WNref.append( rp.rman__WNref)
-
-    if rman__Pref:
-        if len(rman__Pref) == vertex_detail:
-            rixparams.SetPointDetail('__Pref', rman__Pref, 'vertex')
-        else:
-            rfb_log().error("Number of Pref primvars do not match. Please re-freeze the reference position.")
+__REFERENCE_POSE_PRIMVARS__ = [
+    # (has flag, property, primvar name, is normal)
+    ('has_Pref', 'rman__Pref', '__Pref', False),
+    ('has_WPref', 'rman__WPref', '__WPref', False),
+    ('has_Nref', 'rman__Nref', '__Nref', True),
+    ('has_WNref', 'rman__WNref', '__WNref', True)
+]
+
+def _get_reference_pose_(rm):
+    # gather the raw reference pose arrays.
+    num_items = len(rm.reference_pose)
+    if num_items < 1:
+        return None
 
-    if rman__WPref:
-        if len(rman__WPref) == vertex_detail:
-            rixparams.SetPointDetail('__WPref', rman__WPref, 'vertex')
+    reference_pose = dict()
+    for flag, prop_name, primvar_name, is_normal in __REFERENCE_POSE_PRIMVARS__:
+        has_flags = np.zeros(num_items, dtype=bool)
+        rm.reference_pose.foreach_get(flag, has_flags)
+        if not has_flags.any():
+            continue
+        values = np.zeros(num_items*3, dtype=np.float32)
+        rm.reference_pose.foreach_get(prop_name, values)
+        reference_pose[primvar_name] = (has_flags, np.reshape(values, (num_items, 3)), is_normal)
+    return reference_pose
+
+def _build_reference_pose_(reference_pose, vertex_detail):
+    # filter and validate the reference pose arrays.
+    # Returns a list of (primvar name, array, is normal) and any errors
+    primvars = []
+    errors = []
+    for primvar_name, (has_flags, values, is_normal) in reference_pose.items():
+        values = np.ascontiguousarray(values[has_flags])
+        if len(values) == vertex_detail:
+            primvars.append((primvar_name, values, is_normal))
         else:
-            rfb_log().error("Number of WPref primvars do not match. Please re-freeze the reference position.")
+            errors.append("Number of %s primvars do not match. Please re-freeze the reference position." % primvar_name.lstrip('_'))
+    return (primvars, errors)
+
+def _get_crease_edges_(mesh):
+    # gather the vertex indices and crease values of all edges
+    num_edges = len(mesh.edges)
+    edge_verts = np.zeros(num_edges*2, dtype=np.int32)
+    mesh.edges.foreach_get('vertices', edge_verts)
+    creases = np.zeros(num_edges, dtype=np.float32)
+    mesh.edges.foreach_get('crease', creases)
+    return (np.reshape(edge_verts, (num_edges, 2)), creases)
                 
-    if rman__Nref:
-        if len(rman__Nref) == vertex_detail:
-            rixparams.SetNormalDetail('__Nref', rman__Nref, 'vertex')
-        else:
-            rfb_log().error("Number of Nref primvars do not match. Please re-freeze the reference position.")
-        
-    if rman__WNref:
-        if len(rman__WNref) == vertex_detail:
-            rixparams.SetNormalDetail('__WNref', rman__WNref, 'vertex')
-        else:
-            rfb_log().error("Number of WNref primvars do not match. Please re-freeze the reference position.")
-        
-    '''
-    if rman__Pref:
-        rixparams.SetPointDetail('__Pref', rman__Pref, 'vertex')
-    if rman__WPref:
-        rixparams.SetPointDetail('__WPref', rman__WPref, 'vertex')
-    if rman__Nref:
-        rixparams.SetNormalDetail('__Nref', rman__Nref, 'vertex')
-    if rman__WNref:
-        rixparams.SetNormalDetail('__WNref', rman__WNref, 'vertex')
-    '''
-
-def _get_primvars_(ob, rman_sg_mesh, geo, rixparams):
-
-    rm = ob.data.renderman
-
-    vertex_detail = rman_sg_mesh.npoints 
-    facevarying_detail = rman_sg_mesh.nverts 
+def _get_crease_chains_(edge_verts):
+    # join edges into chains of vertices. Chains stop at any vertex that
+    # does not have exactly two edges, so branches are never merged.
+    # Closed loops repeat their first vertex at the end.
+    num_edges = len(edge_verts)
+    flat = edge_verts.ravel()
+    order = np.argsort(flat, kind='stable')
+    verts, starts, counts = np.unique(flat[order], return_index=True, return_counts=True)
+    incident = (order // 2).tolist()
+    lookup = dict(zip(verts.tolist(), zip(starts.tolist(), counts.tolist())))
+    edges = edge_verts.tolist()
+    used = [False] * num_edges
+
+    def _walk(v, e):
+        chain = [v]
+        while True:
+            used[e] = True
+            a, b = edges[e]
+            v = b if a == v else a
+            chain.append(v)
+            start, count = lookup[v]
+            if count != 2:
+                break
+            e = next((i for i in incident[start:start+count] if not used[i]), None)
+            if e is None:
+                break
+        return chain
+
+    chains = []
+    for v, (start, count) in lookup.items():
+        if count == 2:
+            continue
+        for e in incident[start:start+count]:
+            if not used[e]:
+                chains.append(_walk(v, e))
+
+    # whatever is left are closed loops
+    for e in range(num_edges):
+        if not used[e]:
+            chains.append(_walk(edges[e][0], e))
+
+    return chains
+
+def _build_subd_tags_(edge_verts, creases, subdiv_interp, subdiv_facevarying_interp, crease_chains=False):
+
+    tags = ['interpolateboundary', 'facevaryinginterpolateboundary']
+    nargs = np.array([1, 0, 0, 1, 0, 0], dtype=np.int32)
+    intargs = np.array([ subdiv_interp, subdiv_facevarying_interp ], dtype=np.int32)
+    floatargs = np.zeros(0, dtype=np.float32)
+
+    creased = creases > 0.0
+    if not creased.any():
+        return (tags, nargs, intargs, floatargs)
+
+    edge_verts = edge_verts[creased]
+    # squared, to match blender appareance better
+    #: range 0 - 10 (infinitely sharp)
+    sharpness = (creases[creased] ** 2) * 10
+
+    if crease_chains:
+        # merge connected edges with the same sharpness into a single crease tag
+        chains = []
+        chain_sharpness = []
+        values, inverse = np.unique(sharpness, return_inverse=True)
+        for i, value in enumerate(values):
+            for chain in _get_crease_chains_(edge_verts[inverse == i]):
+                chains.append(chain)
+                chain_sharpness.append(value)
+        num_creases = len(chains)
+        crease_nargs = np.zeros((num_creases, 3), dtype=np.int32)
+        crease_nargs[:, 0] = [len(c) for c in chains]
+        crease_nargs[:, 1] = 1
+        crease_intargs = np.fromiter((v for c in chains for v in c), dtype=np.int32)
+        crease_floatargs = np.array(chain_sharpness, dtype=np.float32)
+    else:
+        num_creases = len(edge_verts)
+        crease_nargs = np.tile(np.array([2, 1, 0], dtype=np.int32), (num_creases, 1))
+        crease_intargs = edge_verts.astype(np.int32)
+        crease_floatargs = sharpness.astype(np.float32)
 
-    if rm.export_default_uv:
-        uvs = _get_mesh_uv_(geo)
-        if uvs and len(uvs) > 0:
-            detail = "facevarying" if facevarying_detail == len(uvs) else "vertex"
-            rixparams.SetFloatArrayDetail("st", uvs, 2, detail)
+    tags.extend(['crease'] * num_creases)
+    nargs = np.concatenate((nargs, crease_nargs.ravel()))
+    intargs = np.concatenate((intargs, crease_intargs.ravel()))
+    floatargs = crease_floatargs
 
-    if rm.export_default_vcol:
-        vcols = _get_mesh_vcol_(geo)
-        if vcols and len(vcols) > 0:
-            detail = "facevarying" if facevarying_detail == len(vcols) else "vertex"
-            rixparams.SetColorDetail("Cs", vcols, detail)
+    return (tags, nargs, intargs, floatargs)
 
-    # reference pose
-    _export_reference_pose(ob, rm, rixparams, vertex_detail)
-    
-    # custom prim vars
-
-    for p in rm.prim_vars:
-        if p.data_source == 'VERTEX_COLOR':
-            vcols = _get_mesh_vcol_(geo, p.data_name)
-            
-            if vcols and len(vcols) > 0:
-                detail = "facevarying" if facevarying_detail == len(vcols) else "vertex"
-                rixparams.SetColorDetail(p.name, vcols, detail)
-            
-        elif p.data_source == 'UV_TEXTURE':
-            uvs = _get_mesh_uv_(geo, p.data_name)
-            if uvs and len(uvs) > 0:
-                detail = "facevarying" if facevarying_detail == len(uvs) else "vertex"
-                rixparams.SetFloatArrayDetail(p.name, uvs, 2, detail)
+def _get_primvars_(ob, rman_sg_mesh, geo, rixparams):
 
-        elif p.data_source == 'VERTEX_GROUP':
-            weights = _get_mesh_vgroup_(ob, geo, p.data_name)
-            if weights and len(weights) > 0:
-                detail = "facevarying" if facevarying_detail == len(weights) else "vertex"
-                rixparams.SetFloatDetail(p.name, weights, detail)
+    rm = ob.data.renderman
 
     for prop_name, meta in rm.prop_meta.items():
         if 'primvar' not in meta:
@@ -204,48 +239,354 @@ def _get_primvars_(ob, rman_sg_mesh, geo, rixparams):
         param_type = meta['renderman_type']
         property_utils.set_rix_param(rixparams, param_type, ri_name, val, is_reference=False, is_array=is_array, array_len=array_len, node=rm)
 
+def gather_mesh_data(ob, input_mesh=None):
+    """ Pull all of the raw arrays needed to translate a mesh out of Blender.
+    This must be called from the main thread.
+
+    Args:
+        ob (bpy.types.Object) - the evaluated mesh object
+        input_mesh (bpy.types.Mesh) - use this mesh, rather than calling ob.to_mesh()
+
+    Returns:
+        (dict) - the raw mesh data, to be passed to build_mesh_data, or None if
+                 we could not get a mesh
+    """
+
+    mesh = input_mesh
+    if not mesh:
+        mesh = ob.to_mesh()
+        if not mesh:
+            return None
+
+    rm = ob.data.renderman
+    mesh_data = dict()
+    is_subdiv = object_utils.is_subdmesh(ob)
+    use_smooth_normals = getattr(rm, 'rman_smoothnormals', False)
+    get_normals = (is_subdiv == 0 and not use_smooth_normals)
+    (nverts, verts, P, N) = object_utils._get_mesh_(mesh, get_normals=get_normals, as_numpy=True)
+
+    mesh_data['is_subdiv'] = is_subdiv
+    mesh_data['subdiv_scheme'] = getattr(rm, 'rman_subdiv_scheme', 'none')
+    mesh_data['nverts'] = nverts
+    mesh_data['verts'] = verts
+    mesh_data['P'] = P
+    mesh_data['N'] = N
+
+    if len(nverts) < 1:
+        if not input_mesh:
+            ob.to_mesh_clear()
+        return mesh_data
+
+    mesh_data['material_ids'] = None
+    if type(mesh) == bpy.types.Mesh and len(ob.data.materials) > 1:
+        mesh_data['material_ids'] = object_utils._get_material_ids_(mesh)
+
+    mesh_data['st'] = None
+    if rm.export_default_uv:
+        mesh_data['st'] = _get_mesh_uv_(mesh, as_numpy=True)
+
+    mesh_data['Cs'] = None
+    if rm.export_default_vcol:
+        mesh_data['Cs'] = _get_mesh_vcol_rgba_(mesh)
+
+    # custom prim vars
+    prim_vars = list()
+    for p in rm.prim_vars:
+        if p.data_source == 'VERTEX_COLOR':
+            prim_vars.append((p.data_source, p.name, _get_mesh_vcol_rgba_(mesh, p.data_name)))
+        elif p.data_source == 'UV_TEXTURE':
+            prim_vars.append((p.data_source, p.name, _get_mesh_uv_(mesh, p.data_name, as_numpy=True)))
+        elif p.data_source == 'VERTEX_GROUP':
+            weights = _get_mesh_vgroup_(ob, mesh, p.data_name)
+            if weights:
+                weights = np.array(weights, dtype=np.float32)
+            prim_vars.append((p.data_source, p.name, weights))
+    mesh_data['prim_vars'] = prim_vars
+
+    mesh_data['reference_pose'] = _get_reference_pose_(rm)
+
+    if is_subdiv:
+        mesh_data['crease_edges'] = _get_crease_edges_(mesh)
+        mesh_data['subdiv_interp'] = int(rm.rman_subdivInterp)
+        mesh_data['subdiv_facevarying_interp'] = int(rm.rman_subdivFacevaryingInterp)
+        mesh_data['subdiv_crease_chains'] = bool(getattr(rm, 'rman_subdivCreaseChains', False))
+
+    if not input_mesh:
+        ob.to_mesh_clear()
+
+    return mesh_data
+
+def build_mesh_data(mesh_data):
+    """ Turn the raw arrays from gather_mesh_data into primvar payloads ready
+    to be handed to the scene graph. This does not touch Blender or the scene graph,
+    so can be run in a worker thread.
+
+    Args:
+        mesh_data (dict) - the raw mesh data from gather_mesh_data. Modified in place.
+    """
+
+    nverts = mesh_data['nverts']
+    if len(nverts) < 1:
+        return mesh_data
+
+    npoints = len(mesh_data['P'])
+
+    material_ids = mesh_data['material_ids']
+    mesh_data['is_multi_material'] = False
+    if material_ids is not None and len(material_ids) > 0:
+        mesh_data['is_multi_material'] = bool((material_ids != material_ids[0]).any())
+    if mesh_data['is_multi_material']:
+        mesh_data['mats_faces'] = _get_mats_faces_(material_ids)
+
+    if mesh_data['Cs'] is not None:
+        mesh_data['Cs'] = np.ascontiguousarray(mesh_data['Cs'][:, :3])
+
+    prim_vars = list()
+    for data_source, name, data in mesh_data['prim_vars']:
+        if data is not None and data_source == 'VERTEX_COLOR':
+            data = np.ascontiguousarray(data[:, :3])
+        prim_vars.append((data_source, name, data))
+    mesh_data['prim_vars'] = prim_vars
+
+    mesh_data['reference_pose_errors'] = []
+    if mesh_data['reference_pose']:
+        (mesh_data['reference_pose'], mesh_data['reference_pose_errors']) = _build_reference_pose_(mesh_data['reference_pose'], npoints)
+
+    if mesh_data['is_subdiv']:
+        (edge_verts, creases) = mesh_data.pop('crease_edges')
+        mesh_data['subd_tags'] = _build_subd_tags_(edge_verts, creases,
+                                                mesh_data['subdiv_interp'],
+                                                mesh_data['subdiv_facevarying_interp'],
+                                                crease_chains=mesh_data['subdiv_crease_chains'])
+
+    return mesh_data
+
+def _hash_foreach_(h, collection, attr, dtype, width=1):
+    values = np.empty(len(collection) * width, dtype=dtype)
+    collection.foreach_get(attr, values)
+    h.update(values.tobytes())
+
+def _uses_external_data_(ob):
+    # Check if any of the modifiers use a datablock (ex: a Displace texture) 
+    # or a vertex group. We can't tell when those are edited, so
+    # these objects can't be cached.
+    vgroup_names = set([vg.name for vg in ob.vertex_groups])
+    for mod in ob.modifiers:
+        if not mod.show_render:
+            continue
+        for prop in mod.bl_rna.properties:
+            if prop.identifier == 'rna_type':
+                continue
+            val = getattr(mod, prop.identifier, None)
+            if prop.type == 'POINTER' and isinstance(val, bpy.types.ID):
+                return True
+            if prop.type == 'STRING' and val and val in vgroup_names:
+                return True
+    return False
+
+def _hash_shape_keys_(h, mesh):
+    # returns False if the shape keys can't be hashed
+    shape_keys = mesh.shape_keys
+    if not shape_keys:
+        return True
+    h.update(repr((shape_keys.use_relative, shape_keys.eval_time, shape_keys.reference_key.name)).encode('utf-8'))
+    for kb in shape_keys.key_blocks:
+        if kb.vertex_group:
+            # the weights of the vertex group would need hashing too
+            return False
+        settings = (kb.name, kb.value, kb.mute, kb.relative_key.name, kb.slider_min, 
+                    kb.slider_max, kb.interpolation)
+        h.update(repr(settings).encode('utf-8'))
+        _hash_foreach_(h, kb.data, 'co', np.float32, 3)
+    return True
+
+def get_geo_cache_key(ob, frame):
+    """ Build a geometry cache key for a mesh object. The key is a hash of the original
+    mesh data, its shape keys, the modifier settings, the RenderMan object and mesh settings,
+    the cache format version and, if the mesh can change over time, the frame number.
+    Objects whose modifiers use other datablocks or vertex groups are not cached.
+
+    Args:
+        ob (bpy.types.Object) - the evaluated mesh object
+        frame (int) - the current frame
+
+    Returns:
+        (str) - the cache key, or None if this object cannot be cached
+    """
+    if ob.type != 'MESH' or not ob.data:
+        return None
+    modifiers_fingerprint = object_utils._get_modifiers_fingerprint_(ob)
+    if modifiers_fingerprint is None:
+        return None
+    if _uses_external_data_(ob):
+        return None
+
+    mesh = ob.data.original
+    rm = mesh.renderman
+    h = hashlib.blake2b(digest_size=20)
+
+    settings = [('version', geocache_utils.__GEOCACHE_VERSION__), ob.renderman.primitive,
+                modifiers_fingerprint, mesh.use_auto_smooth, mesh.auto_smooth_angle,
+                len(mesh.materials), tuple([vg.name for vg in ob.vertex_groups])]
+    for prop_name, meta in rm.prop_meta.items():
+        val = getattr(rm, prop_name, None)
+        if getattr(val, '__len__', None) and not isinstance(val, str):
+            val = tuple(val)
+        settings.append((prop_name, val))
+    settings.append(tuple([(p.name, p.data_source, p.data_name) for p in rm.prim_vars]))
+    if object_utils.is_geometry_animated(ob) or mesh.animation_data or ob.animation_data:
+        settings.append(('frame', frame))
+    h.update(repr(settings).encode('utf-8'))
+
+    _hash_foreach_(h, mesh.vertices, 'co', np.float32, 3)
+    _hash_foreach_(h, mesh.edges, 'vertices', np.int32, 2)
+    _hash_foreach_(h, mesh.edges, 'crease', np.float32)
+    _hash_foreach_(h, mesh.polygons, 'loop_total', np.int32)
+    _hash_foreach_(h, mesh.polygons, 'use_smooth', np.int32)
+    _hash_foreach_(h, mesh.polygons, 'material_index', np.int32)
+    _hash_foreach_(h, mesh.loops, 'vertex_index', np.int32)
+    if not _hash_shape_keys_(h, mesh):
+        return None
+    for uv_layer in mesh.uv_layers:
+        h.update(uv_layer.name.encode('utf-8'))
+        _hash_foreach_(h, uv_layer.data, 'uv', np.float32, 2)
+    for vcol in mesh.vertex_colors:
+        h.update(vcol.name.encode('utf-8'))
+        _hash_foreach_(h, vcol.data, 'color', np.float32, 4)
+    for p in rm.prim_vars:
+        if p.data_source == 'VERTEX_GROUP':
+            h.update(repr(_get_mesh_vgroup_(ob, mesh, p.data_name)).encode('utf-8'))
+    reference_pose = _get_reference_pose_(rm)
+    if reference_pose:
+        for primvar_name, (has_flags, values, is_normal) in reference_pose.items():
+            h.update(primvar_name.encode('utf-8'))
+            h.update(has_flags.tobytes())
+            h.update(values.tobytes())
+
+    return h.hexdigest()
+
+def get_topology_fingerprint(ob, mesh):
+    """ Build a fingerprint of everything we export for an evaluated mesh, other than
+    its points and normals: the topology, material indices, shading flags, UVs, 
+    vertex colors, creases and the RenderMan mesh settings. If the fingerprint
+    has not changed since the last update, only P and N need to be updated.
+
+    Args:
+        ob (bpy.types.Object) - the evaluated mesh object
+        mesh (bpy.types.Mesh) - the evaluated mesh (from ob.to_mesh())
+
+    Returns:
+        (str) - the fingerprint, or None if we can't tell what changed for this mesh
+    """
+    rm = ob.data.renderman
+    for p in rm.prim_vars:
+        if p.data_source == 'VERTEX_GROUP':
+            # vertex group weights are too slow to check
+            return None
+
+    is_subdiv = object_utils.is_subdmesh(ob)
+    h = hashlib.blake2b(digest_size=20)
+    settings = [is_subdiv, len(mesh.vertices), len(mesh.polygons), len(mesh.loops),
+                mesh.use_auto_smooth, getattr(rm, 'rman_smoothnormals', False),
+                tuple([mat.original.name_full if mat else None for mat in ob.data.materials])]
+    for prop_name, meta in rm.prop_meta.items():
+        val = getattr(rm, prop_name, None)
+        if getattr(val, '__len__', None) and not isinstance(val, str):
+            val = tuple(val)
+        settings.append((prop_name, val))
+    settings.append(tuple([(p.name, p.data_source, p.data_name) for p in rm.prim_vars]))
+    h.update(repr(settings).encode('utf-8'))
+
+    _hash_foreach_(h, mesh.polygons, 'loop_total', np.int32)
+    _hash_foreach_(h, mesh.polygons, 'use_smooth', np.int32)
+    _hash_foreach_(h, mesh.polygons, 'material_index', np.int32)
+    _hash_foreach_(h, mesh.loops, 'vertex_index', np.int32)
+    if is_subdiv:
+        _hash_foreach_(h, mesh.edges, 'vertices', np.int32, 2)
+        _hash_foreach_(h, mesh.edges, 'crease', np.float32)
+    data_sources = set([p.data_source for p in rm.prim_vars])
+    if rm.export_default_uv or 'UV_TEXTURE' in data_sources:
+        active = mesh.uv_layers.active
+        h.update((active.name if active else '').encode('utf-8'))
+        for uv_layer in mesh.uv_layers:
+            h.update(uv_layer.name.encode('utf-8'))
+            _hash_foreach_(h, uv_layer.data, 'uv', np.float32, 2)
+    if rm.export_default_vcol or 'VERTEX_COLOR' in data_sources:
+        active = mesh.vertex_colors.active
+        h.update((active.name if active else '').encode('utf-8'))
+        for vcol in mesh.vertex_colors:
+            h.update(vcol.name.encode('utf-8'))
+            _hash_foreach_(h, vcol.data, 'color', np.float32, 4)
+    reference_pose = _get_reference_pose_(rm)
+    if reference_pose:
+        for primvar_name, (has_flags, values, is_normal) in reference_pose.items():
+            h.update(primvar_name.encode('utf-8'))
+            h.update(has_flags.tobytes())
+            h.update(values.tobytes())
+
+    return h.hexdigest()
+
 class RmanMeshTranslator(RmanTranslator):
 
     def __init__(self, rman_scene):
         super().__init__(rman_scene)
         self.bl_type = 'MESH' 
 
-    def _get_subd_tags_(self, ob, mesh, primvar):
-        creases = []
-
-        # only do creases 1 edge at a time for now,
-        # detecting chains might be tricky..
-        for e in mesh.edges:
-            if e.crease > 0.0:
-                creases.append((e.vertices[0], e.vertices[1],
-                                e.crease * e.crease * 10))
-                # squared, to match blender appareance better
-                #: range 0 - 10 (infinitely sharp)
-
-        tags = ['interpolateboundary', 'facevaryinginterpolateboundary']
-        nargs = [1, 0, 0, 1, 0, 0]
-        intargs = [ int(ob.data.renderman.rman_subdivInterp),
-                int(ob.data.renderman.rman_subdivFacevaryingInterp)]
-        floatargs = []
+    def _set_subd_tags_(self, primvar, subd_tags):
+        (tags, nargs, intargs, floatargs) = subd_tags
         stringargs = []   
 
-        if len(creases) > 0:
-            for c in creases:
-                tags.append('crease')
-                nargs.extend([2, 1, 0])
-                intargs.extend([c[0], c[1]])
-                floatargs.append(c[2])           
-
         primvar.SetStringArray(self.rman_scene.rman.Tokens.Rix.k_Ri_subdivtags, tags, len(tags))
-        primvar.SetIntegerArray(self.rman_scene.rman.Tokens.Rix.k_Ri_subdivtagnargs, nargs, len(nargs))
-        primvar.SetIntegerArray(self.rman_scene.rman.Tokens.Rix.k_Ri_subdivtagintargs, intargs, len(intargs))
-        primvar.SetFloatArray(self.rman_scene.rman.Tokens.Rix.k_Ri_subdivtagfloatargs, floatargs, len(floatargs))
+        scenegraph_utils.set_primvar_array(primvar.SetIntegerArray, self.rman_scene.rman.Tokens.Rix.k_Ri_subdivtagnargs, nargs, len(nargs))
+        scenegraph_utils.set_primvar_array(primvar.SetIntegerArray, self.rman_scene.rman.Tokens.Rix.k_Ri_subdivtagintargs, intargs, len(intargs))
+        scenegraph_utils.set_primvar_array(primvar.SetFloatArray, self.rman_scene.rman.Tokens.Rix.k_Ri_subdivtagfloatargs, floatargs, len(floatargs))
         primvar.SetStringArray(self.rman_scene.rman.Tokens.Rix.k_Ri_subdivtagstringtags, stringargs, len(stringargs))        
 
-    def export(self, ob, db_name):
+    def _set_mesh_primvars_(self, rman_sg_mesh, mesh_data, rixparams):
+        vertex_detail = rman_sg_mesh.npoints
+        facevarying_detail = rman_sg_mesh.nverts
+
+        uvs = mesh_data['st']
+        if uvs is not None and len(uvs) > 0:
+            detail = "facevarying" if facevarying_detail == len(uvs) else "vertex"
+            scenegraph_utils.set_primvar_array(rixparams.SetFloatArrayDetail, "st", uvs, 2, detail)
+
+        vcols = mesh_data['Cs']
+        if vcols is not None and len(vcols) > 0:
+            detail = "facevarying" if facevarying_detail == len(vcols) else "vertex"
+            scenegraph_utils.set_primvar_array(rixparams.SetColorDetail, "Cs", vcols, detail)
+
+        # reference pose
+        for err in mesh_data['reference_pose_errors']:
+            rfb_log().error(err)
+        if mesh_data['reference_pose']:
+            for primvar_name, values, is_normal in mesh_data['reference_pose']:
+                if is_normal:
+                    scenegraph_utils.set_primvar_array(rixparams.SetNormalDetail, primvar_name, values, 'vertex')
+                else:
+                    scenegraph_utils.set_primvar_array(rixparams.SetPointDetail, primvar_name, values, 'vertex')
+
+        # custom prim vars
+        for data_source, name, data in mesh_data['prim_vars']:
+            if data is None or len(data) < 1:
+                continue
+            detail = "facevarying" if facevarying_detail == len(data) else "vertex"
+            if data_source == 'VERTEX_COLOR':
+                scenegraph_utils.set_primvar_array(rixparams.SetColorDetail, name, data, detail)
+            elif data_source == 'UV_TEXTURE':
+                scenegraph_utils.set_primvar_array(rixparams.SetFloatArrayDetail, name, data, 2, detail)
+            elif data_source == 'VERTEX_GROUP':
+                scenegraph_utils.set_primvar_array(rixparams.SetFloatDetail, name, data, detail)
+
+    def export(self, ob, db_name, rman_sg_prototype=None):
         
-        sg_node = self.rman_scene.sg_scene.CreateMesh(db_name)
-        rman_sg_mesh = RmanSgMesh(self.rman_scene, sg_node, db_name)
+        if rman_sg_prototype:
+            # share the RixSGMesh of another object using the same mesh datablock
+            rman_sg_mesh = RmanSgMesh(self.rman_scene, rman_sg_prototype.sg_node, db_name)
+            rman_sg_mesh.rman_sg_prototype = rman_sg_prototype
+        else:
+            sg_node = self.rman_scene.sg_scene.CreateMesh(db_name)
+            rman_sg_mesh = RmanSgMesh(self.rman_scene, sg_node, db_name)
 
         if self.rman_scene.do_motion_blur:
             rman_sg_mesh.is_transforming = object_utils.is_transforming(ob)
@@ -258,7 +599,7 @@ class RmanMeshTranslator(RmanTranslator):
         mesh = None
         mesh = ob.to_mesh()
         primvar = rman_sg_mesh.sg_node.GetPrimVars()
-        P = object_utils._get_mesh_points_(mesh)
+        P = object_utils._get_mesh_points_(mesh, as_numpy=True)
         npoints = len(P)
 
         if rman_sg_mesh.npoints != npoints:
@@ -273,37 +614,135 @@ class RmanMeshTranslator(RmanTranslator):
                     c.SetPrimVars(pvar)            
             return       
 
-        primvar.SetPointDetail(self.rman_scene.rman.Tokens.Rix.k_P, P, "vertex", time_sample)                            
+        scenegraph_utils.set_primvar_array(primvar.SetPointDetail, self.rman_scene.rman.Tokens.Rix.k_P, P, "vertex", time_sample)                            
 
         rman_sg_mesh.sg_node.SetPrimVars(primvar)
 
         if rman_sg_mesh.is_multi_material:
             for c in rman_sg_mesh.multi_material_children:
                 pvar = c.GetPrimVars()
-                pvar.SetPointDetail(self.rman_scene.rman.Tokens.Rix.k_P, P, "vertex", time_sample)                                  
+                scenegraph_utils.set_primvar_array(pvar.SetPointDetail, self.rman_scene.rman.Tokens.Rix.k_P, P, "vertex", time_sample)                                  
                 c.SetPrimVars(pvar)
 
         ob.to_mesh_clear()    
 
-    def update(self, ob, rman_sg_mesh, input_mesh=None):
+    def _update_from_prototype(self, ob, rman_sg_mesh):
+        # the geometry for this object is shared, and only needs
+        # to be translated once
+        rman_sg_prototype = rman_sg_mesh.rman_sg_prototype
+        if rman_sg_prototype.npoints < 0 and rman_sg_prototype.sg_node:
+            # prototype hasn't been translated yet. 
+            # Use this object; the prototype key guarantees they are identical.
+            self.update(ob, rman_sg_prototype)
+
+        if rman_sg_prototype == rman_sg_mesh:
+            # we are the prototype, and have already been translated
+            return True
 
-        rm = ob.renderman
-        mesh = input_mesh
-        if not mesh:
+        rman_sg_mesh.sg_node = rman_sg_prototype.sg_node
+        if not rman_sg_mesh.sg_node:
+            rman_sg_mesh.is_transforming = False
+            rman_sg_mesh.is_deforming = False
+            return None
+
+        rman_sg_mesh.npoints = rman_sg_prototype.npoints
+        rman_sg_mesh.npolys = rman_sg_prototype.npolys
+        rman_sg_mesh.nverts = rman_sg_prototype.nverts
+        rman_sg_mesh.is_subdiv = rman_sg_prototype.is_subdiv
+        rman_sg_mesh.subdiv_scheme = rman_sg_prototype.subdiv_scheme
+        rman_sg_mesh.is_multi_material = rman_sg_prototype.is_multi_material
+        rman_sg_mesh.multi_material_children = rman_sg_prototype.multi_material_children
+        return True
+
+    def _update_points_(self, ob, rman_sg_mesh, mesh):
+        # only the points and normals have changed, so update P and N
+        # of the existing primvars
+        P = object_utils._get_mesh_points_(mesh, as_numpy=True)
+        N = []
+        use_smooth_normals = getattr(ob.data.renderman, 'rman_smoothnormals', False)
+        if not rman_sg_mesh.is_subdiv and not use_smooth_normals:
+            N = object_utils._get_mesh_normals_(mesh, as_numpy=True)
+
+        primvars = [rman_sg_mesh.sg_node.GetPrimVars()]
+        if rman_sg_mesh.is_multi_material:
+            primvars.extend([c.GetPrimVars() for c in rman_sg_mesh.multi_material_children])
+
+        for primvar in primvars:
+            scenegraph_utils.set_primvar_array(primvar.SetPointDetail, self.rman_scene.rman.Tokens.Rix.k_P, P, "vertex")
+            if len(N) > 0:
+                if len(N) == rman_sg_mesh.nverts:
+                    scenegraph_utils.set_primvar_array(primvar.SetNormalDetail, self.rman_scene.rman.Tokens.Rix.k_N, N, "facevarying")         
+                else:
+                    scenegraph_utils.set_primvar_array(primvar.SetNormalDetail, self.rman_scene.rman.Tokens.Rix.k_N, N, "uniform")         
+
+        rman_sg_mesh.sg_node.SetPrimVars(primvars[0])
+        if rman_sg_mesh.is_multi_material:
+            for c, primvar in zip(rman_sg_mesh.multi_material_children, primvars[1:]):
+                c.SetPrimVars(primvar)
+        self.rman_scene.rman_render.stats_mgr.incr_counter('Mesh Point Updates')
+
+    def update(self, ob, rman_sg_mesh, input_mesh=None, mesh_data=None):
+        """ Translate the mesh for ob.
+
+        Args:
+            ob (bpy.types.Object) - the evaluated mesh object
+            rman_sg_mesh (RmanSgMesh) - the RmanSgMesh to update
+            input_mesh (bpy.types.Mesh) - use this mesh, rather than calling ob.to_mesh()
+            mesh_data (dict) - already gathered and built mesh data (see RmanScene.export_mesh_data_blocks).
+                               If None, the mesh data is gathered and built here.
+        """
+
+        if rman_sg_mesh.rman_sg_prototype and not input_mesh and not mesh_data:
+            if rman_sg_mesh.rman_sg_prototype != rman_sg_mesh or rman_sg_mesh.npoints > -1:
+                return self._update_from_prototype(ob, rman_sg_mesh)
+
+        topology_fingerprint = None
+        if not mesh_data and not input_mesh and self.rman_scene.is_interactive:
+            # during IPR, check if only the points and normals changed 
+            # (ex: sculpting, posing). If so, we can skip re-translating everything else.
             mesh = ob.to_mesh()
-            if not mesh:
+            if mesh:
+                topology_fingerprint = get_topology_fingerprint(ob, mesh)
+                if topology_fingerprint and topology_fingerprint == rman_sg_mesh.topology_fingerprint \
+                        and rman_sg_mesh.sg_node and not rman_sg_mesh.is_deforming:
+                    self._update_points_(ob, rman_sg_mesh, mesh)
+                    ob.to_mesh_clear()
+                    return True
+                mesh_data = gather_mesh_data(ob, input_mesh=mesh)
+                if mesh_data:
+                    build_mesh_data(mesh_data)
+            ob.to_mesh_clear()
+            if not mesh_data:
                 return True
 
-        rman_sg_mesh.is_subdiv = object_utils.is_subdmesh(ob)
-        use_smooth_normals = getattr(ob.data.renderman, 'rman_smoothnormals', False)
-        get_normals = (rman_sg_mesh.is_subdiv == 0 and not use_smooth_normals)
-        (nverts, verts, P, N) = object_utils._get_mesh_(mesh, get_normals=get_normals)
+        if not mesh_data:
+            geocache = None
+            cache_key = None
+            if not self.rman_scene.is_interactive and not input_mesh:
+                geocache = geocache_utils.get_geocache()
+            if geocache:
+                cache_key = get_geo_cache_key(ob, self.rman_scene.bl_frame_current)
+            if cache_key:
+                mesh_data = geocache.get(cache_key)
+                self.rman_scene.rman_render.stats_mgr.incr_counter('Geometry Cache Hits' if mesh_data else 'Geometry Cache Misses')
+            if not mesh_data:
+                mesh_data = gather_mesh_data(ob, input_mesh=input_mesh)
+                if not mesh_data:
+                    return True
+                build_mesh_data(mesh_data)
+                if cache_key:
+                    geocache.put(cache_key, mesh_data)
+
+        nverts = mesh_data['nverts']
+        verts = mesh_data['verts']
+        P = mesh_data['P']
+        N = mesh_data['N']
+        rman_sg_mesh.is_subdiv = mesh_data['is_subdiv']
         
         # if this is empty continue:
-        if nverts == []:
-            if not input_mesh:
-                ob.to_mesh_clear()
+        if len(nverts) < 1:
             rman_sg_mesh.sg_node = None
+            rman_sg_mesh.topology_fingerprint = None
             rman_sg_mesh.is_transforming = False
             rman_sg_mesh.is_deforming = False
             return None
@@ -315,9 +754,10 @@ class RmanMeshTranslator(RmanTranslator):
         rman_sg_mesh.npoints = npoints
         rman_sg_mesh.npolys = npolys
         rman_sg_mesh.nverts = numnverts
+        rman_sg_mesh.topology_fingerprint = topology_fingerprint
 
         rman_sg_mesh.sg_node.Define( npolys, npoints, numnverts )
-        rman_sg_mesh.is_multi_material = _is_multi_material_(ob, mesh)
+        rman_sg_mesh.is_multi_material = mesh_data['is_multi_material']
             
         primvar = rman_sg_mesh.sg_node.GetPrimVars()
         primvar.Clear()
@@ -325,34 +765,32 @@ class RmanMeshTranslator(RmanTranslator):
         if rman_sg_mesh.is_deforming:
             super().set_primvar_times(rman_sg_mesh.motion_steps, primvar)
         
-        primvar.SetPointDetail(self.rman_scene.rman.Tokens.Rix.k_P, P, "vertex")
-        _get_primvars_(ob, rman_sg_mesh, mesh, primvar)   
+        scenegraph_utils.set_primvar_array(primvar.SetPointDetail, self.rman_scene.rman.Tokens.Rix.k_P, P, "vertex")
+        self._set_mesh_primvars_(rman_sg_mesh, mesh_data, primvar)
+        _get_primvars_(ob, rman_sg_mesh, None, primvar)
 
-        primvar.SetIntegerDetail(self.rman_scene.rman.Tokens.Rix.k_Ri_nvertices, nverts, "uniform")
-        primvar.SetIntegerDetail(self.rman_scene.rman.Tokens.Rix.k_Ri_vertices, verts, "facevarying")            
+        scenegraph_utils.set_primvar_array(primvar.SetIntegerDetail, self.rman_scene.rman.Tokens.Rix.k_Ri_nvertices, nverts, "uniform")
+        scenegraph_utils.set_primvar_array(primvar.SetIntegerDetail, self.rman_scene.rman.Tokens.Rix.k_Ri_vertices, verts, "facevarying")            
 
         if rman_sg_mesh.is_subdiv:
-            creases = self._get_subd_tags_(ob, mesh, primvar)
-            if ob.data.renderman.rman_subdiv_scheme == 'none':
+            self._set_subd_tags_(primvar, mesh_data['subd_tags'])
+            if mesh_data['subdiv_scheme'] == 'none':
                 # we were tagged as a subdiv by a modifier
                 rman_sg_mesh.sg_node.SetScheme(self.rman_scene.rman.Tokens.Rix.k_catmullclark) 
             else:
-                rman_sg_mesh.sg_node.SetScheme(ob.data.renderman.rman_subdiv_scheme) 
+                rman_sg_mesh.sg_node.SetScheme(mesh_data['subdiv_scheme'])
 
         else:
             rman_sg_mesh.sg_node.SetScheme(None)
-            if N:
+            if len(N) > 0:
                 if len(N) == numnverts:
-                    primvar.SetNormalDetail(self.rman_scene.rman.Tokens.Rix.k_N, N, "facevarying")         
+                    scenegraph_utils.set_primvar_array(primvar.SetNormalDetail, self.rman_scene.rman.Tokens.Rix.k_N, N, "facevarying")         
                 else:
-                    primvar.SetNormalDetail(self.rman_scene.rman.Tokens.Rix.k_N, N, "uniform")         
-        subdiv_scheme = getattr(ob.data.renderman, 'rman_subdiv_scheme', 'none')
-        rman_sg_mesh.subdiv_scheme = subdiv_scheme
+                    scenegraph_utils.set_primvar_array(primvar.SetNormalDetail, self.rman_scene.rman.Tokens.Rix.k_N, N, "uniform")         
+        rman_sg_mesh.subdiv_scheme = mesh_data['subdiv_scheme']
 
         if rman_sg_mesh.is_multi_material:
-            material_ids = _get_material_ids(ob, mesh)
-            for mat_id, faces in \
-                _get_mats_faces_(nverts, material_ids).items():
+            for mat_id, faces in mesh_data['mats_faces'].items():
 
                 mat = ob.data.materials[mat_id]
                 if not mat:
@@ -361,7 +799,7 @@ class RmanMeshTranslator(RmanTranslator):
                 sg_material = self.rman_scene.rman_materials.get(mat.original, None)
 
                 if mat_id == 0:
-                    primvar.SetIntegerArray(self.rman_scene.rman.Tokens.Rix.k_shade_faceset, faces, len(faces))
+                    scenegraph_utils.set_primvar_array(primvar.SetIntegerArray, self.rman_scene.rman.Tokens.Rix.k_shade_faceset, faces, len(faces))
                     scenegraph_utils.set_material(rman_sg_mesh.sg_node, sg_material.sg_node)
                 else:                
                     sg_sub_mesh =  self.rman_scene.sg_scene.CreateMesh("")
@@ -372,7 +810,7 @@ class RmanMeshTranslator(RmanTranslator):
                     if rman_sg_mesh.is_deforming:
                         super().set_primvar_times(rman_sg_mesh.motion_steps, pvars)
                     pvars.Inherit(primvar)
-                    pvars.SetIntegerArray(self.rman_scene.rman.Tokens.Rix.k_shade_faceset, faces, len(faces))
+                    scenegraph_utils.set_primvar_array(pvars.SetIntegerArray, self.rman_scene.rman.Tokens.Rix.k_shade_faceset, faces, len(faces))
                     sg_sub_mesh.SetPrimVars(pvars)
                     scenegraph_utils.set_material(sg_sub_mesh, sg_material.sg_node)
                     rman_sg_mesh.sg_node.AddChild(sg_sub_mesh)
@@ -382,7 +820,4 @@ class RmanMeshTranslator(RmanTranslator):
 
         rman_sg_mesh.sg_node.SetPrimVars(primvar)
 
-        if not input_mesh:
-            ob.to_mesh_clear()  
-
         return True    
\ No newline at end of file
@@ -47,8 +47,7 @@ class RmanParticlesTranslator(RmanTranslator):
         if psys.settings.type == 'EMITTER' and not object_utils.is_particle_instancer(psys):
             emitter_translator.export_deform_sample(rman_sg_particles.rman_sg_emitter, ob, psys, time_sample)
         elif psys.settings.type == 'HAIR' and psys.settings.render_type == 'PATH':
-            #hair_translator.export_deform_sample(rman_sg_particles.rman_sg_hair, ob, psys, time_sample)
-            pass
+            hair_translator.export_deform_sample(rman_sg_particles.rman_sg_hair, ob, psys, time_sample)
 
 
     def clear_children(self, ob, psys, rman_sg_particles):